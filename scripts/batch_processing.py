@@ -7,14 +7,49 @@ and logging.
 
 Feel free to adapt the batch size, error handling, and subprocess command configuration
 to meet your specific operational needs.
+
+With `memory_profile=True`, every task writes a memory report next to its output and
+the reports of all tasks are combined in 'sensitivity_analysis/memory_summary.json',
+which shows the largest peak memory of each stage and the task it occurred in.
+
+With `result_cache=True` and a `seed`, every task reuses the output stored by an
+earlier run when its input row, the reference data and the options are unchanged, so
+a nightly re-run only recomputes the farms that changed.
+
+Before any task is started, the coordinates of all rows are checked with the cheap
+`outside_canada` prefilter. Rows that are certainly outside Canada are listed in
+'rejected_rows.csv' next to this script and skipped, instead of failing their batch
+after the province lookup.
+
+To spread a large run over several processes, `enqueue_batch` adds one task per row
+to the SQLite work queue of 'src/work_queue.py' instead, and workers started with
+'scripts/queue_worker.py' on the same machine claim and run the tasks.
 """
 
-import pandas as pd
 import subprocess
+import json
 import os
+import sys
+import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader.canada_prefilter import outside_canada
+from src.data_loader.input_index import iter_input_chunks
+from src.instrumentation import aggregate_memory_reports
+from src.work_queue import WorkQueue
 
-def run_batch_process(input_csv, start_index=0, batch_size=3):
+# The options of main.py for every task of a batch
+BATCH_OPTIONS = {"operation_mode": "scientific", "source": "external", "num_runs": 100}
+
+
+def run_batch_process(
+    input_csv,
+    start_index=0,
+    batch_size=3,
+    memory_profile=False,
+    result_cache=False,
+    seed=None,
+):
     """
     Process data in batches from a specified CSV file. This function manages the
     batch processing by iterating through rows in specified batch sizes, and logs progress
@@ -29,6 +64,14 @@ def run_batch_process(input_csv, start_index=0, batch_size=3):
         Default is 0.
     batch_size : int, optional
         The number of rows to process in each batch. Default is 3.
+    memory_profile : bool, optional
+        Whether each task writes a memory report, and the reports are combined in a
+        summary. Default is False.
+    result_cache : bool, optional
+        Whether tasks reuse and store their outputs in the local result store. The
+        scientific runs are only cached with a `seed`. Default is False.
+    seed : int, optional
+        Seed of the samples of every task, for reproducible and cacheable runs.
 
     Returns
     -------
@@ -38,13 +81,29 @@ def run_batch_process(input_csv, start_index=0, batch_size=3):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     main_py_path = os.path.join(script_dir, "../src/main.py")
     input_csv_path = os.path.join(script_dir, input_csv)
-    # Load the farm information from CSV
-    df = pd.read_csv(input_csv_path)
+    outputs_dir = os.path.join(script_dir, "../data/outputs")
+    memory_reports = {}
+    rejected = reject_outside_canada(
+        input_csv_path, os.path.join(script_dir, "rejected_rows.csv"), start_index
+    )
 
-    for start in range(start_index, len(df), batch_size):
-        batch_df = df[start : start + batch_size]
+    # Stream the farm information from CSV, so large exports are never fully loaded
+    for batch_df in iter_input_chunks(input_csv_path, batch_size, start=start_index):
+        start = batch_df.index[0]
+        batch_df = batch_df.drop(index=rejected, errors="ignore")
+        if batch_df.empty:
+            continue
         try:
-            process_batch(batch_df, main_py_path, input_csv_path)
+            output_files = process_batch(
+                batch_df,
+                main_py_path,
+                input_csv_path,
+                memory_profile,
+                result_cache,
+                seed,
+            )
+            if memory_profile:
+                memory_reports.update(read_memory_reports(outputs_dir, output_files))
             print(f"Successfully processed rows {start} to {start + len(batch_df) - 1}")
         except Exception as e:
             print(
@@ -55,8 +114,129 @@ def run_batch_process(input_csv, start_index=0, batch_size=3):
                 f.write(str(start))  # Save the index of the start of the failed batch
             break  
 
+    if memory_profile and memory_reports:
+        summary_path = os.path.join(
+            outputs_dir, "sensitivity_analysis", "memory_summary.json"
+        )
+        with open(summary_path, "w") as f:
+            json.dump(aggregate_memory_reports(memory_reports), f, indent=4)
+        print(f"Memory summary saved to {summary_path}")
 
-def process_batch(batch_df, main_py_path, input_csv_path):
+
+def reject_outside_canada(input_csv_path, rejected_path, start_index=0):
+    """
+    Finds the rows of an input CSV file whose coordinates are certainly outside
+    Canada, streaming the file in large chunks without spatial joins.
+
+    Parameters
+    ----------
+    input_csv_path : str
+        The absolute path to the input CSV file.
+    rejected_path : str
+        The CSV file listing the rejected rows. It is only written if rows are
+        rejected.
+    start_index : int, optional
+        Number of rows skipped at the start of the file. Default is 0.
+
+    Returns
+    -------
+    list of int
+        The positions in the file of the rejected rows.
+    """
+    rejected = []
+    for chunk in iter_input_chunks(input_csv_path, 100_000, start=start_index):
+        outside = outside_canada(chunk["longitude"], chunk["latitude"])
+        rejected.append(
+            chunk.loc[outside, ["farm_id", "common_crop_name", "longitude", "latitude"]]
+        )
+    rejected = pd.concat(rejected) if rejected else pd.DataFrame()
+    if not rejected.empty:
+        rejected.to_csv(rejected_path, index_label="row")
+        print(f"Skipping {len(rejected)} rows outside Canada, see {rejected_path}")
+    return rejected.index.tolist()
+
+
+def enqueue_batch(input_csv, queue_path=None, result_cache=False, seed=None):
+    """
+    Adds one task per row of an input CSV file to a work queue, with the options of
+    `process_batch`. Rows outside Canada are skipped as in `run_batch_process`, and
+    rows that are already queued are left as they are, so the file can be enqueued
+    again after it was extended.
+
+    Parameters
+    ----------
+    input_csv : str
+        Path to the input CSV file containing the data, relative to this script.
+    queue_path : str, optional
+        The SQLite file of the queue, on a local disk of the machine that runs the
+        workers. Defaults to 'data/cache/work_queue.sqlite'.
+    result_cache : bool, optional
+        Whether tasks reuse and store their outputs in the local result store.
+        Default is False.
+    seed : int, optional
+        Seed of the samples of every task.
+
+    Returns
+    -------
+    int
+        The number of tasks added.
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    # Workers may run from other folders, so tasks refer to the file by absolute path
+    input_csv_path = os.path.abspath(os.path.join(script_dir, input_csv))
+    rejected = reject_outside_canada(
+        input_csv_path, os.path.join(script_dir, "rejected_rows.csv")
+    )
+    options = dict(BATCH_OPTIONS, result_cache=result_cache, seed=seed)
+    queue = WorkQueue(queue_path)
+    added = 0
+    for chunk in iter_input_chunks(input_csv_path, 10_000):
+        chunk = chunk.drop(index=rejected, errors="ignore")
+        added += queue.enqueue(
+            {
+                "input_file": input_csv_path,
+                "farm_id": farm_id,
+                "crop": crop,
+                "options": options,
+                "output_file": f"sensitivity_analysis/{farm_id}_{crop}.json",
+            }
+            for farm_id, crop in zip(chunk["farm_id"], chunk["common_crop_name"])
+        )
+    return added
+
+
+def read_memory_reports(outputs_dir, output_files):
+    """
+    Reads the memory reports written next to the output files of a batch.
+
+    Parameters
+    ----------
+    outputs_dir : str
+        The outputs folder of main.py.
+    output_files : list of str
+        The output files of the tasks, relative to `outputs_dir`.
+
+    Returns
+    -------
+    dict
+        The memory report of each task, keyed by its output file without extension.
+    """
+    reports = {}
+    for output_file in output_files:
+        task = os.path.splitext(output_file)[0]
+        with open(os.path.join(outputs_dir, f"{task}_memory.json")) as f:
+            reports[task] = json.load(f)
+    return reports
+
+
+def process_batch(
+    batch_df,
+    main_py_path,
+    input_csv_path,
+    memory_profile=False,
+    result_cache=False,
+    seed=None,
+):
     """
     Executes a subprocess to run a Python script for each row in the batch dataframe.
     This function constructs the necessary command to execute the script with parameters
@@ -70,13 +250,21 @@ def process_batch(batch_df, main_py_path, input_csv_path):
         The absolute path to the 'main.py' script that will be executed.
     input_csv_path : str
         The absolute path to the input CSV file, which is passed as an argument to the script.
+    memory_profile : bool, optional
+        Whether each task writes a memory report next to its output. Default is False.
+    result_cache : bool, optional
+        Whether tasks reuse and store their outputs in the local result store.
+        Default is False.
+    seed : int, optional
+        Seed of the samples of every task.
 
     Returns
     -------
-    None
-        Execution results are dependent on the 'main.py' script's outcomes; errors will
-        raise an exception.
+    list of str
+        The output files of the tasks, relative to the outputs folder. Errors of the
+        'main.py' script raise an exception.
     """
+    output_files = []
     for index, row in batch_df.iterrows():
         farm_id = row["farm_id"]
         crop = row["common_crop_name"]
@@ -94,15 +282,23 @@ def process_batch(batch_df, main_py_path, input_csv_path):
             "--crop",
             crop,
             "--operation_mode",
-            "scientific",
+            BATCH_OPTIONS["operation_mode"],
             "--source",
-            "external",
+            BATCH_OPTIONS["source"],
             "--num_runs",
-            "100",
+            str(BATCH_OPTIONS["num_runs"]),
             "-o",
             output_file,
         ]
+        if memory_profile:
+            command.append("--memory_profile")
+        if result_cache:
+            command.append("--result_cache")
+        if seed is not None:
+            command.extend(["--seed", str(seed)])
         subprocess.run(command, check=True)
+        output_files.append(output_file)
+    return output_files
 
 
 if __name__ == "__main__":
@@ -0,0 +1,554 @@
+"""
+This script runs the performance benchmarks of the calculators, the data loaders and the
+end-to-end pipeline, stores the timings as a named baseline and compares a run with a
+stored baseline, so that regressions such as reading a whole raster band instead of one
+pixel show up before they are merged.
+
+Every benchmark is timed `--repeat` times after one untimed warm-up call, and the median
+is compared. Benchmarks with a parameter, e.g. the number of samples, run once per value.
+The external-source runs answer POWER requests with a stub, so they measure the
+pipeline and not the network. Benchmarks whose data is not available, e.g. the HWSD2
+raster, are reported as errors and do not stop the run.
+
+Baselines are JSON files in 'data/benchmarks' that also record the platform and the
+Python and NumPy versions, as timings are only comparable on the same machine.
+
+Usage:
+    python scripts/benchmark.py --save baseline
+    python scripts/benchmark.py --compare baseline --threshold 1.2
+    python scripts/benchmark.py --filter aggregator --repeat 3
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import warnings
+from datetime import date, timedelta
+from unittest.mock import Mock, patch
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE_DIR = os.path.join(ROOT_DIR, "data", "benchmarks")
+INPUT_FILE = os.path.join(ROOT_DIR, "data", "test", "hypothetical_farm_data.csv")
+FARM = {
+    "longitude": -123.2373389,
+    "latitude": 49.99704167,
+    "province": "British Columbia",
+    "eco_id": 950,
+}
+SAMPLE_SIZES = [10, 100, 1000]
+
+BENCHMARKS = {}
+
+
+def benchmark(name, params=(None,)):
+    """
+    Registers a benchmark. The decorated function does the setup for one parameter
+    value and returns the callable to time.
+
+    Parameters
+    ----------
+    name : str
+        The name of the benchmark.
+    params : list, optional
+        The parameter values, e.g. sample sizes. Defaults to a single run without a
+        parameter.
+    """
+
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, list(params))
+        return setup
+
+    return decorator
+
+
+def farm_location_index():
+    from src.data_loader.location_index import LocationIndex
+
+    return LocationIndex(pd.DataFrame([FARM]))
+
+
+def farm_data(crop="Soybean"):
+    from src.data_loader.get_farm_data import FarmDataManager
+
+    data = FarmDataManager(
+        INPUT_FILE, "farm1", crop, location_index=farm_location_index()
+    ).farm_data
+    data["eco_id"] = FARM["eco_id"]
+    return data
+
+
+def scientific_data(num_samples, seed=0):
+    """
+    Returns scientific mode parameters of farm1 with `num_samples` samples, built from
+    the default climate and soil data so that no external data is needed.
+    """
+    from src.data_loader.get_full_params import FarmDataHub
+    from src.data_loader.get_modifiers import ModifiersManager
+    from src.data_loader.get_crop_params import CropParametersManager
+    from src.data_loader.get_crop_group_params import CropGroupManager
+    from src.data_loader.samplers import Sampler
+
+    farmer = FarmDataHub(
+        INPUT_FILE, "farm1", "Soybean", location_index=farm_location_index()
+    ).gather_all_data()
+    data = farm_data()
+    sampler = Sampler("mc", seed=seed)
+    climate_data = {
+        key: np.concatenate(
+            [value, value * (0.8 + 0.4 * sampler.draw(num_samples)[:, 0])]
+        )
+        for key, value in farmer["climate_data"].items()
+        if key != "locations"
+    }
+    climate_data["locations"] = np.repeat(
+        farmer["climate_data"]["locations"], num_samples + 1, axis=0
+    )
+    return {
+        "farm_data": farmer["farm_data"],
+        "crop_group_params": CropGroupManager(data).sample_crop_group_parameters(
+            num_samples=num_samples, sampler=sampler
+        ),
+        "crop_parameters": CropParametersManager(
+            data, farmer["climate_data"]
+        ).sample_crop_parameters(num_samples=num_samples, sampler=sampler),
+        "climate_data": climate_data,
+        "modifiers": ModifiersManager(data).sample_modifiers(
+            num_samples=num_samples, sampler=sampler
+        ),
+    }
+
+
+def stub_power_response(url, timeout=None):
+    """Answers a POWER request with a complete growing season of synthetic weather."""
+    start = date(2021, 5, 1)
+    days = [(start + timedelta(days=i)).strftime("%Y%m%d") for i in range(153)]
+    parameters = {
+        "PRECTOTCORR": {day: 2.5 for day in days},
+        "T2M": {day: 15.0 for day in days},
+        "RH2M": {day: 70.0 for day in days},
+        "ALLSKY_SFC_SW_DWN": {day: 18.0 for day in days},
+    }
+    content = json.dumps(
+        {
+            "header": {"start": days[0], "end": days[-1]},
+            "properties": {"parameter": parameters},
+        }
+    ).encode("utf-8")
+    return Mock(content=content, raise_for_status=Mock())
+
+
+@benchmark("crop_residue_aggregator", SAMPLE_SIZES)
+def crop_residue_aggregator(num_samples):
+    from src.calculator.crop_residue_aggregator import CropResidueAggregator
+
+    data = scientific_data(num_samples)
+    return lambda: CropResidueAggregator(data, "scientific").crop_analysis()
+
+
+@benchmark("emission_factor_aggregator", SAMPLE_SIZES)
+def emission_factor_aggregator(num_samples):
+    from src.calculator.emission_factor_aggregator import EmissionFactorAggregator
+
+    data = scientific_data(num_samples)
+    return lambda: EmissionFactorAggregator(data, "scientific").get_result()
+
+
+@benchmark("emission_aggregator", SAMPLE_SIZES)
+def emission_aggregator(num_samples):
+    from src.calculator.crop_residue_aggregator import CropResidueAggregator
+    from src.calculator.emission_factor_aggregator import EmissionFactorAggregator
+    from src.calculator.emission_aggregator import EmissionAggregator
+
+    data = scientific_data(num_samples)
+    n_data = CropResidueAggregator(data, "scientific").crop_analysis()
+    ef_data = EmissionFactorAggregator(data, "scientific").get_result()
+    return lambda: EmissionAggregator(ef_data, n_data, "scientific").get_result()
+
+
+@benchmark("batch_calculator", [100, 10000])
+def batch_calculator(num_farms):
+    from src.data_loader.get_full_params import FarmDataHub
+    from src.calculator.batch_calculator import BatchCalculator
+
+    one_farm = FarmDataHub.gather_many(
+        INPUT_FILE, [("farm1", "Soybean")], location_index=farm_location_index()
+    )
+    data = {
+        group: {key: np.repeat(value, num_farms, axis=0) for key, value in d.items()}
+        for group, d in one_farm.items()
+    }
+    return lambda: BatchCalculator(data).get_result()
+
+
+@benchmark("location_index_lookup", [1000, 100000])
+def location_index_lookup(num_points):
+    from src.data_loader.location_index import LocationIndex
+
+    rng = np.random.default_rng(0)
+    records = pd.DataFrame(
+        {
+            "longitude": rng.uniform(-140, -55, 10000),
+            "latitude": rng.uniform(42, 70, 10000),
+            "province": "British Columbia",
+            "eco_id": 950,
+        }
+    )
+    index = LocationIndex(records)
+    points = records.sample(num_points, replace=True, random_state=0)
+    return lambda: index.lookup_many(points["longitude"], points["latitude"])
+
+
+@benchmark("resolve_locations", [10, 1000])
+def resolve_locations(num_points):
+    from src.data_loader.location_index import resolve_locations as resolve
+
+    rng = np.random.default_rng(0)
+    longitudes = rng.uniform(-123.5, -122.5, num_points)
+    latitudes = rng.uniform(49.5, 50.5, num_points)
+    return lambda: resolve(longitudes, latitudes)
+
+
+@benchmark("hwsd2_soil_texture", [10, 100])
+def hwsd2_soil_texture(num_points):
+    from src.data_loader.get_external_soil_params import ExternalSoilTextureDataFetcher
+
+    rng = np.random.default_rng(0)
+    points = list(
+        zip(rng.uniform(-123.5, -122.5, num_points), rng.uniform(49.5, 50.5, num_points))
+    )
+    return lambda: ExternalSoilTextureDataFetcher(
+        points, rng=np.random.default_rng(0)
+    ).get_soil_texture_values()
+
+
+@benchmark("power_response")
+def power_response(_):
+    from src.data_loader.get_external_climate_params import ExternalClimateDataFetcher
+    from src.data_loader.power_response import parse_power_response
+
+    point = (FARM["longitude"], FARM["latitude"])
+    fetcher = ExternalClimateDataFetcher([point], 2021, 2021)
+    content = stub_power_response(None).content
+
+    def run():
+        # Decodes one growing season and reduces it to its totals
+        return fetcher.calculate_totals(
+            {
+                "success": True,
+                "data": parse_power_response(content),
+                "point": point,
+                "year": 2021,
+            }
+        )
+
+    return run
+
+
+@benchmark("parameter_managers", SAMPLE_SIZES)
+def parameter_managers(num_samples):
+    from src.data_loader.get_modifiers import ModifiersManager
+    from src.data_loader.get_crop_params import CropParametersManager
+    from src.data_loader.get_crop_group_params import CropGroupManager
+    from src.data_loader.samplers import Sampler
+
+    data = farm_data()
+    climate_data = {"P": np.array([512.0]), "PE": np.array([550.0])}
+
+    def run():
+        sampler = Sampler("mc", seed=0)
+        ModifiersManager(data).sample_modifiers(
+            num_samples=num_samples, sampler=sampler
+        )
+        CropParametersManager(data, climate_data).sample_crop_parameters(
+            num_samples=num_samples, sampler=sampler
+        )
+        CropGroupManager(data).sample_crop_group_parameters(
+            num_samples=num_samples, sampler=sampler
+        )
+
+    return run
+
+
+@benchmark("pipeline_default_farmer")
+def pipeline_default_farmer(_):
+    from main import calculate
+
+    location_index = farm_location_index()
+    return lambda: calculate(
+        INPUT_FILE, "farm1", "Soybean", location_index=location_index
+    )
+
+
+@benchmark("pipeline_external_farmer")
+def pipeline_external_farmer(_):
+    return external_pipeline("farmer", 10)
+
+
+@benchmark("pipeline_external_scientific", [16, 128])
+def pipeline_external_scientific(num_runs):
+    return external_pipeline("scientific", num_runs)
+
+
+def external_pipeline(operation_mode, num_runs):
+    from main import calculate
+    from src.data_loader.get_external_climate_params import clear_power_cache
+
+    location_index = farm_location_index()
+
+    def run():
+        # Every call fetches again instead of reading the POWER cache
+        clear_power_cache()
+        with patch(
+            "src.data_loader.get_external_climate_params.requests.get",
+            side_effect=stub_power_response,
+        ):
+            return calculate(
+                INPUT_FILE,
+                "farm1",
+                "Soybean",
+                source="external",
+                operation_mode=operation_mode,
+                num_runs=num_runs,
+                location_index=location_index,
+                seed=0,
+            )
+
+    return run
+
+
+def time_benchmark(run, repeat):
+    """
+    Times a callable after one untimed warm-up call.
+
+    Parameters
+    ----------
+    run : callable
+        The code to time.
+    repeat : int
+        The number of timed calls.
+
+    Returns
+    -------
+    dict
+        The 'median', 'min' and 'max' time in seconds and the number of 'repeat's.
+    """
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        "median": float(np.median(times)),
+        "min": float(np.min(times)),
+        "max": float(np.max(times)),
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(names=None, repeat=5):
+    """
+    Runs the selected benchmarks.
+
+    Parameters
+    ----------
+    names : list of str, optional
+        Substrings selecting benchmarks by name. Defaults to all benchmarks.
+    repeat : int, optional
+        The number of timed calls of each benchmark. Defaults to 5.
+
+    Returns
+    -------
+    dict
+        The timings of each benchmark, keyed like 'name[param]', or its 'error'.
+    """
+    results = {}
+    for name, (setup, params) in BENCHMARKS.items():
+        if names and not any(selected in name for selected in names):
+            continue
+        for param in params:
+            key = name if param is None else f"{name}[{param}]"
+            print(f"Running {key}", file=sys.stderr)
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    results[key] = time_benchmark(setup(param), repeat)
+            except Exception as e:  # pylint: disable=broad-except
+                results[key] = {"error": f"{type(e).__name__}: {e}"}
+    return results
+
+
+def machine_info():
+    """Returns the platform and the Python and NumPy versions of this machine."""
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def compare(results, baseline, threshold=1.2):
+    """
+    Compares benchmark results with a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The output of `run_benchmarks`.
+    baseline : dict
+        Stored results of an earlier run.
+    threshold : float, optional
+        The ratio of median times above which a benchmark counts as a regression, and
+        below whose inverse it counts as an improvement. Defaults to 1.2.
+
+    Returns
+    -------
+    list of dict
+        One row per benchmark with its 'name', 'median', 'baseline' median, 'ratio'
+        and 'status' ('regression', 'improvement', 'ok', 'new' or 'error').
+    """
+    rows = []
+    for name, result in results.items():
+        row = {"name": name, "median": None, "baseline": None, "ratio": None}
+        previous = baseline.get(name, {})
+        if "error" in result:
+            row["status"] = "error"
+        else:
+            row["median"] = result["median"]
+            if "median" not in previous:
+                row["status"] = "new"
+            else:
+                row["baseline"] = previous["median"]
+                row["ratio"] = result["median"] / previous["median"]
+                if row["ratio"] > threshold:
+                    row["status"] = "regression"
+                elif row["ratio"] < 1 / threshold:
+                    row["status"] = "improvement"
+                else:
+                    row["status"] = "ok"
+        rows.append(row)
+    return rows
+
+
+def format_table(rows):
+    """
+    Formats the rows of `compare` as a plain text table with times in milliseconds.
+
+    Parameters
+    ----------
+    rows : list of dict
+        The comparison rows.
+
+    Returns
+    -------
+    str
+        The table.
+    """
+
+    def milliseconds(value):
+        return "-" if value is None else f"{1000 * value:.2f}"
+
+    lines = [
+        [
+            row["name"],
+            milliseconds(row["median"]),
+            milliseconds(row["baseline"]),
+            "-" if row["ratio"] is None else f"{row['ratio']:.2f}x",
+            row["status"],
+        ]
+        for row in rows
+    ]
+    header = ["benchmark", "median (ms)", "baseline (ms)", "ratio", "status"]
+    widths = [max(len(line[i]) for line in lines + [header]) for i in range(5)]
+    table = [
+        "  ".join(cell.ljust(width) for cell, width in zip(line, widths))
+        for line in [header, ["-" * width for width in widths]] + lines
+    ]
+    return "\n".join(table)
+
+
+def baseline_path(name):
+    """Returns the path of a named baseline file."""
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks")
+    parser.add_argument(
+        "--filter",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Run only benchmarks whose name contains one of these strings",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Number of timed calls per benchmark"
+    )
+    parser.add_argument(
+        "--save", type=str, default=None, help="Store the results as this baseline"
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default="baseline",
+        help="Name of the baseline to compare with",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="Ratio of median times that counts as a regression",
+    )
+    parser.add_argument(
+        "--fail_on_regression",
+        action="store_true",
+        help="Exit with status 1 if a benchmark regressed",
+    )
+    parser.add_argument("--list", action="store_true", help="List the benchmarks")
+    args = parser.parse_args()
+
+    if args.list:
+        for benchmark_name, (_, benchmark_params) in BENCHMARKS.items():
+            print(benchmark_name, *(p for p in benchmark_params if p is not None))
+        sys.exit(0)
+
+    benchmark_results = run_benchmarks(args.filter, args.repeat)
+
+    baseline_results = {}
+    if os.path.exists(baseline_path(args.compare)):
+        with open(baseline_path(args.compare), "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline_results = stored["results"]
+        if stored["machine"] != machine_info():
+            print(
+                f"Baseline '{args.compare}' was recorded on another machine: "
+                f"{stored['machine']}",
+                file=sys.stderr,
+            )
+    comparison = compare(benchmark_results, baseline_results, args.threshold)
+    print(format_table(comparison))
+    for row, result in zip(comparison, benchmark_results.values()):
+        if row["status"] == "error":
+            print(f"{row['name']}: {result['error']}", file=sys.stderr)
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path(args.save), "w", encoding="utf-8") as f:
+            json.dump(
+                {"machine": machine_info(), "results": benchmark_results}, f, indent=4
+            )
+        print(f"Results saved to {baseline_path(args.save)}", file=sys.stderr)
+
+    if args.fail_on_regression and any(
+        row["status"] == "regression" for row in comparison
+    ):
+        sys.exit(1)
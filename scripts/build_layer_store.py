@@ -0,0 +1,61 @@
+"""
+This script converts the bundled province and ecodistrict shapefiles to fast-loading
+layers in 'data/preprocessed/layers'. The layers are reprojected to EPSG:4326, trimmed
+to the columns used by the calculator and stored with the checksum of their shapefile,
+so that the data loaders skip parsing and reprojecting the shapefiles of every farm.
+
+Re-run the script after updating the shapefiles in 'data/external'. Until then, the
+loaders detect the changed checksum and read the shapefiles directly.
+
+Usage:
+    python scripts/build_layer_store.py
+    python scripts/build_layer_store.py --layers province_10m
+"""
+
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader.layer_store import EXTERNAL_DIR, LAYERS, STORE_DIR, write_layer
+
+
+def build_layer_store(layers=None, store_dir=STORE_DIR):
+    """
+    Converts shapefiles of 'data/external' to stored layers.
+
+    Parameters
+    ----------
+    layers : list of str, optional
+        The names of the layers to convert. Defaults to every layer of `LAYERS`.
+    store_dir : str, optional
+        The folder of the stored layers.
+
+    Returns
+    -------
+    list of str
+        The paths of the stored layers.
+    """
+    return [
+        write_layer(os.path.join(EXTERNAL_DIR, name), LAYERS[name], store_dir=store_dir)
+        for name in layers or LAYERS
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the preprocessed layer store")
+    parser.add_argument(
+        "--layers",
+        type=str,
+        nargs="+",
+        choices=list(LAYERS),
+        default=None,
+        help="Layers to convert, by default all",
+    )
+    parser.add_argument(
+        "--store", type=str, default=STORE_DIR, help="Folder of the stored layers"
+    )
+    args = parser.parse_args()
+
+    for path in build_layer_store(args.layers, args.store):
+        print(f"Stored {path}")
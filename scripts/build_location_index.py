@@ -0,0 +1,64 @@
+"""
+This script precomputes the province and ecodistrict of every farm location in an input
+CSV file and stores them in 'data/preprocessed/location_index.csv'. Farms whose location
+is in the index are resolved without loading the province and ecodistrict shapefiles,
+which keeps single farmer-mode runs fast.
+
+Re-run the script whenever new farm locations are added to the input data. Existing
+entries of the index are kept and updated.
+
+Usage:
+    python scripts/build_location_index.py -i data/test/hypothetical_farm_data.csv
+"""
+
+import os
+import sys
+import argparse
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader.location_index import (
+    LocationIndex,
+    DEFAULT_INDEX_PATH,
+    resolve_locations,
+)
+
+
+def build_location_index(input_csv, index_path=DEFAULT_INDEX_PATH):
+    """
+    Adds the locations of all farms in `input_csv` to the location index.
+
+    Parameters
+    ----------
+    input_csv : str
+        Path to a farm CSV file with 'latitude' and 'longitude' columns.
+    index_path : str, optional
+        The location index to update.
+
+    Returns
+    -------
+    LocationIndex
+        The updated index.
+    """
+    farms = pd.read_csv(input_csv, usecols=["longitude", "latitude"])
+    farms = farms.drop_duplicates()
+    index = LocationIndex.load(index_path)
+    locations = resolve_locations(farms["longitude"], farms["latitude"])
+    # Points outside Canada or outside any ecodistrict are not indexed
+    index.update(locations.dropna(subset=["province", "eco_id"]))
+    index.save(index_path)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the farm location index")
+    parser.add_argument(
+        "-i", "--input", type=str, required=True, help="Input farm CSV file"
+    )
+    parser.add_argument(
+        "--index", type=str, default=DEFAULT_INDEX_PATH, help="Location index file"
+    )
+    args = parser.parse_args()
+
+    location_index = build_location_index(args.input, args.index)
+    print(f"{len(location_index.locations)} locations saved to {args.index}")
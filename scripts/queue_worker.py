@@ -0,0 +1,88 @@
+"""
+This script runs a worker of the SQLite work queue of 'src/work_queue.py', or fills and
+inspects the queue. Start one worker per core on the machine that holds the queue
+file, which must be on a local disk rather than a network file system; each worker
+claims a task, runs it with main.py, records its output file and claims the next one
+until the queue is drained. Tasks of workers that were killed are retried once their
+lease expires.
+
+Usage:
+    python scripts/queue_worker.py --enqueue ../data/test/hypothetical_farm_data.csv
+    python scripts/queue_worker.py --wait
+    python scripts/queue_worker.py --status
+"""
+
+import os
+import sys
+import argparse
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.work_queue import DEFAULT_QUEUE_PATH, WorkQueue, run_worker
+from batch_processing import enqueue_batch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a worker of the work queue")
+    parser.add_argument(
+        "--queue", type=str, default=DEFAULT_QUEUE_PATH, help="SQLite file of the queue"
+    )
+    parser.add_argument(
+        "--enqueue",
+        type=str,
+        default=None,
+        metavar="INPUT_CSV",
+        help="Add a task per row of an input CSV file, relative to this script",
+    )
+    parser.add_argument(
+        "--result_cache",
+        action="store_true",
+        help="Enqueued tasks reuse and store their outputs in the result store",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed of the enqueued tasks"
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Print the number of tasks per state"
+    )
+    parser.add_argument(
+        "--retry_failed", action="store_true", help="Make the failed tasks pending"
+    )
+    parser.add_argument(
+        "--worker", type=str, default=None, help="Worker name, by default host-pid"
+    )
+    parser.add_argument(
+        "--max_tasks", type=int, default=None, help="Stop after this many tasks"
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep polling until the tasks leased by other workers are done",
+    )
+    parser.add_argument(
+        "--poll_interval", type=float, default=5.0, help="Seconds between polls"
+    )
+    args = parser.parse_args()
+
+    if args.enqueue or args.status or args.retry_failed:
+        if args.enqueue:
+            added = enqueue_batch(
+                args.enqueue, args.queue, args.result_cache, args.seed
+            )
+            print(f"Added {added} tasks to {args.queue}")
+        if args.retry_failed:
+            print(f"Released {WorkQueue(args.queue).retry_failed()} failed tasks")
+        if args.status:
+            print(json.dumps(WorkQueue(args.queue).status(), indent=4))
+    else:
+        outcomes = run_worker(
+            args.queue,
+            worker=args.worker,
+            max_tasks=args.max_tasks,
+            wait=args.wait,
+            poll_interval=args.poll_interval,
+        )
+        print(
+            f"Completed {outcomes['completed']}, failed {outcomes['failed']} and lost "
+            f"{outcomes['lost']} tasks"
+        )
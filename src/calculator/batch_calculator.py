@@ -0,0 +1,274 @@
+import numpy as np
+
+CROP_GROUPS = ["annual", "perennial", "root", "cover", "silage"]
+
+
+class BatchCalculator:
+    """
+    Calculates the crop residue nitrogen, emission factors and direct nitrogen emissions
+    of many farms at once in farmer's mode. Each equation of CropResidueCalculator,
+    EmissionFactorCalculator and EmissionCalculator is applied to whole arrays, so
+    that the columnar output of `FarmDataHub.gather_many` is consumed directly.
+
+    Parameters
+    ----------
+    data : dict
+        Farm parameters with the structure of `FarmDataHub.gather_many`, where every
+        array holds one value per farm.
+
+    Attributes
+    ----------
+    data : dict
+        The validated input data.
+    group : numpy.ndarray
+        Lower-case crop group of each farm.
+
+    Methods
+    -------
+    validate_input(data)
+        Validates the crop groups, areas, yields and moisture contents of all farms.
+    crop_residue()
+        Calculates the crop residue carbon and nitrogen of each farm.
+    emission_factors(P=None, PE=None)
+        Calculates the emission factors of each farm.
+    emissions(ef_data, n_data)
+        Calculates the direct nitrogen emissions and their N2O and CO2 equivalents.
+    get_result()
+        Returns the crop residue, emission factors and emissions of each farm.
+    get_time_series()
+        Returns the emission factors and emissions of each farm and year.
+
+    Examples
+    --------
+    >>> data = FarmDataHub.gather_many("data/test/hypothetical_farm_data.csv")
+    >>> result = BatchCalculator(data).get_result()
+    >>> result["Total Direct Nitrogen Emission"]["co2_crop_direct"]
+    array([1903.4719011 , ...])
+    """
+
+    def __init__(self, data):
+        self.validate_input(data)
+        self.data = data
+        self.group = np.char.lower(np.asarray(data["farm_data"]["group"], dtype=str))
+
+    def validate_input(self, data):
+        """
+        Validates the crop groups, areas, yields and moisture contents of all farms.
+
+        Parameters
+        ----------
+        data : dict
+            The input data to validate.
+
+        Raises
+        ------
+        ValueError
+            If a crop group is unknown or a value is out of range.
+        """
+        groups = np.char.lower(np.asarray(data["farm_data"]["group"], dtype=str))
+        if not np.isin(groups, CROP_GROUPS).all():
+            raise ValueError(
+                "group must be one of 'annual', 'perennial', 'root', 'cover', 'silage'"
+            )
+        if np.any(data["farm_data"]["area"] < 0):
+            raise ValueError("Area must be non-negative")
+        if np.any(data["farm_data"]["yield"] < 0):
+            raise ValueError("Yield must be non-negative")
+        moisture = data["crop_parameters"]["moisture"]
+        if np.any((moisture < 0) | (moisture > 100)):
+            raise ValueError("Moisture must be between 0 and 100")
+
+    def crop_residue(self):
+        """
+        Calculates the crop residue carbon and nitrogen of each farm.
+        Equations 2.1.2-1 to 2.1.2-19 and 2.5.6-2 to 2.5.6-9 in the Holos version 4.0
+        algorithm document.
+
+        Returns
+        -------
+        dict
+            'C_p', 'above_ground_carbon_input', 'below_ground_carbon_input',
+            'above_ground_residue_n', 'below_ground_residue_n' and 'n_crop_residue',
+            each with one value per farm.
+        """
+        farm = self.data["farm_data"]
+        group_params = self.data["crop_group_params"]
+        crop_params = self.data["crop_parameters"]
+        crop_yield = farm["yield"]
+        moisture = crop_params["moisture"]
+        carbon_concentration = group_params["carbon_concentration"]
+        S_p, S_s, S_r = group_params["S_p"], group_params["S_s"], group_params["S_r"]
+        R_p = crop_params["R_p"]
+
+        C_p = np.where(
+            np.abs(S_p - 100) < 1e-5,
+            crop_yield * (1 - moisture / 100) * carbon_concentration,
+            (crop_yield + crop_yield * S_p / 100)
+            * (1 - moisture / 100)
+            * carbon_concentration,
+        )
+        C_p_to_soil = C_p * (S_p / 100)
+
+        no_product = np.abs(R_p) < 1e-6
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R_s, R_r, R_e = crop_params["R_s"], crop_params["R_r"], crop_params["R_e"]
+            C_s = np.where(no_product, 0, C_p * (R_s / R_p) * (S_s / 100))
+            C_r = np.where(no_product, 0, C_p * (R_r / R_p) * (S_r / 100))
+            C_e = np.where(no_product, 0, C_p * (R_e / R_p))
+
+        grain_n = (C_p_to_soil / 0.45) * (crop_params["N_p"] / 1000)
+        straw_n = (C_s / 0.45) * (crop_params["N_s"] / 1000)
+        root_n = (C_r / 0.45) * (crop_params["N_r"] / 1000)
+        exudate_n = (C_e / 0.45) * (crop_params["N_e"] / 1000)
+
+        is_root = self.group == "root"
+        is_cover = np.isin(self.group, ["cover", "silage"])
+        above_ground_residue_n = np.select(
+            [np.isin(self.group, ["annual", "perennial"]), is_root, is_cover],
+            [grain_n + straw_n, straw_n, grain_n],
+            0,
+        )
+        below_ground_residue_n = np.select(
+            [self.group == "annual", self.group == "perennial", is_root, is_cover],
+            [
+                root_n + exudate_n,
+                root_n * (S_r / 100) + exudate_n,
+                grain_n + exudate_n,
+                root_n + exudate_n,
+            ],
+            0,
+        )
+
+        return {
+            "C_p": C_p,
+            "above_ground_carbon_input": np.where(is_root, C_s, C_p_to_soil + C_s),
+            "below_ground_carbon_input": np.where(
+                is_root, C_p_to_soil + C_e, C_r + C_e
+            ),
+            "above_ground_residue_n": above_ground_residue_n,
+            "below_ground_residue_n": below_ground_residue_n,
+            "n_crop_residue": (above_ground_residue_n + below_ground_residue_n)
+            * farm["area"],
+        }
+
+    def emission_factors(self, P=None, PE=None):
+        """
+        Calculates the emission factors of each farm.
+        Equations 2.5.1-1 to 2.5.4-1 in the Holos version 4.0 algorithm document.
+
+        Parameters
+        ----------
+        P, PE : numpy.ndarray, optional
+            Precipitation and potential evapotranspiration with one row per farm and
+            any further axes, e.g. one column per year. Default to the 'P' and 'PE'
+            of the climate data.
+
+        Returns
+        -------
+        dict
+            'EF_CT_P', 'EF_CT_PE', 'EF_Topo' and 'EF', each with the shape of `P`.
+        """
+        climate = self.data["climate_data"]
+        modifiers = self.data["modifiers"]
+        if P is None:
+            P, PE = climate["P"], climate["PE"]
+
+        def per_farm(values):
+            # Farm values broadcast along the further axes of P
+            return np.reshape(values, (-1,) + (1,) * (np.ndim(P) - 1))
+
+        FR_Topo = per_farm(climate["FR_Topo"])
+        EF_CT_P = np.exp(0.00558 * P - 7.7)
+        EF_CT_PE = np.exp(0.00558 * PE - 7.7)
+        EF_Topo = np.select(
+            [P / PE > 1, P == PE],
+            [EF_CT_P, EF_CT_PE],
+            (EF_CT_PE * FR_Topo / 100) + (EF_CT_P * (1 - FR_Topo / 100)),
+        )
+        EF_base = (EF_Topo * per_farm(climate["soil_texture"])) * (1 / 0.645)
+        EF = (
+            EF_base
+            * per_farm(modifiers["RF_NS"])
+            * per_farm(modifiers["RF_Till"])
+            * per_farm(modifiers["RF_CS"])
+            * per_farm(modifiers["RF_AM"])
+        )
+        return {"EF_CT_P": EF_CT_P, "EF_CT_PE": EF_CT_PE, "EF_Topo": EF_Topo, "EF": EF}
+
+    @staticmethod
+    def emissions(ef_data, n_data):
+        """
+        Calculates the direct nitrogen emissions and their N2O and CO2 equivalents.
+        Equations 2.6.5-2 and 2.6.9-1 in the Holos version 4.0 technical report.
+
+        Parameters
+        ----------
+        ef_data : dict
+            Emission factors with an 'EF' array.
+        n_data : dict
+            Crop residue nitrogen with an 'n_crop_residue' array.
+
+        Returns
+        -------
+        dict
+            'n_crop_direct', 'no2_crop_direct' and 'co2_crop_direct', each with one
+            value per farm.
+        """
+        n_crop_direct = n_data["n_crop_residue"] * ef_data["EF"]
+        no2_crop_direct = n_crop_direct * (44 / 28)
+        return {
+            "n_crop_direct": n_crop_direct,
+            "no2_crop_direct": no2_crop_direct,
+            "co2_crop_direct": no2_crop_direct * 273,
+        }
+
+    def get_result(self):
+        """
+        Returns the crop residue, emission factors and emissions of each farm, keyed
+        like the output of `main.main`.
+
+        Returns
+        -------
+        dict
+            'Crop Nitrogen Residue', 'Emission Factors' and
+            'Total Direct Nitrogen Emission'.
+        """
+        crop_residue = self.crop_residue()
+        emission_factor = self.emission_factors()
+        return {
+            "Crop Nitrogen Residue": crop_residue,
+            "Emission Factors": emission_factor,
+            "Total Direct Nitrogen Emission": self.emissions(
+                emission_factor, crop_residue
+            ),
+        }
+
+    def get_time_series(self):
+        """
+        Returns the emission factors and emissions of each farm and year, evaluated for
+        all years at once from the 'P_by_year' and 'PE_by_year' climate data of
+        `FarmDataHub.gather_many(..., by_year=True)`. The crop residue and its crop
+        parameters do not depend on the year.
+
+        Returns
+        -------
+        dict
+            'years', the years from the earliest start year to the latest end year of
+            all farms, and 'Emission Factors' and 'Total Direct Nitrogen Emission',
+            each array with one row per farm and one column per year. Years outside
+            a farm's start and end year are NaN.
+        """
+        farm = self.data["farm_data"]
+        climate = self.data["climate_data"]
+        years = np.arange(farm["start_year"].min(), farm["end_year"].max() + 1)
+        emission_factor = self.emission_factors(
+            climate["P_by_year"], climate["PE_by_year"]
+        )
+        n_crop_residue = self.crop_residue()["n_crop_residue"][:, np.newaxis]
+        return {
+            "years": years,
+            "Emission Factors": emission_factor,
+            "Total Direct Nitrogen Emission": self.emissions(
+                emission_factor, {"n_crop_residue": n_crop_residue}
+            ),
+        }
@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class ConvergenceMonitor:
+    """
+    Tracks the mean and quantiles of scientific mode outputs while runs are added in
+    batches, and decides when they have stabilized.
+
+    After each batch, the statistics of every sampled variable are recomputed over all
+    runs so far. The outputs have converged once no statistic moved by more than
+    `tolerance`, relative to its value, since the previous batch.
+
+    Parameters
+    ----------
+    tolerance : float, optional
+        The largest relative change of a statistic between two batches that counts as
+        converged. Defaults to 0.01.
+    quantiles : list of float, optional
+        The quantiles to track in addition to the mean. Defaults to [0.05, 0.5, 0.95].
+
+    Attributes
+    ----------
+    trace : list of dict
+        One record per batch with the number of runs, the statistics of each variable
+        and the largest relative change since the previous batch (None for the first).
+    converged : bool
+        Whether the last batch met the tolerance.
+
+    Methods
+    -------
+    statistics(values)
+        Returns the mean and quantiles of an array of outputs.
+    update(outputs, **details)
+        Records the statistics of all runs so far and checks convergence.
+
+    Examples
+    --------
+    >>> monitor = ConvergenceMonitor(tolerance=0.01)
+    >>> monitor.update({"P": co2_first_batch})["max_relative_change"] is None
+    True
+    """
+
+    def __init__(self, tolerance=0.01, quantiles=(0.05, 0.5, 0.95)):
+        if tolerance <= 0:
+            raise ValueError("tolerance must be positive.")
+        if not all(0 <= q <= 1 for q in quantiles):
+            raise ValueError("quantiles must be between 0 and 1.")
+        self.tolerance = tolerance
+        self.quantiles = list(quantiles)
+        self.trace = []
+        self.converged = False
+
+    def statistics(self, values):
+        """
+        Returns the mean and quantiles of an array of outputs.
+
+        Parameters
+        ----------
+        values : numpy.ndarray or StreamingStatistics
+            The outputs of all runs so far, or their streaming statistics.
+
+        Returns
+        -------
+        dict
+            'mean' and one 'q<percent>' entry per quantile, e.g. 'q5' and 'q95'.
+        """
+        if hasattr(values, "quantile"):
+            mean, quantiles = values.mean, values.quantile(self.quantiles)
+        else:
+            values = np.asarray(values, dtype=np.float64)
+            mean, quantiles = np.mean(values), np.quantile(values, self.quantiles)
+        stats = {"mean": float(mean)}
+        for q, value in zip(self.quantiles, np.atleast_1d(quantiles)):
+            stats[f"q{100 * q:g}"] = float(value)
+        return stats
+
+    def update(self, outputs, **details):
+        """
+        Records the statistics of all runs so far and checks convergence.
+
+        Parameters
+        ----------
+        outputs : dict
+            The outputs of all runs so far for each sampled variable, as arrays or
+            StreamingStatistics.
+        **details
+            Further entries of the trace record, e.g. elapsed time or fetches.
+
+        Returns
+        -------
+        dict
+            The trace record of this batch.
+        """
+        stats = {name: self.statistics(values) for name, values in outputs.items()}
+        change = None
+        if self.trace:
+            previous = self.trace[-1]["statistics"]
+            changes = [
+                abs(value - previous[name][key])
+                / max(abs(previous[name][key]), np.finfo(float).tiny)
+                if value != previous[name][key]
+                else 0.0
+                for name, values in stats.items()
+                for key, value in values.items()
+            ]
+            change = float(max(changes, default=0.0))
+        self.converged = change is not None and change <= self.tolerance
+        record = {
+            "num_runs": int(
+                max(
+                    values.count if hasattr(values, "quantile") else len(values)
+                    for values in outputs.values()
+                )
+            ),
+            "statistics": stats,
+            "max_relative_change": change,
+            **details,
+        }
+        self.trace.append(record)
+        return record
@@ -6,6 +6,7 @@ import warnings
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from src.calculator.crop_residue_calculator import CropResidueCalculator
+from src.instrumentation import timed
 
 
 class CropResidueAggregator:
@@ -177,6 +178,7 @@ class CropResidueAggregator:
 
         return baseline
 
+    @timed("crop_residue")
     def crop_analysis(self):
         """
         Determines calculation mode and executes accordingly.
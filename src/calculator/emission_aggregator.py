@@ -4,6 +4,7 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from src.calculator.emission_calculator import EmissionCalculator
+from src.instrumentation import timed
 
 
 class EmissionAggregator:
@@ -110,6 +111,7 @@ class EmissionAggregator:
 
         return self.results
 
+    @timed("emissions")
     def get_result(self):
         """
         Returns the analyzed results according to the specified mode. If mode is 'farmer',
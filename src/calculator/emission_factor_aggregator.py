@@ -4,6 +4,7 @@ import numpy as np
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from src.calculator.emission_factor_calculator import EmissionFactorCalculator
+from src.instrumentation import timed
 
 
 class EmissionFactorAggregator:
@@ -110,6 +111,7 @@ class EmissionFactorAggregator:
 
         return self.results
 
+    @timed("emission_factors")
     def get_result(self):
         """
         Compiles and returns results based on the operation mode.
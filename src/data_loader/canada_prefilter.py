@@ -0,0 +1,138 @@
+"""
+This module rejects farm locations that are certainly outside Canada before any
+spatial join. Two cheap tests are applied to all points at once:
+
+- the bounding box of Canada, which rejects points on other continents, in the
+  oceans or with swapped or invalid coordinates;
+- the side of the US-Canada boundary line of 'data/external/ca_us_border'. The line
+  is reduced to a southern envelope, the lowest latitude of the boundary in each
+  narrow band of longitude. Within the bands crossed by the boundary south of the
+  Alaska sections, Canadian territory lies north of the boundary, so a point south
+  of the envelope of its band is in the United States or at sea.
+
+Both tests are conservative: points they keep may still be outside Canada and are
+left to the province lookup, but no Canadian point is rejected. Bands near the ends of
+the boundary line, where the Canadian coast continues beyond it, are not tested.
+
+Functions
+---------
+outside_canada(longitudes, latitudes)
+    Returns which points are certainly outside Canada.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_layer
+from src.instrumentation import count
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "external")
+BORDER = os.path.join(DATA_DIR, "ca_us_border")
+# (west, south, east, north) of Canada in degrees, with a margin of about 1 km
+CANADA_BOUNDS = (-141.02, 41.66, -52.6, 83.12)
+# The boundary sections north of this latitude border Alaska
+ALASKA_LATITUDE = 52.0
+# Width in degrees of the longitude bands of the envelope
+BAND_WIDTH = 0.01
+# Bands this close in degrees to the ends of the boundary line are not tested
+END_MARGIN = 0.1
+# Margin in degrees south of the envelope, which absorbs datum differences
+BORDER_TOLERANCE = 0.001
+
+# The southern envelope of the loaded border layers, by layer
+_envelopes = {}
+
+
+def _southern_envelope(layer):
+    """Returns the west end, and the lowest boundary latitude of each band."""
+    import shapely
+
+    if id(layer) not in _envelopes:
+        lines = shapely.get_parts(layer.geometry.values)
+        coords, part = shapely.get_coordinates(lines, return_index=True)
+        # Segments join consecutive vertices of the same line
+        same_line = part[1:] == part[:-1]
+        start, end = coords[:-1][same_line], coords[1:][same_line]
+        south = np.maximum(start[:, 1], end[:, 1]) < ALASKA_LATITUDE
+        start, end = start[south], end[south]
+
+        west = np.minimum(start[:, 0], end[:, 0])
+        east = np.maximum(start[:, 0], end[:, 0])
+        origin = west.min()
+        first = ((west - origin) // BAND_WIDTH).astype(np.int64)
+        last = ((east - origin) // BAND_WIDTH).astype(np.int64)
+        envelope = np.full(last.max() + 1, np.inf)
+        # A segment covers every band between its ends, at no lower latitude than its
+        # lowest vertex
+        spans = last - first + 1
+        bands = np.repeat(first, spans) + (
+            np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        )
+        lowest = np.repeat(np.minimum(start[:, 1], end[:, 1]), spans)
+        np.minimum.at(envelope, bands, lowest)
+
+        # Bands without boundary or near its ends are never rejected
+        envelope[np.isinf(envelope)] = -np.inf
+        margin = int(np.ceil(END_MARGIN / BAND_WIDTH))
+        envelope[:margin] = -np.inf
+        envelope[-margin:] = -np.inf
+        # The layer is kept with its envelope so that its id is not reused
+        _envelopes.clear()
+        _envelopes[id(layer)] = (layer, origin, envelope)
+    return _envelopes[id(layer)][1:]
+
+
+def outside_canada(longitudes, latitudes, tolerance=BORDER_TOLERANCE):
+    """
+    Returns which points are certainly outside Canada, from the bounding box of
+    Canada and the side of the US-Canada boundary they are on.
+
+    Parameters
+    ----------
+    longitudes : array-like of float
+        Longitudes of the points.
+    latitudes : array-like of float
+        Latitudes of the points.
+    tolerance : float, optional
+        Distance in degrees south of the boundary envelope beyond which points are
+        rejected. Defaults to `BORDER_TOLERANCE`.
+
+    Returns
+    -------
+    numpy.ndarray
+        True for each point outside Canada, including points with missing
+        coordinates. False points may still be outside Canada.
+    """
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+    west, south, east, north = CANADA_BOUNDS
+    # Comparisons with NaN are False, so missing coordinates are rejected
+    inside = (
+        (longitudes >= west)
+        & (longitudes <= east)
+        & (latitudes >= south)
+        & (latitudes <= north)
+    )
+
+    if inside.any():
+        origin, envelope = _southern_envelope(load_reference_layer(BORDER))
+        bands = np.floor((longitudes[inside] - origin) / BAND_WIDTH)
+        crossed = (bands >= 0) & (bands < len(envelope))
+        below = np.zeros(len(bands), dtype=bool)
+        below[crossed] = (
+            latitudes[inside][crossed]
+            < envelope[bands[crossed].astype(np.int64)] - tolerance
+        )
+        inside[np.flatnonzero(inside)[below]] = False
+
+    outside = ~inside
+    count("canada_prefilter.rejected", int(outside.sum()))
+    return outside
+
+
+# Example usage
+if __name__ == "__main__":
+    # A farm in British Columbia, Seattle and a point in the Atlantic
+    print(outside_canada([-123.2373389, -122.33, -40.0], [49.99704167, 47.61, 45.0]))
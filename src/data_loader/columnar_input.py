@@ -0,0 +1,157 @@
+"""
+This module reads farm input files in the columnar Parquet and Arrow (Feather) formats,
+as exported by data warehouses, without converting them to CSV first.
+
+The selection of farms and crops is pushed down to the reader as a filter on the
+'farm_id' and 'common_crop_name' columns, so that Parquet row groups whose statistics
+exclude the selected farms are skipped without being read or decoded. Only the columns
+of `INPUT_COLUMNS` are read, and their types are checked against the file's schema:
+the keys must be strings and the other columns numbers.
+
+Reading these formats requires the optional `pyarrow` package.
+
+Functions
+---------
+is_columnar_input(path)
+    Returns whether an input file is in a columnar format.
+read_columnar_input(path, farms=None, farm_id=None)
+    Reads the rows of selected farms and crops from a columnar input file.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.instrumentation import count, timed
+
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "ipc",
+    ".feather": "ipc",
+}
+INPUT_COLUMNS = {
+    "farm_id": str,
+    "common_crop_name": str,
+    "yield_kg_per_m2": np.float64,
+    "area_in_m2": np.float64,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "start_year": np.int64,
+    "end_year": np.int64,
+}
+
+
+def _import_pyarrow_dataset():
+    try:
+        import pyarrow.dataset as ds
+    except ImportError as error:
+        raise ImportError(
+            "Reading Parquet and Arrow input files requires the 'pyarrow' package, "
+            "e.g. 'conda install pyarrow'"
+        ) from error
+    return ds
+
+
+def is_columnar_input(path):
+    """
+    Returns whether an input file is in a columnar format.
+
+    Parameters
+    ----------
+    path : str
+        Path to the input file.
+
+    Returns
+    -------
+    bool
+        True for '.parquet', '.pq', '.arrow' and '.feather' files.
+    """
+    return os.path.splitext(path)[1].lower() in COLUMNAR_FORMATS
+
+
+def _check_schema(schema):
+    import pyarrow as pa
+
+    missing = [name for name in INPUT_COLUMNS if name not in schema.names]
+    if missing:
+        raise ValueError(f"Input file lacks the columns {missing}")
+    for name, dtype in INPUT_COLUMNS.items():
+        field_type = schema.field(name).type
+        if dtype is str:
+            valid = pa.types.is_string(field_type) or pa.types.is_large_string(
+                field_type
+            )
+        else:
+            valid = pa.types.is_integer(field_type) or pa.types.is_floating(field_type)
+        if not valid:
+            raise ValueError(f"Column '{name}' has the unexpected type {field_type}")
+
+
+@timed("columnar_input")
+def read_columnar_input(path, farms=None, farm_id=None):
+    """
+    Reads the rows of selected farms and crops from a columnar input file, pushing
+    the selection down to the reader.
+
+    Parameters
+    ----------
+    path : str
+        Path to the Parquet or Arrow file.
+    farms : list of tuple, optional
+        The (farm_id, crop) pairs to read. By default every row is read.
+    farm_id : str, optional
+        Reads only the rows of this farm.
+
+    Returns
+    -------
+    DataFrame
+        The columns of `INPUT_COLUMNS` with their types, one row per selected row of
+        the file, in the order of the file.
+
+    Raises
+    ------
+    ImportError
+        If `pyarrow` is not installed.
+    ValueError
+        If a column is missing or has an unexpected type.
+    """
+    ds = _import_pyarrow_dataset()
+    file_format = COLUMNAR_FORMATS.get(os.path.splitext(path)[1].lower(), "parquet")
+    dataset = ds.dataset(path, format=file_format)
+    _check_schema(dataset.schema)
+
+    expression = None
+    if farms is not None:
+        farms = list(farms)
+        farm_ids = list(dict.fromkeys(farm for farm, _ in farms))
+        crops = list(dict.fromkeys(crop for _, crop in farms))
+        expression = ds.field("farm_id").isin(farm_ids) & (
+            ds.field("common_crop_name").isin(crops)
+        )
+    if farm_id is not None:
+        selection = ds.field("farm_id") == farm_id
+        expression = selection if expression is None else expression & selection
+
+    table = dataset.to_table(columns=list(INPUT_COLUMNS), filter=expression)
+    count("bytes_read", table.nbytes)
+    df = table.to_pandas()
+    if farms is not None:
+        # The filter selects every combination of the farms and crops; keep the pairs
+        pairs = set(farms)
+        keys = zip(df["farm_id"], df["common_crop_name"])
+        df = df[np.array([key in pairs for key in keys], dtype=bool)]
+    return df.astype(INPUT_COLUMNS).reset_index(drop=True)
+
+
+# Example usage
+if __name__ == "__main__":
+    import pandas as pd
+
+    data_dir = os.path.join(os.path.dirname(__file__), "../../data")
+    input_file = os.path.join(data_dir, "temp", "hypothetical_farm_data.parquet")
+    pd.read_csv(os.path.join(data_dir, "test", "hypothetical_farm_data.csv")).to_parquet(
+        input_file
+    )
+    print(read_columnar_input(input_file, farms=[("farm1", "Soybean")]))
@@ -0,0 +1,173 @@
+"""
+This module maps uniform values in (0, 1) through the distributions used to sample
+the calculator's parameters, so that any design of uniform points (random, stratified
+or quasi-random) can be turned into parameter samples.
+
+Distributions are given as `(distribution, a, b)` tuples with the same meaning as in
+the user-defined distribution files in 'data/params_sampling_range':
+
+- ('uniform', low, high)
+- ('normal', mean, standard deviation)
+- ('lognormal', mean, sigma) of the underlying normal distribution, as in
+  `numpy.random.lognormal`
+
+Functions
+---------
+norm_ppf(u)
+    Inverse of the standard normal cumulative distribution function.
+ppf(distribution, a, b, u)
+    Maps uniform values through the inverse cumulative distribution function.
+default_distribution(value)
+    Returns the default uniform distribution spanning +/- 25% around a value.
+"""
+
+import numpy as np
+
+DISTRIBUTIONS = ["uniform", "normal", "lognormal"]
+
+# Uniform values are kept this far from 0 and 1, which bounds normal samples to about
+# +/- 6.4 standard deviations instead of infinity
+UNIFORM_EPSILON = 1e-10
+
+# Coefficients of Acklam's rational approximation of the normal quantile function
+_A = [
+    -3.969683028665376e01,
+    2.209460984245205e02,
+    -2.759285104469687e02,
+    1.383577518672690e02,
+    -3.066479806614716e01,
+    2.506628277459239e00,
+]
+_B = [
+    -5.447609879822406e01,
+    1.615858368580409e02,
+    -1.556989798598866e02,
+    6.680131188771972e01,
+    -1.328068155288572e01,
+]
+_C = [
+    -7.784894002430293e-03,
+    -3.223964580411365e-01,
+    -2.400758277161838e00,
+    -2.549732539343734e00,
+    4.374664141464968e00,
+    2.938163982698783e00,
+]
+_D = [
+    7.784695709041462e-03,
+    3.224671290700398e-01,
+    2.445134137142996e00,
+    3.754408661907416e00,
+]
+_P_LOW = 0.02425
+
+
+def _polyval(coefficients, x):
+    # Horner evaluation, highest power first
+    result = np.zeros_like(x)
+    for coefficient in coefficients:
+        result = result * x + coefficient
+    return result
+
+
+def _tail(q):
+    return _polyval(_C, q) / _polyval(_D + [1], q)
+
+
+def norm_ppf(u):
+    """
+    Inverse of the standard normal cumulative distribution function, using Acklam's
+    rational approximation (relative error below 1.2e-9).
+
+    Parameters
+    ----------
+    u : array-like of float
+        Probabilities in (0, 1).
+
+    Returns
+    -------
+    numpy.ndarray
+        The standard normal quantiles of `u`.
+
+    Examples
+    --------
+    >>> norm_ppf([0.025, 0.5, 0.975])
+    array([-1.95996399,  0.        ,  1.95996399])
+    """
+    u = np.clip(np.asarray(u, dtype=np.float64), UNIFORM_EPSILON, 1 - UNIFORM_EPSILON)
+    x = np.empty_like(u)
+
+    low = u < _P_LOW
+    high = u > 1 - _P_LOW
+    central = ~(low | high)
+
+    q = u[central] - 0.5
+    r = q * q
+    x[central] = _polyval(_A, r) * q / _polyval(_B + [1], r)
+    x[low] = _tail(np.sqrt(-2 * np.log(u[low])))
+    x[high] = -_tail(np.sqrt(-2 * np.log(1 - u[high])))
+    return x
+
+
+def ppf(distribution, a, b, u):
+    """
+    Maps uniform values through the inverse cumulative distribution function of a
+    distribution.
+
+    Parameters
+    ----------
+    distribution : str
+        'uniform', 'normal' or 'lognormal'.
+    a : float
+        Lower bound ('uniform') or mean ('normal', 'lognormal').
+    b : float
+        Upper bound ('uniform') or standard deviation ('normal', 'lognormal').
+    u : array-like of float
+        Uniform values in [0, 1].
+
+    Returns
+    -------
+    numpy.ndarray
+        The distribution's quantiles at `u`.
+
+    Raises
+    ------
+    ValueError
+        If the distribution is not supported.
+
+    Examples
+    --------
+    >>> ppf("uniform", 10, 14, [0.0, 0.5, 1.0])
+    array([10., 12., 14.])
+    """
+    u = np.asarray(u, dtype=np.float64)
+    if distribution == "uniform":
+        return a + (b - a) * u
+    if distribution == "normal":
+        return a + b * norm_ppf(u)
+    if distribution == "lognormal":
+        return np.exp(a + b * norm_ppf(u))
+    raise ValueError(f"Unsupported distribution type '{distribution}'.")
+
+
+def default_distribution(value):
+    """
+    Returns the default distribution of a parameter: uniform between 0.75 and 1.25
+    times its value, as used by the 'default' sampling mode of the managers.
+
+    Parameters
+    ----------
+    value : float
+        The parameter's value.
+
+    Returns
+    -------
+    tuple
+        ('uniform', 0.75 * value, 1.25 * value)
+    """
+    return ("uniform", float(value) * 0.75, float(value) * 1.25)
+
+
+if __name__ == "__main__":
+    print(norm_ppf([0.025, 0.5, 0.975]))
+    print(ppf("lognormal", -0.597, 0.1, [0.05, 0.5, 0.95]))
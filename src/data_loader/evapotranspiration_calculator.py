@@ -1,8 +1,11 @@
 """
 This module provides the EvapotranspirationCalculator class, which calculates reference
-evapotranspiration using the Turc method.
+evapotranspiration using the Turc method, and `turc_evapotranspiration`, which applies
+the same method to whole arrays of days.
 """
 
+import numpy as np
+
 
 class EvapotranspirationCalculator:
     """
@@ -91,6 +94,40 @@ class EvapotranspirationCalculator:
         return result
 
 
+def turc_evapotranspiration(mean_daily_temperature, solar_radiation, relative_humidity):
+    """
+    Calculates the reference evapotranspiration of many days at once using the Turc
+    method, with the same results as `EvapotranspirationCalculator.calculate`.
+
+    Parameters
+    ----------
+    mean_daily_temperature : array-like of float
+        Mean daily temperatures in degrees Celsius.
+    solar_radiation : array-like of float
+        Solar radiation in MJ m^-2 day^-1.
+    relative_humidity : array-like of float
+        Relative humidity in percent.
+
+    Returns
+    -------
+    numpy.ndarray
+        Reference evapotranspiration in mm day^-1 of each day, 0 where
+        evapotranspiration cannot occur.
+    """
+    temperature = np.asarray(mean_daily_temperature, dtype=float)
+    solar_radiation = np.asarray(solar_radiation, dtype=float)
+    relative_humidity = np.asarray(relative_humidity, dtype=float)
+
+    # Temperatures <= 0 also exclude the division by zero at -15 degrees Celsius
+    warm = temperature > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        term2 = temperature / (temperature + 15)
+    term3 = (23.8856 * solar_radiation) + 50
+    term4 = np.where(relative_humidity >= 50, 1, 1 + ((50 - relative_humidity) / 70))
+    result = 0.013 * term2 * term3 * term4
+    return np.where(warm & (result >= 0), result, 0.0)
+
+
 if __name__ == "__main__":
     # Example usage of the EvapotranspirationCalculator
     calculator = EvapotranspirationCalculator(
@@ -5,7 +5,7 @@ coordinates (longitude and latitude) from a list of points.
 
 Functions
 ---------
-generate_random_points(polygon, num_points)
+generate_random_points(polygon, num_points, rng=None)
     Generates a specified number of random points within the 
     bounds of a given polygon.
 
@@ -21,11 +21,11 @@ Examples
 >>> coords = extract_lon_lat(random_points)
 """
 
-import random
+import numpy as np
 from shapely.geometry import Point, Polygon
 
 
-def generate_random_points(polygon, num_points):
+def generate_random_points(polygon, num_points, rng=None):
     """Generate random points within a specified polygon.
 
     This function creates random points within the bounds of the
@@ -37,6 +37,9 @@ def generate_random_points(polygon, num_points):
         The polygon within which to generate random points.
     num_points: int
         The number of random points to generate within the polygon.
+    rng: numpy.random.Generator, optional
+        The random number generator drawing the points. Defaults to a generator
+        seeded from fresh entropy.
 
     Returns
     ----------
@@ -49,12 +52,12 @@ def generate_random_points(polygon, num_points):
     >>> test_polygon = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
     >>> generate_random_points(test_polygon, 5)
     """
+    if rng is None:
+        rng = np.random.default_rng()
     points = []
     min_x, min_y, max_x, max_y = polygon.bounds
     while len(points) < num_points:
-        random_point = Point(
-            [random.uniform(min_x, max_x), random.uniform(min_y, max_y)]
-        )
+        random_point = Point([rng.uniform(min_x, max_x), rng.uniform(min_y, max_y)])
         if random_point.within(polygon):  # Check if point is within the polygon
             points.append(random_point)
     return points
@@ -2,14 +2,15 @@ import os
 import sys
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
-from src.data_loader.get_external_climate_params import ExternalClimateDataFetcher
-from src.data_loader.get_external_soil_params import ExternalSoilTextureDataFetcher
-from src.data_loader.generate_random_points import generate_random_points, extract_lon_lat
 from src.data_loader.get_default_soil_texture import ModifierSoilTexture
+from src.data_loader.reference_data import load_reference_table, load_reference_layer
 from src.data_loader.sampling_fr_topo import sampling_fr_topo
+from src.instrumentation import stage, timed
+
+# geopandas, shapely, rasterio and requests are imported where they are used, so the
+# default source never pays for them when the farm location is indexed.
 
 
 class ClimateSoilDataManager:
@@ -31,6 +32,12 @@ class ClimateSoilDataManager:
         ('farmer' or 'scientific').
     num_runs : int
         The number of data retrieval runs, applicable in 'scientific' mode.
+    sampler : Sampler or None
+        The sampler drawing the FR_Topo samples in 'scientific' mode, shared with the
+        other managers of a run.
+    rngs : dict or None
+        The 'points' and 'soil_texture' random number generators of the run in
+        'scientific' mode, see `random_streams.farm_generators`.
     farm_point : tuple
         A tuple containing the longitude and latitude of the farm.
     year_range : tuple
@@ -49,6 +56,8 @@ class ClimateSoilDataManager:
         Loads Holos climate and soil data for ecodistricts from a CSV file.
     load_ecodistrict_polygons()
         Loads the ecodistrict polygons from a shapefile.
+    get_farm_gdf()
+        Returns the farm's GeoDataFrame, building it on first use.
     extract_farm_ecoid_df()
         Extracts the ecodistrict ID for the farm.
     extract_farm_ecodistrict_polygon()
@@ -58,15 +67,25 @@ class ClimateSoilDataManager:
         the farm's ecodistrict ID.
     get_climate_soil_data()
         Retrieves climate and soil data based on the source and operation mode specified.
+    get_default_climate_soil_batch(eco_ids, provinces)
+        Retrieves the default climate and soil data of many farms with one join.
     """
 
     def __init__(
-        self, farm_data, source="default", operation_mode="farmer", num_runs=10
+        self,
+        farm_data,
+        source="default",
+        operation_mode="farmer",
+        num_runs=10,
+        sampler=None,
+        rngs=None,
     ):
         self.farm_data = farm_data
         self.source = source
         self.operation_mode = operation_mode
         self.num_runs = num_runs
+        self.sampler = sampler
+        self.rngs = rngs if rngs is not None else {}
         self.farm_point = (
             self.farm_data.farm_data["longitude"],
             self.farm_data.farm_data["latitude"],
@@ -91,7 +110,7 @@ class ClimateSoilDataManager:
         climate_path = os.path.join(
             self.dir, "../../data/raw/Holos/ecodistrict_to_ecozone_mapping.csv"
         )
-        return pd.read_csv(climate_path)
+        return load_reference_table(climate_path)
 
     def load_ecodistrict_polygons(self):
         """
@@ -105,27 +124,51 @@ class ClimateSoilDataManager:
         ecodistrict_path = os.path.join(
             self.dir, "../../data/external/slc_dissolved_ecodistrict"
         )
-        ecodistrict = gpd.read_file(ecodistrict_path)
-        return ecodistrict.to_crs("EPSG:4326")
+        return load_reference_layer(ecodistrict_path)
+
+    def get_farm_gdf(self):
+        """
+        Returns the farm's GeoDataFrame, building it on first use when the farm
+        location was resolved from the location index.
 
+        Returns
+        -------
+        GeoDataFrame
+            The farm's location joined with its province.
+        """
+        if self.farm_data.farm_gdf is None:
+            self.farm_data.farm_gdf = self.farm_data.get_farm_gdf()
+        return self.farm_data.farm_gdf
+
+    @timed("ecodistrict_join")
     def extract_farm_ecoid_df(self):
         """
         Extracts the farm's ecodistrict ID and merges it with the farm's geospatial data.
+        Indexed farm locations are resolved without the ecodistrict shapefile.
 
         Returns
         -------
         DataFrame
             A pandas DataFrame with the farm's data including the ecodistrict ID.
         """
+        location = getattr(self.farm_data, "location", None)
+        if location is not None:
+            return pd.DataFrame(
+                {"ECO_ID": [location["eco_id"]], "province": [location["province"]]}
+            )
+
+        import geopandas as gpd
+
         ecodistrict = self.load_ecodistrict_polygons()
         farm_ecoid_df = gpd.sjoin(
-            self.farm_data.farm_gdf,
+            self.get_farm_gdf(),
             ecodistrict[["ECO_ID", "geometry"]],
             how="left",
             predicate="within",
         ).drop(columns=["index_right"])
         return farm_ecoid_df
 
+    @timed("ecodistrict_polygon")
     def extract_farm_ecodistrict_polygon(self):
         """
         Retrieves the polygon geometry of the ecodistrict that contains the farm.
@@ -135,12 +178,15 @@ class ClimateSoilDataManager:
         geometry
             The polygon geometry of the farm's ecodistrict.
         """
+        import geopandas as gpd
+
         ecodistrict = self.load_ecodistrict_polygons()
         farm_ecodistrict = gpd.sjoin(
-            ecodistrict, self.farm_data.farm_gdf, how="inner", predicate="contains"
+            ecodistrict, self.get_farm_gdf(), how="inner", predicate="contains"
         )
         return farm_ecodistrict["geometry"].iloc[0]
 
+    @timed("default_climate_soil")
     def extract_default_climate_soil_data(self):
         """
         Extracts and processes default climate and soil data for the farm based on
@@ -178,10 +224,20 @@ class ClimateSoilDataManager:
         # Storing the Ecodistrict ID
         self.eco_id = farm_ecoid_climate_soil["Ecodistrict"].iloc[0]
 
+    @timed("external_fetch")
     def fetch_external_data(self, points, years_range):
         """Fetch external climate and soil data for given points over specified years."""
+        from src.data_loader.get_external_climate_params import (
+            ExternalClimateDataFetcher,
+        )
+        from src.data_loader.get_external_soil_params import (
+            ExternalSoilTextureDataFetcher,
+        )
+
         climate_fetcher = ExternalClimateDataFetcher(points, *years_range)
-        soil_fetcher = ExternalSoilTextureDataFetcher(points)
+        soil_fetcher = ExternalSoilTextureDataFetcher(
+            points, rng=self.rngs.get("soil_texture")
+        )
 
         climate_data = climate_fetcher.process_points_over_years()
         soil_data = soil_fetcher.get_soil_texture_values()
@@ -214,6 +270,7 @@ class ClimateSoilDataManager:
 
         return {key: np.array(value) for key, value in results.items()}
 
+    @timed("climate_soil_data")
     def get_climate_soil_data(self):
         """
         Retrieves and processes climate and soil data based on the specified source
@@ -261,18 +318,27 @@ class ClimateSoilDataManager:
             points = [self.farm_point]
 
             if self.operation_mode == "scientific":
-                polygon = self.extract_farm_ecodistrict_polygon()
-                random_points = generate_random_points(
-                    polygon, num_points=self.num_runs
+                from src.data_loader.generate_random_points import (
+                    generate_random_points,
+                    extract_lon_lat,
                 )
-                points.extend(extract_lon_lat(random_points))
+
+                polygon = self.extract_farm_ecodistrict_polygon()
+                with stage("random_points"):
+                    random_points = generate_random_points(
+                        polygon, num_points=self.num_runs, rng=self.rngs.get("points")
+                    )
+                    points.extend(extract_lon_lat(random_points))
 
             climate_data, soil_data = self.fetch_external_data(points, self.year_range)
             processed_data = self.process_data_points(points, climate_data, soil_data)
 
             if self.operation_mode == "scientific":
                 farm_ecod_fr_topo = self.climate_soil_dict["FR_Topo"][0]
-                fr_topo_values = sampling_fr_topo(farm_ecod_fr_topo, self.num_runs)
+                with stage("fr_topo_sampling"):
+                    fr_topo_values = sampling_fr_topo(
+                        farm_ecod_fr_topo, self.num_runs, sampler=self.sampler
+                    )
                 fr_topo_values = np.insert(fr_topo_values, 0, farm_ecod_fr_topo)
                 self.climate_soil_dict["FR_Topo"] = fr_topo_values
 
@@ -282,6 +348,63 @@ class ClimateSoilDataManager:
         print("Invalid source or operation mode.")
         return None
 
+    @staticmethod
+    def get_default_climate_soil_batch(eco_ids, provinces):
+        """
+        Retrieves the default Holos climate and soil data of many farms with one join
+        on their ecodistrict and province.
+
+        Parameters
+        ----------
+        eco_ids : array-like of int
+            The ecodistrict ID of each farm.
+        provinces : array-like of str
+            The province of each farm.
+
+        Returns
+        -------
+        dict
+            A dictionary with NumPy arrays of precipitation ('P'), potential
+            evapotranspiration ('PE'), 'FR_Topo' and the soil texture modifier
+            ('soil_texture'), one value per farm.
+
+        Raises
+        ------
+        ValueError
+            If an (ecodistrict, province) pair has no default climate data.
+        """
+        climate_path = os.path.join(
+            os.path.dirname(__file__),
+            "../../data/raw/Holos/ecodistrict_to_ecozone_mapping.csv",
+        )
+        default_climate_df = load_reference_table(climate_path).drop_duplicates(
+            ["Ecodistrict", "Province"], keep="first"
+        )
+        farms = pd.DataFrame(
+            {
+                "Ecodistrict": np.asarray(eco_ids, dtype=np.int64),
+                "Province": np.asarray(provinces, dtype=object),
+            }
+        )
+        merged = farms.merge(
+            default_climate_df, on=["Ecodistrict", "Province"], how="left"
+        )
+        missing = merged["SoilTexture"].isna()
+        if missing.any():
+            pairs = merged.loc[missing, ["Ecodistrict", "Province"]].drop_duplicates()
+            raise ValueError(
+                f"No default climate data for the ecodistricts {pairs.values.tolist()}"
+            )
+
+        return {
+            "P": merged["PMayToOct"].to_numpy(dtype=float),
+            "PE": merged["PEMayToOct"].to_numpy(dtype=float),
+            "FR_Topo": merged["Ftopo"].to_numpy(dtype=float),
+            "soil_texture": ModifierSoilTexture.get_rf_tx_batch(
+                merged["Province"], merged["SoilTexture"].str.lower()
+            ),
+        }
+
 
 if __name__ == "__main__":
     from src.data_loader.get_farm_data import FarmDataManager
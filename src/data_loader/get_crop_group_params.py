@@ -1,7 +1,13 @@
 import os
+import sys
 import json
-import pandas as pd
 import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_table
+from src.data_loader.samplers import Sampler
+from src.instrumentation import timed
 
 
 class CropGroupManager:
@@ -38,6 +44,8 @@ class CropGroupManager:
         Loads user-defined distributions for crop-group parameters from a JSON file.
     sample_crop_group_parameters(sampling_mode='default', num_samples=10)
         Samples parameters based on the specified mode and number of samples.
+    get_crop_group_parameters_batch(crops)
+        Retrieves the groups and group parameters of many crops with one join.
 
     Raises
     ------
@@ -75,12 +83,13 @@ class CropGroupManager:
         str
             The group category of the crop.
         """
-        crop_to_group_map_df = pd.read_csv(self.crop_to_group_map_path)
-        crop_group = crop_to_group_map_df.query(f"crop == '{self.crop}'")["group"].iloc[
-            0
-        ]
+        crop_to_group_map_df = load_reference_table(self.crop_to_group_map_path)
+        crop_group = crop_to_group_map_df[crop_to_group_map_df["crop"] == self.crop][
+            "group"
+        ].iloc[0]
         return crop_group
 
+    @timed("crop_group_parameters")
     def get_crop_group_parameters(self):
         """
         Retrieves and formats parameters specific to the crop group from a CSV file.
@@ -91,7 +100,7 @@ class CropGroupManager:
             A dictionary where each key is a parameter name and each value is a
             NumPy array containing the parameter value.
         """
-        crop_group_params_df = pd.read_csv(self.crop_group_params_path)
+        crop_group_params_df = load_reference_table(self.crop_group_params_path)
         crop_group_params = (
             crop_group_params_df[crop_group_params_df["group"] == self.crop_group]
             .iloc[0]
@@ -112,7 +121,10 @@ class CropGroupManager:
         with open(self.user_distributions_path, "r") as file:
             return json.load(file)
 
-    def sample_crop_group_parameters(self, sampling_mode="default", num_samples=10):
+    @timed("crop_group_parameters_sampling")
+    def sample_crop_group_parameters(
+        self, sampling_mode="default", num_samples=10, sampler=None
+    ):
         """
         Samples crop group parameters based on the specified mode and number of samples.
 
@@ -122,6 +134,9 @@ class CropGroupManager:
             The mode of sampling ('default' or 'user_define'), default is 'default'.
         num_samples : int, optional
             The number of samples to generate, default is 10.
+        sampler : Sampler, optional
+            The sampler drawing the uniform design, shared with the other managers of a
+            run. Defaults to plain Monte Carlo sampling.
 
         Returns
         -------
@@ -139,11 +154,13 @@ class CropGroupManager:
             If a parameter in the user-defined distributions does not exist in the current
             crop group parameters.
         """
+        if sampler is None:
+            sampler = Sampler()
         sampled_parameters = {}
         if sampling_mode == "default":
             for param, value in self.crop_group_params.items():
-                sampled_array = np.random.uniform(
-                    value * 0.75, value * 1.25, num_samples
+                sampled_array = sampler.sample(
+                    num_samples, "uniform", value * 0.75, value * 1.25
                 )
                 sampled_parameters[param] = np.insert(sampled_array, 0, value)
         elif sampling_mode == "user_define":
@@ -161,17 +178,7 @@ class CropGroupManager:
                 )
 
             for param, specs in user_distributions.items():
-                distribution_type = specs[0]
-                # sampled_array = None
-                if distribution_type == "uniform":
-                    low, high = specs[1], specs[2]
-                    sampled_array = np.random.uniform(low, high, num_samples)
-                elif distribution_type == "normal":
-                    mean, sd = specs[1], specs[2]
-                    sampled_array = np.random.normal(mean, sd, num_samples)
-                elif distribution_type == "lognormal":
-                    mean, sigma = specs[1], specs[2]
-                    sampled_array = np.random.lognormal(mean, sigma, num_samples)
+                sampled_array = sampler.sample(num_samples, *specs[:3])
 
                 # Ensure the parameter exists in crop_group_params before attempting to access it
                 if param in self.crop_group_params:
@@ -188,6 +195,52 @@ class CropGroupManager:
 
         return sampled_parameters
 
+    @staticmethod
+    def get_crop_group_parameters_batch(crops):
+        """
+        Retrieves the groups and group parameters of many crops with one join.
+
+        Parameters
+        ----------
+        crops : array-like of str
+            The crop of each farm.
+
+        Returns
+        -------
+        tuple
+            A NumPy array with the group of each crop, and a dictionary where each key
+            is a parameter name and each value is a NumPy array with one value per crop.
+
+        Raises
+        ------
+        ValueError
+            If a crop is not mapped to a crop group.
+        """
+        preprocessed_dir = os.path.join(
+            os.path.dirname(__file__), "../../data/preprocessed"
+        )
+        crop_to_group_map_df = load_reference_table(
+            os.path.join(preprocessed_dir, "crop_to_group.csv")
+        ).drop_duplicates("crop", keep="first")
+        crop_group_params_df = load_reference_table(
+            os.path.join(preprocessed_dir, "crop_group_parameters.csv")
+        ).drop_duplicates("group", keep="first")
+
+        crops = pd.DataFrame({"crop": np.asarray(crops, dtype=object)})
+        merged = crops.merge(
+            crop_to_group_map_df[["crop", "group"]], on="crop", how="left"
+        ).merge(crop_group_params_df, on="group", how="left")
+        unknown = merged.loc[merged["group"].isna(), "crop"].unique().tolist()
+        if unknown:
+            raise ValueError(f"No crop group found for the crops {unknown}.")
+
+        params = {
+            column: merged[column].to_numpy(dtype=float)
+            for column in crop_group_params_df.columns
+            if column != "group"
+        }
+        return merged["group"].to_numpy(), params
+
 
 # Example usage
 if __name__ == "__main__":
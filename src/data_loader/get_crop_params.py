@@ -1,8 +1,192 @@
 import os
+import sys
 import json
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.samplers import Sampler
+from src.instrumentation import timed
+
+NON_PARAMETER_COLUMNS = ["group", "crop", "condition", "holos_crop_name"]
+
+
+class CropConditionTable:
+    """
+    Crop parameter rows of a single crop with their climate conditions parsed into
+    interval arrays, so that rows can be selected for many (P, PE) pairs at once.
+
+    Conditions follow the Holos crop parameter table: 'Canada' always applies and takes
+    precedence, 'Irrigated' applies when P < PE, 'Rainfed' when P >= PE, and '<x', '>x'
+    and 'a-b' bound the moisture deficit PE - P. When several rows match, the last one
+    in file order is preferred. A crop with a single row always uses that row.
+
+    Parameters
+    ----------
+    conditions : list of str
+        The condition of each row, in file order.
+    values : numpy.ndarray
+        A 2D array of parameter values with one row per condition.
+    param_names : list of str
+        The names of the parameter columns in `values`.
+
+    Attributes
+    ----------
+    kinds : numpy.ndarray
+        The parsed condition type of each row ('canada', 'irrigated', 'rainfed',
+        'deficit' or 'none').
+    lower : numpy.ndarray
+        Lower bound of the moisture deficit for 'deficit' rows (-inf if unbounded).
+    upper : numpy.ndarray
+        Upper bound of the moisture deficit for 'deficit' rows (inf if unbounded).
+    lower_inclusive : numpy.ndarray
+        Whether the lower bound is inclusive.
+    upper_inclusive : numpy.ndarray
+        Whether the upper bound is inclusive.
+    priority : numpy.ndarray
+        Preference of each row when several rows match; the highest wins.
+
+    Methods
+    -------
+    select_rows(P, PE)
+        Returns the index of the preferred matching row for each (P, PE) pair.
+    get_values(rows)
+        Returns the parameter values of the selected rows as a dictionary of arrays.
+    """
+
+    def __init__(self, conditions, values, param_names):
+        self.conditions = list(conditions)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.param_names = list(param_names)
+        n_rows = len(self.conditions)
+        self.kinds = np.empty(n_rows, dtype=object)
+        self.lower = np.full(n_rows, -np.inf)
+        self.upper = np.full(n_rows, np.inf)
+        self.lower_inclusive = np.zeros(n_rows, dtype=bool)
+        self.upper_inclusive = np.zeros(n_rows, dtype=bool)
+        # Later rows are preferred; the first 'Canada' row outranks every other row
+        self.priority = np.arange(n_rows, dtype=np.int64)
+
+        for i, condition in enumerate(self.conditions):
+            if condition == "Canada":
+                self.kinds[i] = "canada"
+                self.priority[i] = 2 * n_rows - i
+            elif condition == "Irrigated":
+                self.kinds[i] = "irrigated"
+            elif condition == "Rainfed":
+                self.kinds[i] = "rainfed"
+            elif "<" in condition:
+                self.kinds[i] = "deficit"
+                self.upper[i] = float(condition.replace("<", ""))
+            elif ">" in condition:
+                self.kinds[i] = "deficit"
+                self.lower[i] = float(condition.replace(">", ""))
+            elif "-" in condition:
+                self.kinds[i] = "deficit"
+                self.lower[i], self.upper[i] = map(float, condition.split("-"))
+                self.lower_inclusive[i] = True
+                self.upper_inclusive[i] = True
+            else:
+                self.kinds[i] = "none"
+
+    def select_rows(self, P, PE):
+        """
+        Returns the index of the preferred matching row for each (P, PE) pair.
+
+        Parameters
+        ----------
+        P : array-like
+            Precipitation values.
+        PE : array-like
+            Potential evapotranspiration values, aligned with `P`.
+
+        Returns
+        -------
+        numpy.ndarray
+            Row indexes into `values`, with -1 where no row matches.
+        """
+        P = np.atleast_1d(np.asarray(P, dtype=np.float64))
+        PE = np.atleast_1d(np.asarray(PE, dtype=np.float64))
+        n_rows = len(self.conditions)
+        if n_rows == 1:
+            return np.zeros(len(P), dtype=np.int64)
+
+        deficit = (PE - P)[np.newaxis, :]
+        lower = self.lower[:, np.newaxis]
+        upper = self.upper[:, np.newaxis]
+        above_lower = np.where(
+            self.lower_inclusive[:, np.newaxis], deficit >= lower, deficit > lower
+        )
+        below_upper = np.where(
+            self.upper_inclusive[:, np.newaxis], deficit <= upper, deficit < upper
+        )
+        kinds = self.kinds[:, np.newaxis]
+        matches = (
+            (kinds == "canada")
+            | ((kinds == "irrigated") & (P < PE)[np.newaxis, :])
+            | ((kinds == "rainfed") & (P >= PE)[np.newaxis, :])
+            | ((kinds == "deficit") & above_lower & below_upper)
+        )
+
+        ranked = np.where(matches, self.priority[:, np.newaxis], -1)
+        rows = np.argmax(ranked, axis=0)
+        return np.where(matches.any(axis=0), rows, -1)
+
+    def get_values(self, rows):
+        """
+        Returns the parameter values of the selected rows.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            Row indexes as returned by `select_rows`, all non-negative.
+
+        Returns
+        -------
+        dict
+            A dictionary where keys are parameter names and values are numpy arrays
+            with one entry per selected row.
+        """
+        selected = self.values[np.asarray(rows, dtype=np.int64)]
+        return {
+            param: selected[:, j].copy() for j, param in enumerate(self.param_names)
+        }
+
+
+def load_crop_condition_tables(crop_parameters_path):
+    """
+    Reads the Holos crop parameters CSV file once and compiles it into a condition
+    table per crop.
+
+    Parameters
+    ----------
+    crop_parameters_path : str
+        Path to the CSV file containing crop parameters.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping each crop name to its CropConditionTable.
+    """
+    return _compile_crop_condition_tables(os.path.abspath(crop_parameters_path))
+
+
+@lru_cache(maxsize=None)
+def _compile_crop_condition_tables(crop_parameters_path):
+    crop_params_df = pd.read_csv(crop_parameters_path)
+    param_names = [
+        col for col in crop_params_df.columns if col not in NON_PARAMETER_COLUMNS
+    ]
+    tables = {}
+    for crop, rows in crop_params_df.groupby("crop", sort=False):
+        tables[crop] = CropConditionTable(
+            rows["condition"].astype(str).tolist(),
+            rows[param_names].to_numpy(dtype=np.float64),
+            param_names,
+        )
+    return tables
+
 
 class CropParametersManager:
     """
@@ -20,6 +204,10 @@ class CropParametersManager:
         Precipitation data as a numpy array.
     PE : numpy.ndarray
         Potential evapotranspiration data as a numpy array.
+    P_samples : numpy.ndarray
+        Precipitation of the farm point followed by any sampled points.
+    PE_samples : numpy.ndarray
+        Potential evapotranspiration of the farm point followed by any sampled points.
     dir : str
         Directory path to the module's location.
     crop_parameters_path : str
@@ -32,8 +220,17 @@ class CropParametersManager:
     Methods
     -------
     get_crop_parameters()
-        Loads and filters crop parameters from the CSV file based on crop type and
-        climate conditions.
+        Selects the crop parameters from the compiled condition table based on crop
+        type and climate conditions.
+    get_condition_table()
+        Returns the compiled condition table for the crop.
+    select_crop_parameters(P, PE)
+        Selects the crop parameters matching each (P, PE) pair in one vectorized pass.
+    get_crop_parameters_batch(crops, P, PE)
+        Selects the crop parameters of many farms, one vectorized pass per crop.
+    get_sample_centers(num_samples)
+        Returns the values around which default samples are drawn, matched to the
+        climate of each sampled point when available.
     load_user_distributions()
         Loads user-defined distributions for the crop parameters from a JSON file.
     sample_crop_parameters(sampling_mode='default', num_samples=10)
@@ -44,7 +241,8 @@ class CropParametersManager:
     Raises
     ------
     ValueError
-        Raised if no user-defined distributions are found for the crop when 'user_define'
+        Raised if the crop is unknown, if no crop row matches the climate conditions,
+        if no user-defined distributions are found for the crop when 'user_define'
         sampling mode is selected or if an invalid sampling mode is specified.
     KeyError
         Raised if a parameter specified in the user-defined distributions does not exist
@@ -57,6 +255,8 @@ class CropParametersManager:
         self.crop = self.farm_data["crop"]
         self.P = climate_data["P"][0]
         self.PE = climate_data["PE"][0]
+        self.P_samples = np.asarray(climate_data["P"], dtype=np.float64)
+        self.PE_samples = np.asarray(climate_data["PE"], dtype=np.float64)
         self.dir = os.path.dirname(__file__)
         self.crop_parameters_path = os.path.join(
             self.dir, "../../data/preprocessed/crop_parameters.csv"
@@ -66,79 +266,156 @@ class CropParametersManager:
         )
         self.crop_parameters = self.get_crop_parameters()
 
+    @timed("crop_parameters")
     def get_crop_parameters(self):
         """
-        Loads Holos crop parameters from a CSV file and filters them based on the
-        specified crop and climate conditions.
+        Loads Holos crop parameters from the compiled condition table and selects the
+        row matching the specified crop and climate conditions.
 
         Returns
         -------
         dict
             A dictionary of crop parameters where keys are parameter names and values
             are numpy arrays containing the parameter values.
+
+        Raises
+        ------
+        ValueError
+            If the crop is unknown or none of its rows match the climate conditions.
         """
-        crop_params_df = pd.read_csv(self.crop_parameters_path)
-        # Filter the dataframe for the given crop
-        crop_params = crop_params_df[crop_params_df["crop"] == self.crop]
+        return self.select_crop_parameters(np.array([self.P]), np.array([self.PE]))
 
-        # If only one row matches, return its parameters after cleaning
-        if len(crop_params) == 1:
-            selected_params = crop_params.iloc[0].to_dict()
-            selected_params.pop("group", None)
-            selected_params.pop("crop", None)
-            selected_params.pop("condition", None)
-            selected_params.pop("holos_crop_name", None)
+    def get_condition_table(self):
+        """
+        Returns the compiled condition table for the crop.
 
-            return {
-                k: np.array([float(v)], dtype=np.float64)
-                for k, v in selected_params.items()
-            }
+        Returns
+        -------
+        CropConditionTable
+            The crop's parameter rows with their parsed conditions.
 
-        selected_params = None  # This will store the selected row's dictionary
+        Raises
+        ------
+        ValueError
+            If the crop is not listed in the crop parameters CSV file.
+        """
+        table = load_crop_condition_tables(self.crop_parameters_path).get(self.crop)
+        if table is None:
+            raise ValueError(f"No crop parameters found for the crop '{self.crop}'.")
+        return table
 
-        # Process each row to find the best match according to the rules
-        for _, row in crop_params.iterrows():
-            condition = row["condition"]
+    def select_crop_parameters(self, P, PE):
+        """
+        Selects the crop parameter row matching each (P, PE) pair in one vectorized pass.
 
-            # Priority for 'Canada'
-            if condition == "Canada":
-                selected_params = row.to_dict()
-                break  # Stop processing since 'Canada' has the highest priority
+        Parameters
+        ----------
+        P : array-like
+            Precipitation values.
+        PE : array-like
+            Potential evapotranspiration values, aligned with `P`.
 
-            # Handle 'irrigated' and 'rainfed' based on P and PE
-            if self.P < self.PE and condition == "Irrigated":
-                selected_params = row.to_dict()  # Prefer 'irrigated' if P < PE
+        Returns
+        -------
+        dict
+            A dictionary where keys are parameter names and values are numpy arrays
+            holding the selected value for each (P, PE) pair.
 
-            elif self.P >= self.PE and condition == "Rainfed":
-                selected_params = row.to_dict()  # Prefer 'rainfed' otherwise
+        Raises
+        ------
+        ValueError
+            If the crop is unknown or a (P, PE) pair matches none of the crop's rows.
+        """
+        table = self.get_condition_table()
+        rows = table.select_rows(P, PE)
+        if np.any(rows < 0):
+            raise ValueError(
+                f"No crop parameters match the climate conditions for the crop '{self.crop}'."
+            )
+        return table.get_values(rows)
+
+    @staticmethod
+    def get_crop_parameters_batch(crops, P, PE):
+        """
+        Selects the crop parameters of many farms, one vectorized pass per crop.
 
-            # Handle numeric conditions with <, >, -
-            elif "<" in condition:
-                upper_bound = float(condition.replace("<", ""))
-                if self.PE - self.P < upper_bound:
-                    selected_params = row.to_dict()
+        Parameters
+        ----------
+        crops : array-like of str
+            The crop of each farm.
+        P : array-like
+            Precipitation of each farm.
+        PE : array-like
+            Potential evapotranspiration of each farm.
 
-            elif ">" in condition:
-                lower_bound = float(condition.replace(">", ""))
-                if self.PE - self.P > lower_bound:
-                    selected_params = row.to_dict()
+        Returns
+        -------
+        dict
+            A dictionary where keys are parameter names and values are numpy arrays
+            holding the selected value for each farm.
 
-            elif "-" in condition:
-                lower_bound, upper_bound = map(float, condition.split("-"))
-                if lower_bound <= self.PE - self.P <= upper_bound:
-                    selected_params = row.to_dict()
+        Raises
+        ------
+        ValueError
+            If a crop is unknown or a farm's climate matches none of its crop's rows.
+        """
+        tables = load_crop_condition_tables(
+            os.path.join(
+                os.path.dirname(__file__), "../../data/preprocessed/crop_parameters.csv"
+            )
+        )
+        crops = np.asarray(crops, dtype=object)
+        P = np.asarray(P, dtype=np.float64)
+        PE = np.asarray(PE, dtype=np.float64)
+        unknown = [crop for crop in np.unique(crops.astype(str)) if crop not in tables]
+        if unknown:
+            raise ValueError(f"No crop parameters found for the crops {unknown}.")
+
+        param_names = next(iter(tables.values())).param_names
+        params = {name: np.empty(len(crops)) for name in param_names}
+        for crop in np.unique(crops.astype(str)):
+            mask = crops == crop
+            table = tables[crop]
+            rows = table.select_rows(P[mask], PE[mask])
+            if np.any(rows < 0):
+                raise ValueError(
+                    f"No crop parameters match the climate conditions for the crop '{crop}'."
+                )
+            for name, values in table.get_values(rows).items():
+                params[name][mask] = values
+        return params
 
-        if selected_params:
-            # Clean up unnecessary data from the selected parameters
-            selected_params.pop("group", None)
-            selected_params.pop("crop", None)
-            selected_params.pop("condition", None)
-            selected_params.pop("holos_crop_name", None)
+    def get_sample_centers(self, num_samples):
+        """
+        Returns the crop parameter values around which each default sample is drawn.
 
-        return {
-            k: np.array([float(v)], dtype=np.float64)
-            for k, v in selected_params.items()
-        }
+        When the climate data holds one value per sampled point (the farm point followed
+        by `num_samples` sampled points), each sample is centered on the crop row matching
+        that point's climate. Points without a matching row, e.g. failed climate fetches,
+        fall back to the farm's parameters.
+
+        Parameters
+        ----------
+        num_samples : int
+            The number of samples to generate for each parameter.
+
+        Returns
+        -------
+        dict
+            A dictionary where keys are parameter names and values are numpy arrays of
+            length `num_samples`.
+        """
+        if len(self.P_samples) != num_samples + 1 or len(self.PE_samples) != num_samples + 1:
+            return {
+                k: np.full(num_samples, v[0], dtype=np.float64)
+                for k, v in self.crop_parameters.items()
+            }
+
+        table = self.get_condition_table()
+        rows = table.select_rows(self.P_samples[1:], self.PE_samples[1:])
+        farm_row = table.select_rows(self.P_samples[:1], self.PE_samples[:1])[0]
+        rows = np.where(rows < 0, farm_row, rows)
+        return table.get_values(rows)
 
     def load_user_distributions(self):
         """
@@ -153,7 +430,10 @@ class CropParametersManager:
         with open(self.user_distributions_path, "r") as file:
             return json.load(file)
 
-    def sample_crop_parameters(self, sampling_mode="default", num_samples=10):
+    @timed("crop_parameters_sampling")
+    def sample_crop_parameters(
+        self, sampling_mode="default", num_samples=10, sampler=None
+    ):
         """
         Samples crop parameters based on a specified mode ('default' or 'user_define') and
         number of samples.
@@ -164,6 +444,9 @@ class CropParametersManager:
             The mode to use for sampling, either 'default' or 'user_define'.
         num_samples : int, optional
             The number of samples to generate for each parameter.
+        sampler : Sampler, optional
+            The sampler drawing the uniform design, shared with the other managers of a
+            run. Defaults to plain Monte Carlo sampling.
 
         Returns
         -------
@@ -180,12 +463,15 @@ class CropParametersManager:
         KeyError
             If a parameter in user-defined distributions is not found in the crop parameters.
         """
+        if sampler is None:
+            sampler = Sampler()
         sampled_parameters = {}
         if sampling_mode == "default":
+            centers = self.get_sample_centers(num_samples)
             for param, value in self.crop_parameters.items():
                 value = value[0]
-                sampled_array = np.random.uniform(
-                    value * 0.75, value * 1.25, num_samples
+                sampled_array = sampler.sample(
+                    num_samples, "uniform", centers[param] * 0.75, centers[param] * 1.25
                 )
                 sampled_parameters[param] = np.insert(sampled_array, 0, value)
         elif sampling_mode == "user_define":
@@ -203,17 +489,7 @@ class CropParametersManager:
                 )
 
             for param, specs in user_distributions.items():
-                distribution_type = specs[0]
-                if distribution_type == "uniform":
-                    low, high = specs[1], specs[2]
-                    sampled_array = np.random.uniform(low, high, num_samples)
-                elif distribution_type == "normal":
-                    mean, sd = specs[1], specs[2]
-                    sampled_array = np.random.normal(mean, sd, num_samples)
-                elif distribution_type == "lognormal":
-                    mean, sigma = specs[1], specs[2]
-                    sampled_array = np.random.lognormal(mean, sigma, num_samples)
-                # Add more distribution types as needed in future
+                sampled_array = sampler.sample(num_samples, *specs[:3])
                 value = self.crop_parameters[param][0]
                 sampled_parameters[param] = np.insert(sampled_array, 0, value)
         else:
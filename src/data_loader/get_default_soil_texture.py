@@ -5,8 +5,14 @@ defined by Holos based on farm region (i.e., western/eastern Canana) and the soi
 """
 
 import os
+import sys
+import numpy as np
 import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_table
+from src.data_loader.get_modifiers import get_regions
+
 
 class ModifierSoilTexture:
     """
@@ -43,6 +49,8 @@ class ModifierSoilTexture:
         region and soil texture.
     get_region()
         Determines the region (western or eastern Canada) based on the province.
+    get_rf_tx_batch(provinces, soil_textures)
+        Fetches the soil texture modifiers of many farms with one join.
 
     Examples
     --------
@@ -83,10 +91,11 @@ class ModifierSoilTexture:
         >>> print(modifier.get_rf_tx_modifier())
         """
         region = self.get_region()
-        soil_texture_df = pd.read_csv(self.soil_texture_path)
-        rf_tx = soil_texture_df.query(
-            f"region == '{region}' & soil_texture == '{self.soil_texture}'"
-        )["value"].iloc[0]
+        soil_texture_df = load_reference_table(self.soil_texture_path)
+        rf_tx = soil_texture_df[
+            (soil_texture_df["region"] == region)
+            & (soil_texture_df["soil_texture"] == self.soil_texture)
+        ]["value"].iloc[0]
         return rf_tx
 
     def get_region(self):
@@ -117,6 +126,47 @@ class ModifierSoilTexture:
 
         return "western_canada" if self.province in western_canada else "eastern_canada"
 
+    @staticmethod
+    def get_rf_tx_batch(provinces, soil_textures):
+        """
+        Fetches the soil texture modifiers of many farms with one join.
+
+        Parameters
+        ----------
+        provinces : array-like of str
+            The province of each farm.
+        soil_textures : array-like of str
+            The soil texture type of each farm (i.e., 'fine', 'coarse', 'medium',
+            'unknown').
+
+        Returns
+        -------
+        numpy.ndarray
+            The soil texture modifier of each farm.
+
+        Raises
+        ------
+        ValueError
+            If a soil texture is not defined for the farm's region.
+        """
+        soil_texture_path = os.path.join(
+            os.path.dirname(__file__), "../../data/preprocessed/modifier_rf_tx.csv"
+        )
+        soil_texture_df = load_reference_table(soil_texture_path).drop_duplicates(
+            ["region", "soil_texture"], keep="first"
+        )
+        farms = pd.DataFrame(
+            {
+                "region": get_regions(provinces),
+                "soil_texture": np.asarray(soil_textures, dtype=object),
+            }
+        )
+        merged = farms.merge(soil_texture_df, on=["region", "soil_texture"], how="left")
+        if merged["value"].isna().any():
+            unknown = merged.loc[merged["value"].isna(), "soil_texture"].unique()
+            raise ValueError(f"Unknown soil textures: {unknown.tolist()}")
+        return merged["value"].to_numpy(dtype=float)
+
 
 if __name__ == "__main__":
     # Example farm data
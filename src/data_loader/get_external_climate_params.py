@@ -1,12 +1,27 @@
 import sys
 import os
-import json
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from multiprocessing import Pool
 import numpy as np
 import requests
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
-from src.data_loader.evapotranspiration_calculator import EvapotranspirationCalculator
+from src.data_loader.evapotranspiration_calculator import turc_evapotranspiration
+from src.data_loader.power_response import POWER_PARAMETERS, parse_power_response
+from src.instrumentation import count
+
+# Successful growing-season totals keyed by (point, year, parameters), shared by all
+# fetchers of the process so repeated requests for a location skip the POWER API.
+POWER_CACHE_SIZE = 50000
+_power_cache = OrderedDict()
+_power_cache_lock = threading.Lock()
+
+
+def clear_power_cache():
+    """Drops all cached growing-season totals."""
+    with _power_cache_lock:
+        _power_cache.clear()
 
 
 class ExternalClimateDataFetcher:
@@ -40,8 +55,10 @@ class ExternalClimateDataFetcher:
     calculate_totals(result)
         Calculates totals of precipitation and evapotranspiration from fetched data.
 
-    process_points_over_years()
+    process_points_over_years(by_year=False)
         Calculates average precipitation and evapotranspiration totals for multiple points across years.
+        Totals already fetched by this process are taken from the POWER cache. With
+        `by_year`, the totals of each year are returned as well.
 
     Examples
     --------
@@ -55,7 +72,7 @@ class ExternalClimateDataFetcher:
         self.start_year = start_year
         self.end_year = end_year
         self.base_url = "https://power.larc.nasa.gov/api/temporal/daily/point"
-        self.parameters = "PRECTOTCORR,T2M,RH2M,ALLSKY_SFC_SW_DWN"
+        self.parameters = ",".join(POWER_PARAMETERS)
         self.community = "AG"
 
     def fetch_data(self, point, year):
@@ -72,7 +89,8 @@ class ExternalClimateDataFetcher:
         Returns
         -------
         dict
-            A dictionary containing the success status, fetched data, or an error message.
+            A dictionary containing the success status, the fetched data decoded by
+            `parse_power_response` and its size in bytes, or an error message.
         """
         longitude, latitude = point
         start_date = f"{year}0501"  # May 1st
@@ -89,11 +107,12 @@ class ExternalClimateDataFetcher:
             response.raise_for_status()
             return {
                 "success": True,
-                "data": json.loads(response.content.decode("utf-8")),
+                "data": parse_power_response(response.content),
+                "bytes": len(response.content),
                 "point": point,
                 "year": year,
             }
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError) as e:
             return {"success": False, "error": str(e), "point": point, "year": year}
 
     def calculate_totals(self, result):
@@ -103,8 +122,8 @@ class ExternalClimateDataFetcher:
         Parameters
         ----------
         result : dict
-            The result from `fetch_data` containing the success status, fetched data,
-            or an error message.
+            The result from `fetch_data` containing the success status, the daily
+            arrays of the fetched data, or an error message.
 
         Returns
         -------
@@ -113,8 +132,6 @@ class ExternalClimateDataFetcher:
             the calculated total precipitation and total evapotranspiration or
             an error message, and the corresponding point and year.
         """
-        # response = self.fetch_growing_season_data()
-
         if not result["success"]:
             return result  # Return the error information directly
 
@@ -122,13 +139,12 @@ class ExternalClimateDataFetcher:
         point = result["point"]
         year = result["year"]
 
-        start_date = datetime.strptime(data["header"]["start"], "%Y%m%d")
-        end_date = datetime.strptime(data["header"]["end"], "%Y%m%d")
+        start_date = datetime.strptime(data["start"], "%Y%m%d")
+        end_date = datetime.strptime(data["end"], "%Y%m%d")
         expected_days_count = (end_date - start_date).days + 1
-        actual_days_count = len(data["properties"]["parameter"]["PRECTOTCORR"])
 
         # Check if the number of fetched days equals the number of expected days
-        if actual_days_count != expected_days_count:
+        if len(data["values"]) != expected_days_count:
             return {
                 "success": False,
                 "error": "Incomplete data for the growing season.",
@@ -136,20 +152,13 @@ class ExternalClimateDataFetcher:
                 "year": year,
             }
 
-        total_precipitation = 0
-        total_evapotranspiration = 0
-
-        for day in data["properties"]["parameter"]["PRECTOTCORR"]:
-            total_precipitation += data["properties"]["parameter"]["PRECTOTCORR"][day]
-            calculator = EvapotranspirationCalculator(
-                mean_daily_temperature=data["properties"]["parameter"]["T2M"][day],
-                solar_radiation=data["properties"]["parameter"]["ALLSKY_SFC_SW_DWN"][
-                    day
-                ],
-                relative_humidity=data["properties"]["parameter"]["RH2M"][day],
-            )
-            daily_evapotranspiration = calculator.calculate()
-            total_evapotranspiration += daily_evapotranspiration
+        daily = dict(zip(data["parameters"], data["values"].T))
+        total_precipitation = daily["PRECTOTCORR"].sum()
+        total_evapotranspiration = turc_evapotranspiration(
+            mean_daily_temperature=daily["T2M"],
+            solar_radiation=daily["ALLSKY_SFC_SW_DWN"],
+            relative_humidity=daily["RH2M"],
+        ).sum()
 
         return {
             "success": True,
@@ -158,11 +167,61 @@ class ExternalClimateDataFetcher:
             "year": year,
         }
 
-    def process_points_over_years(self):
+    def get_cached_totals(self, tasks):
+        """
+        Looks up growing-season totals fetched earlier by this process.
+
+        Parameters
+        ----------
+        tasks : list of tuple
+            (point, year) pairs.
+
+        Returns
+        -------
+        list
+            The cached result of each task, or None where it has not been fetched yet.
+        """
+        with _power_cache_lock:
+            results = []
+            for point, year in tasks:
+                key = (tuple(point), year, self.parameters)
+                result = _power_cache.get(key)
+                if result is not None:
+                    _power_cache.move_to_end(key)
+                results.append(result)
+            return results
+
+    def cache_totals(self, results):
+        """
+        Stores successful growing-season totals in the POWER cache, evicting the least
+        recently used entries beyond `POWER_CACHE_SIZE`.
+
+        Parameters
+        ----------
+        results : list of dict
+            Results returned by `calculate_totals`.
+        """
+        with _power_cache_lock:
+            for result in results:
+                if result["success"]:
+                    key = (tuple(result["point"]), result["year"], self.parameters)
+                    _power_cache[key] = result
+                    _power_cache.move_to_end(key)
+            while len(_power_cache) > POWER_CACHE_SIZE:
+                _power_cache.popitem(last=False)
+
+    def process_points_over_years(self, by_year=False):
         """
         Processes multiple geographic points over a specified range of years to calculate 
         average total precipitation and evapotranspiration.
 
+        Parameters
+        ----------
+        by_year : bool, optional
+            Whether to also return the totals of each year as 'P_by_year' and
+            'PE_by_year' arrays, ordered from `start_year` to `end_year`. Default is
+            False.
+
         Returns
         -------
         dict
@@ -175,9 +234,24 @@ class ExternalClimateDataFetcher:
             for year in range(self.start_year, self.end_year + 1)
         ]
         point_results = {}
-        with Pool(min(5, len(self.points))) as pool:
-            fetched_data = pool.starmap(self.fetch_data, all_tasks)
-            calculated_totals = pool.map(self.calculate_totals, fetched_data)
+        calculated_totals = self.get_cached_totals(all_tasks)
+        missing_tasks = [
+            task for task, totals in zip(all_tasks, calculated_totals) if totals is None
+        ]
+        count("cache_lookups.power", len(all_tasks))
+        count("cache_misses.power", len(missing_tasks))
+        if missing_tasks:
+            with Pool(min(5, len(missing_tasks))) as pool:
+                fetched_data = pool.starmap(self.fetch_data, missing_tasks)
+            # The decoded arrays are reduced here, cheaper than sending them to a worker
+            fetched_totals = map(self.calculate_totals, fetched_data)
+            count("power_requests", len(fetched_data))
+            count("bytes_read", sum(data.get("bytes", 0) for data in fetched_data))
+            calculated_totals = [
+                next(fetched_totals) if totals is None else totals
+                for totals in calculated_totals
+            ]
+            self.cache_totals(calculated_totals)
 
         # Organize results by point and average across years
         for yearly_result in calculated_totals:
@@ -200,6 +274,9 @@ class ExternalClimateDataFetcher:
         # Calculate averages only for points with all years successful
         for point, data in point_results.items():
             if data["success"]:
+                if by_year:
+                    data["P_by_year"] = np.array(data["P"], dtype=float)
+                    data["PE_by_year"] = np.array(data["PE"], dtype=float)
                 data["P"] = np.round(np.mean(data["P"]), 2)
                 data["PE"] = np.round(np.mean(data["PE"]), 2)
             else:
@@ -1,9 +1,13 @@
 import os
+import sys
 import json
 import rasterio
-import pandas as pd
 import numpy as np
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_table
+from src.instrumentation import count
+
 
 class ExternalSoilTextureDataFetcher:
     """
@@ -15,6 +19,9 @@ class ExternalSoilTextureDataFetcher:
     ----------
     points : list of tuples
         List of (longitude, latitude) tuples for which soil texture data is required.
+    rng : numpy.random.Generator, optional
+        The random number generator sampling the soil texture values of all points but
+        the first. Defaults to a generator seeded from fresh entropy.
 
     Attributes
     ----------
@@ -45,7 +52,7 @@ class ExternalSoilTextureDataFetcher:
         Retrieves the soil mapping unit ID (SMU_ID) at specified coordinates.
     lookup_soil_texture(smu_id)
         Returns the soil texture type associated with a soil mapping unit ID (SMU_ID).
-    get_soil_texture_values()
+    get_soil_texture_values(midpoints_only=False)
         Fetches soil texture values for all specified points and returns them.
 
     Examples
@@ -55,8 +62,9 @@ class ExternalSoilTextureDataFetcher:
     >>> soil_textures = fetcher.get_soil_texture()
     """
 
-    def __init__(self, points):
+    def __init__(self, points, rng=None):
         self.points = points
+        self.rng = rng if rng is not None else np.random.default_rng()
         self.dir = os.path.dirname(__file__)
         self.smu_csv_path = os.path.join(
             self.dir, "../../data/external/HWSD2/HWSD2_SMU.csv"
@@ -78,8 +86,8 @@ class ExternalSoilTextureDataFetcher:
         Loads CSV data into pandas DataFrames, including soil mapping unit (SMU)
         data and texture classification data.
         """
-        self.smu_df = pd.read_csv(self.smu_csv_path)
-        self.texture_df = pd.read_csv(self.texture_csv_path)
+        self.smu_df = load_reference_table(self.smu_csv_path)
+        self.texture_df = load_reference_table(self.texture_csv_path)
 
     def load_user_rf_tx_distributions(self):
         """
@@ -125,8 +133,7 @@ class ExternalSoilTextureDataFetcher:
             return rf_tx_distributions["midpoint"].get(soil_type)
 
         low, high = rf_tx_distributions["range"].get(soil_type)
-        sampled_rf_tx = np.random.uniform(low, high, 1)
-        return sampled_rf_tx[0]
+        return self.rng.uniform(low, high)
 
     def open_raster(self):
         """Opens the raster data file for geographical data extraction."""
@@ -155,7 +162,9 @@ class ExternalSoilTextureDataFetcher:
             The soil mapping unit id (SMU_ID) corresponding to the provided coordinates.
         """
         row, col = self.src.index(lon, lat)
-        return self.src.read(1)[row, col]
+        # Read only the pixel at the point instead of the whole band
+        window = ((row, row + 1), (col, col + 1))
+        return self.src.read(1, window=window)[0, 0]
 
     def lookup_soil_texture(self, smu_id):
         """
@@ -190,10 +199,17 @@ class ExternalSoilTextureDataFetcher:
         # print(f"No matching SMU_ID for the selected point: 'no matching SMU ID'.")
         return "no matching SMU ID"
 
-    def get_soil_texture_values(self):
+    def get_soil_texture_values(self, midpoints_only=False):
         """
         Retrieves and maps soil texture data for all specified geographic points.
 
+        Parameters
+        ----------
+        midpoints_only : bool, optional
+            Whether every point takes the midpoint value of its soil texture, as the
+            first point does, instead of a sampled value (default is False). Used when
+            the points are separate farms rather than samples around one farm.
+
         Returns
         ----------
         dict
@@ -205,9 +221,11 @@ class ExternalSoilTextureDataFetcher:
         for lon, lat in self.points:
             smu_id = self.get_raster_value(lon, lat)
             texture_type = self.lookup_soil_texture(smu_id)
-            rf_tx = self.sampling_rf_tx(texture_type, first_point)
+            rf_tx = self.sampling_rf_tx(texture_type, first_point or midpoints_only)
             rf_tx_values[(lon, lat)] = rf_tx
             first_point = False
+        count("raster_reads", len(self.points))
+        count("bytes_read", len(self.points) * np.dtype(self.src.dtypes[0]).itemsize)
         self.close_raster()
 
         return rf_tx_values
@@ -1,11 +1,21 @@
 import os
 import json
 import pandas as pd
+import sys
 import numpy as np
-import geopandas as gpd
-from shapely.geometry import Point
 from datetime import datetime
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_table
+from src.data_loader.province_lookup import lookup_provinces
+from src.data_loader.input_index import (
+    KEY_DTYPES,
+    get_input_index,
+    is_indexed_input,
+)
+from src.data_loader.columnar_input import is_columnar_input, read_columnar_input
+from src.instrumentation import timed
+
 
 class FarmDataManager:
     """
@@ -19,6 +29,9 @@ class FarmDataManager:
         Unique identifier for the farm.
     crop : str
         Name of the crop.
+    location_index : LocationIndex, optional
+        Precomputed province and ecodistrict lookups. When the farm's location is
+        indexed, the province shapefile is not loaded.
 
     Attributes
     ----------
@@ -34,8 +47,11 @@ class FarmDataManager:
         Path to the mapping of crops to their groups.
     farm_data : dict
         Processed farm data.
-    farm_gdf : GeoDataFrame
-        Geospatial data frame of the farm's location.
+    location : dict or None
+        The indexed province and ecodistrict ID of the farm, if available.
+    farm_gdf : GeoDataFrame or None
+        Geospatial data frame of the farm's location; None until needed when the
+        location was resolved from the index.
     province : str
         Province where the farm is located.
     crop_group : str
@@ -45,8 +61,10 @@ class FarmDataManager:
     -------
     get_farm_data()
         Retrieves and processes the farm data from the specified input file.
+    lookup_location()
+        Looks up the farm's province and ecodistrict in the location index.
     get_farm_gdf()
-        Creates a GeoDataFrame for the farm's location and joins it with province spatial data.
+        Creates a GeoDataFrame for the farm's location and looks up its province.
     get_province()
         Retrieves the province name for the farm location.
     get_crop_group()
@@ -55,11 +73,19 @@ class FarmDataManager:
         Updates the farm data dictionary with province and crop group details.
     validate_data()
         Validates the processed farm data for type integrity and logical correctness.
+    read_input_table(input_file)
+        Reads the rows of an input file as they are stored.
+    get_farm_crops(input_file, farm_id)
+        Returns the crops of a farm in an input file.
+    get_farm_data_batch(input_file, farms=None)
+        Reads the input file once and returns the converted and validated data of many
+        farms as columns.
     """
 
-    def __init__(self, input_file, farm_id, crop):
+    def __init__(self, input_file, farm_id, crop, location_index=None):
         self.farm_id = farm_id
         self.crop = crop
+        self.location_index = location_index
         self.dir = os.path.dirname(__file__)
         self.input_file_path = os.path.join(self.dir, "..", "..", input_file)
         # self.province = None
@@ -67,18 +93,33 @@ class FarmDataManager:
             self.dir, "../../data/preprocessed/crop_to_group.csv"
         )
         self.farm_data = self.get_farm_data()
-        self.farm_gdf = self.get_farm_gdf()
+        self.location = self.lookup_location()
+        self.farm_gdf = self.get_farm_gdf() if self.location is None else None
         self.province = self.get_province()
         self.crop_group = self.get_crop_group()
         self.update_farm_dict()
 
+    @timed("farm_data")
     def get_farm_data(self):
         file_extension = os.path.splitext(self.input_file_path)[1]
         if file_extension == ".csv":
-            df = pd.read_csv(self.input_file_path)
-            df = df.query(
-                f"farm_id == '{self.farm_id}' and common_crop_name == '{self.crop}'"
-            ).copy()
+            if is_indexed_input(self.input_file_path):
+                index = get_input_index(self.input_file_path)
+                df = index.read_rows([(self.farm_id, self.crop)])
+            else:
+                df = load_reference_table(self.input_file_path, KEY_DTYPES)
+                df = df[
+                    (df["farm_id"] == self.farm_id)
+                    & (df["common_crop_name"] == self.crop)
+                ].copy()
+            if df.empty:
+                raise ValueError(
+                    f"No farm data found for farm_id {self.farm_id} with crop {self.crop}"
+                )
+        elif is_columnar_input(self.input_file_path):
+            df = read_columnar_input(
+                self.input_file_path, farms=[(self.farm_id, self.crop)]
+            )
             if df.empty:
                 raise ValueError(
                     f"No farm data found for farm_id {self.farm_id} with crop {self.crop}"
@@ -93,12 +134,10 @@ class FarmDataManager:
         else:
             raise ValueError("Unsupported file format")
 
-        df.loc[:, "area_in_m2"] = (
-            df["area_in_m2"].astype(float).map(lambda x: x * 0.0001)
-        )  # Convert and scale area
-        df.loc[:, "yield_kg_per_m2"] = (
-            df["yield_kg_per_m2"].astype(float).map(lambda x: x * 10000)
-        )  # Convert and scale yield
+        df = df.iloc[:1].copy()
+        # Convert and scale area and yield
+        df["area_in_m2"] = df["area_in_m2"].astype(float) * 0.0001
+        df["yield_kg_per_m2"] = df["yield_kg_per_m2"].astype(float) * 10000
         df.loc[:, "start_year"] = df["start_year"].astype(
             int
         )  # Ensure year is an integer
@@ -127,7 +166,20 @@ class FarmDataManager:
         self.validate_data()
         return self.farm_data
 
+    def lookup_location(self):
+        # Resolve the province and ecodistrict without shapefiles if precomputed
+        if self.location_index is None:
+            return None
+        return self.location_index.lookup(
+            self.farm_data["longitude"], self.farm_data["latitude"]
+        )
+
+    @timed("province_join")
     def get_farm_gdf(self):
+        # Deferred so that indexed locations never import the geospatial stack
+        import geopandas as gpd
+        from shapely.geometry import Point
+
         # Convert single values to lists if necessary
         if isinstance(self.farm_data["longitude"], (int, float)):
             longitudes = [self.farm_data["longitude"]]
@@ -137,20 +189,19 @@ class FarmDataManager:
             latitudes = self.farm_data["latitude"]
 
         locations = [Point(x, y) for x, y in zip(longitudes, latitudes)]
-        farm_point = gpd.GeoDataFrame({"geometry": locations}, crs="EPSG:4326")
-        province_shp_path = os.path.join(self.dir, "../../data/external/province_10m")
-        provinces = gpd.read_file(province_shp_path).to_crs("EPSG:4326")
-        farm_province = gpd.sjoin(
-            farm_point,
-            provinces[["PRENAME", "geometry"]],
-            how="left",
-            predicate="within",
-        ).drop(columns=["index_right"])
-
-        farm_province.rename(columns={"PRENAME": "province"}, inplace=True)
-        return farm_province
+        # The simplified province layer decides interior farms, the detailed one
+        # farms near a boundary
+        return gpd.GeoDataFrame(
+            {
+                "geometry": locations,
+                "province": lookup_provinces(longitudes, latitudes),
+            },
+            crs="EPSG:4326",
+        )
 
     def get_province(self):
+        if self.location is not None:
+            return self.location["province"]
         province = self.farm_gdf["province"].iloc[0]
         if pd.isna(province):
             raise ValueError(
@@ -159,10 +210,10 @@ class FarmDataManager:
         return province
 
     def get_crop_group(self):
-        crop_to_group_map_df = pd.read_csv(self.crop_to_group_map_path)
-        crop_group = crop_to_group_map_df.query(f"crop == '{self.farm_data['crop']}'")[
-            "group"
-        ].iloc[0]
+        crop_to_group_map_df = load_reference_table(self.crop_to_group_map_path)
+        crop_group = crop_to_group_map_df[
+            crop_to_group_map_df["crop"] == self.farm_data["crop"]
+        ]["group"].iloc[0]
         return crop_group
 
     def update_farm_dict(self):
@@ -198,6 +249,163 @@ class FarmDataManager:
                 "End year must be larger than 1984 and less than the current year"
             )
 
+    @staticmethod
+    def read_input_table(input_file):
+        """
+        Reads the rows of an input file as they are stored, without conversion.
+
+        Parameters
+        ----------
+        input_file : str
+            Path to the input CSV, JSON, Parquet or Arrow file relative to the project
+            root.
+
+        Returns
+        -------
+        DataFrame
+            One row per farm and crop, with the 'farm_id' of JSON records as a column.
+            CSV tables are shared between callers and must not be modified.
+
+        Raises
+        ------
+        ValueError
+            If the file format is unsupported.
+        """
+        input_file_path = os.path.join(
+            os.path.dirname(__file__), "..", "..", input_file
+        )
+        file_extension = os.path.splitext(input_file_path)[1]
+        if file_extension == ".csv":
+            return load_reference_table(input_file_path, KEY_DTYPES)
+        if is_columnar_input(input_file_path):
+            return read_columnar_input(input_file_path)
+        if file_extension == ".json":
+            with open(input_file_path, "r") as file:
+                data = json.load(file)
+            return pd.DataFrame(
+                [{**record, "farm_id": farm_id} for farm_id, record in data.items()]
+            )
+        raise ValueError("Unsupported file format")
+
+    @staticmethod
+    def get_farm_crops(input_file, farm_id):
+        """
+        Returns the crops of a farm in an input file.
+
+        Parameters
+        ----------
+        input_file : str
+            Path to the input CSV, JSON, Parquet or Arrow file relative to the project
+            root.
+        farm_id : str
+            Identifier for the farm.
+
+        Returns
+        -------
+        list of str
+            The distinct crops of the farm, in the order of the file.
+
+        Raises
+        ------
+        ValueError
+            If the farm is missing from the input file.
+        """
+        input_file_path = os.path.join(
+            os.path.dirname(__file__), "..", "..", input_file
+        )
+        if is_indexed_input(input_file_path):
+            crops = get_input_index(input_file_path).crops(farm_id)
+        elif is_columnar_input(input_file_path):
+            df = read_columnar_input(input_file_path, farm_id=farm_id)
+            crops = df["common_crop_name"].unique().tolist()
+        else:
+            df = FarmDataManager.read_input_table(input_file)
+            crops = df["common_crop_name"][df["farm_id"] == farm_id].unique().tolist()
+        if not crops:
+            raise ValueError(f"No farm data found for farm_id '{farm_id}'")
+        return crops
+
+    @staticmethod
+    def get_farm_data_batch(input_file, farms=None):
+        """
+        Reads the input file once and returns the converted and validated data of many
+        farms as columns.
+
+        Parameters
+        ----------
+        input_file : str
+            Path to the input CSV, JSON, Parquet or Arrow file relative to the project
+            root.
+        farms : list of tuple, optional
+            The (farm_id, crop) pairs to select, in the order they are returned. By
+            default every row of the input file is returned.
+
+        Returns
+        -------
+        DataFrame
+            One row per farm with the columns 'farm_id', 'area', 'latitude',
+            'longitude', 'crop', 'yield', 'start_year' and 'end_year', converted to the
+            units of `get_farm_data`.
+
+        Raises
+        ------
+        ValueError
+            If the file format is unsupported, a requested farm is missing or a value
+            is out of range.
+        """
+        input_file_path = os.path.join(
+            os.path.dirname(__file__), "..", "..", input_file
+        )
+        if farms is not None and is_indexed_input(input_file_path):
+            # Only the selected rows are read from large files
+            df = get_input_index(input_file_path).read_rows(farms)
+        elif farms is not None and is_columnar_input(input_file_path):
+            df = read_columnar_input(input_file_path, farms=farms)
+        else:
+            df = FarmDataManager.read_input_table(input_file)
+
+        if farms is not None:
+            # Like get_farm_data, the first row of a (farm_id, crop) pair is used
+            df = df.drop_duplicates(["farm_id", "common_crop_name"], keep="first")
+            keys = pd.MultiIndex.from_frame(df[["farm_id", "common_crop_name"]])
+            positions = keys.get_indexer(pd.MultiIndex.from_tuples(farms))
+            missing = [farm for farm, pos in zip(farms, positions) if pos < 0]
+            if missing:
+                raise ValueError(f"No farm data found for (farm_id, crop) {missing}")
+            df = df.iloc[positions]
+
+        farm_df = pd.DataFrame(
+            {
+                "farm_id": df["farm_id"].to_numpy(),
+                "area": df["area_in_m2"].to_numpy(dtype=float) * 0.0001,
+                "latitude": df["latitude"].to_numpy(dtype=float),
+                "longitude": df["longitude"].to_numpy(dtype=float),
+                "crop": df["common_crop_name"].to_numpy(),
+                "yield": df["yield_kg_per_m2"].to_numpy(dtype=float) * 10000,
+                "start_year": df["start_year"].to_numpy(dtype=int),
+                "end_year": df["end_year"].to_numpy(dtype=int),
+            }
+        )
+
+        checks = [
+            (farm_df["yield"] <= 0, "Yield must be larger than 0"),
+            (farm_df["area"] <= 0, "Area must be larger than 0"),
+            (
+                ~farm_df["start_year"].between(1984, datetime.now().year),
+                "Start year must be larger than 1984 and less than the current year",
+            ),
+            (
+                ~farm_df["end_year"].between(1984, datetime.now().year),
+                "End year must be larger than 1984 and less than the current year",
+            ),
+        ]
+        for invalid, message in checks:
+            if invalid.any():
+                raise ValueError(
+                    f"{message} (farms: {farm_df['farm_id'][invalid].tolist()})"
+                )
+        return farm_df
+
 
 # Example usage
 if __name__ == "__main__":
@@ -2,6 +2,7 @@ import sys
 import os
 import json
 import numpy as np
+import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from src.data_loader.get_farm_data import FarmDataManager
@@ -9,6 +10,16 @@ from src.data_loader.get_climate_soil_params import ClimateSoilDataManager
 from src.data_loader.get_modifiers import ModifiersManager
 from src.data_loader.get_crop_group_params import CropGroupManager
 from src.data_loader.get_crop_params import CropParametersManager
+from src.data_loader.location_index import get_location_index, resolve_locations
+from src.data_loader.canada_prefilter import outside_canada
+from src.data_loader.location_cache import (
+    get_location_cache,
+    has_climate_data,
+    location_key,
+)
+from src.data_loader.samplers import Sampler
+from src.data_loader.random_streams import farm_generators
+from src.instrumentation import timed
 
 
 class FarmDataHub:
@@ -39,6 +50,19 @@ class FarmDataHub:
         Sampling mode for crop parameters ('default' or 'user_define').
     sampl_crop_group : str
         Sampling mode for crop group parameters ('default' or 'user_define').
+    location_index : LocationIndex or None
+        Precomputed farm locations. Defaults to the index in 'data/preprocessed', which
+        lets indexed farms skip the province and ecodistrict shapefiles.
+    sampling_method : str
+        The design drawing the samples in 'scientific' mode ('mc', 'lhs' or 'sobol'),
+        shared by all parameter managers.
+    seed : int or None
+        The seed of the run. The samples of each farm and crop come from their own
+        streams, see `random_streams`, so runs are reproducible and independent of
+        how farms are split across processes. None draws fresh entropy.
+    chunk : int
+        The number of this chunk of runs of the farm, e.g. the batch of an adaptive
+        run, which selects independent streams for each chunk.
 
     Methods
     -------
@@ -47,6 +71,12 @@ class FarmDataHub:
         i.e., reduction factors), crop-related parameters, and crop group-related parameters
         based on the specified data source and operation mode. This method acts as the central 
         function called to initiate data fetching and integration.
+    get_location_data(farm)
+        Returns the climate and soil data and the ecodistrict ID of the farm's location
+        in farmer's mode, reusing the results of earlier runs at the same location.
+    gather_many(input_file, farms=None, source='default', location_index=None)
+        Gathers the farmer's mode parameters of many farms at once, reading the input file 
+        once and resolving all lookups with vectorized joins.
 
     Raises
     ------
@@ -65,6 +95,10 @@ class FarmDataHub:
         sampl_modifier="default",
         sampl_crop="default",
         sampl_crop_group="default",
+        location_index=None,
+        sampling_method="mc",
+        seed=None,
+        chunk=0,
     ):
         self.input_file = input_file
         self.farm_id = farm_id
@@ -75,7 +109,12 @@ class FarmDataHub:
         self.sampl_modifier = sampl_modifier
         self.sampl_crop = sampl_crop
         self.sampl_crop_group = sampl_crop_group
+        self.location_index = location_index
+        self.sampling_method = sampling_method
+        self.seed = seed
+        self.chunk = chunk
 
+    @timed("gather_all_data")
     def gather_all_data(self):
         """
         Gathers all necessary data from various managers, handles different data sources 
@@ -93,18 +132,19 @@ class FarmDataHub:
             If an invalid parameter length is detected in the assembled data or if an invalid 
             source and operation mode combination is provided.
         """
+        location_index = self.location_index
+        if location_index is None:
+            location_index = get_location_index()
         farm = FarmDataManager(
-            input_file=self.input_file, farm_id=self.farm_id, crop=self.crop
+            input_file=self.input_file,
+            farm_id=self.farm_id,
+            crop=self.crop,
+            location_index=location_index,
         )
         farm_data = farm.farm_data
 
         if self.source == "default":
-            climate_data_extractor = ClimateSoilDataManager(
-                farm,
-                source=self.source,
-            )
-            climate_data = climate_data_extractor.get_climate_soil_data()
-            eco_id = climate_data_extractor.eco_id
+            climate_data, eco_id = self.get_location_data(farm)
             farm_data["eco_id"] = eco_id
             modifiers_manager = ModifiersManager(farm_data)
             modifiers = modifiers_manager.modifiers
@@ -134,11 +174,7 @@ class FarmDataHub:
             return all_params
 
         if self.source == "external" and self.operation_mode == "farmer":
-            climate_data_extractor = ClimateSoilDataManager(
-                farm, source=self.source, operation_mode=self.operation_mode
-            )
-            climate_data = climate_data_extractor.get_climate_soil_data()
-            eco_id = climate_data_extractor.eco_id
+            climate_data, eco_id = self.get_location_data(farm)
             farm_data["eco_id"] = eco_id
             modifiers_manager = ModifiersManager(farm_data)
             modifiers = modifiers_manager.modifiers
@@ -167,11 +203,15 @@ class FarmDataHub:
             return all_params
 
         if self.source == "external" and self.operation_mode == "scientific":
+            rngs = farm_generators(self.seed, self.farm_id, self.crop, self.chunk)
+            sampler = Sampler(self.sampling_method, seed=rngs["design"])
             climate_data_extractor = ClimateSoilDataManager(
                 farm,
                 source=self.source,
                 operation_mode=self.operation_mode,
                 num_runs=self.num_runs,
+                sampler=sampler,
+                rngs=rngs,
             )
             climate_data = climate_data_extractor.get_climate_soil_data()
 
@@ -180,17 +220,23 @@ class FarmDataHub:
 
             modifiers_manager = ModifiersManager(farm_data)
             modifiers = modifiers_manager.sample_modifiers(
-                sampling_mode=self.sampl_modifier, num_samples=self.num_runs
+                sampling_mode=self.sampl_modifier,
+                num_samples=self.num_runs,
+                sampler=sampler,
             )
 
             crop_parameters_manager = CropParametersManager(farm_data, climate_data)
             crop_params = crop_parameters_manager.sample_crop_parameters(
-                sampling_mode=self.sampl_crop, num_samples=self.num_runs
+                sampling_mode=self.sampl_crop,
+                num_samples=self.num_runs,
+                sampler=sampler,
             )
 
             crop_group_manager = CropGroupManager(farm_data)
             crop_group_params = crop_group_manager.sample_crop_group_parameters(
-                sampling_mode=self.sampl_crop_group, num_samples=self.num_runs
+                sampling_mode=self.sampl_crop_group,
+                num_samples=self.num_runs,
+                sampler=sampler,
             )
 
             all_params = {
@@ -223,6 +269,242 @@ class FarmDataHub:
 
         raise ValueError("Scientific mode cannot be run. Excution Halted.")
 
+    def get_location_data(self, farm):
+        """
+        Returns the climate and soil data and the ecodistrict ID of the farm's location
+        in farmer's mode. They do not depend on the crop, so they are taken from the
+        location cache when the same location, years and source were run before.
+
+        Parameters
+        ----------
+        farm : FarmDataManager
+            The farm.
+
+        Returns
+        -------
+        tuple
+            The climate and soil data dictionary and the ecodistrict ID.
+        """
+        cache = get_location_cache()
+        key = location_key(farm.farm_data, self.source)
+        location_data = cache.get(key, "climate_soil")
+        if location_data is None:
+            climate_data_extractor = ClimateSoilDataManager(
+                farm, source=self.source, operation_mode=self.operation_mode
+            )
+            location_data = {
+                "climate_data": climate_data_extractor.get_climate_soil_data(),
+                "eco_id": climate_data_extractor.eco_id,
+            }
+            if has_climate_data(location_data["climate_data"]):
+                cache.put(key, "climate_soil", location_data)
+        return location_data["climate_data"], location_data["eco_id"]
+
+    @classmethod
+    def gather_many(
+        cls,
+        input_file,
+        farms=None,
+        source="default",
+        location_index=None,
+        by_year=False,
+    ):
+        """
+        Gathers the farmer's mode parameters of many farms at once. The input file is 
+        read once, and provinces, ecodistricts, climate data, crop groups, modifiers and 
+        crop parameters are resolved for all farms with vectorized joins.
+
+        Parameters
+        ----------
+        input_file : str
+            Path to the file containing the farms' data.
+        farms : list of tuple, optional
+            The (farm_id, crop) pairs to gather, in order. Defaults to every row of the 
+            input file.
+        source : str, optional
+            The source of the climate and soil data ('default' or 'external'). Defaults 
+            to 'default'.
+        location_index : LocationIndex, optional
+            Precomputed farm locations. Defaults to the index in 'data/preprocessed'; 
+            farms that are not indexed are resolved with one spatial join per layer.
+        by_year : bool, optional
+            Whether the climate data also holds the precipitation and
+            evapotranspiration of each year as 'P_by_year' and 'PE_by_year', see
+            `fetch_external_batch`. Requires the 'external' source. Defaults to False.
+
+        Returns
+        -------
+        dict
+            A dictionary with the same structure as the farmer's mode output of 
+            `gather_all_data`, where every array holds one value per farm ('locations' 
+            holds one (longitude, latitude) row per farm).
+
+        Raises
+        ------
+        ValueError
+            If a farm is missing from the input file or outside Canada, a lookup fails or 
+            an invalid source is provided.
+        """
+        if source not in ["default", "external"]:
+            raise ValueError(f"Invalid source '{source}'. Execution Halted.")
+        if by_year and source != "external":
+            raise ValueError("Per-year climate data requires the 'external' source.")
+        if location_index is None:
+            location_index = get_location_index()
+
+        farm_df = FarmDataManager.get_farm_data_batch(input_file, farms)
+
+        # Resolve each distinct location once, the index first and shapefiles after
+        points = farm_df[["longitude", "latitude"]].drop_duplicates()
+        found = location_index.lookup_many(points["longitude"], points["latitude"])
+        missing = (found["province"].isna() | found["eco_id"].isna()).to_numpy()
+        if missing.any():
+            unindexed = points[missing]
+            # Farms certainly outside Canada are reported before any spatial join
+            outside = unindexed[
+                outside_canada(unindexed["longitude"], unindexed["latitude"])
+            ]
+            rejected = pd.MultiIndex.from_frame(
+                farm_df[["longitude", "latitude"]]
+            ).isin(pd.MultiIndex.from_frame(outside))
+            if rejected.any():
+                raise ValueError(
+                    "Selected location is not in Canada, select a new location in "
+                    f"Canada (farms: {farm_df['farm_id'][rejected].tolist()})"
+                )
+            resolved = resolve_locations(unindexed["longitude"], unindexed["latitude"])
+            found.loc[missing, ["province", "eco_id"]] = resolved[
+                ["province", "eco_id"]
+            ].to_numpy()
+        points = pd.concat([points.reset_index(drop=True), found], axis=1)
+        farm_df = farm_df.merge(points, on=["longitude", "latitude"], how="left")
+
+        for unresolved, message in [
+            (
+                farm_df["province"].isna(),
+                "Selected location is not in Canada, select a new location in Canada",
+            ),
+            (farm_df["eco_id"].isna(), "Selected location is not in an ecodistrict"),
+        ]:
+            if unresolved.any():
+                raise ValueError(
+                    f"{message} (farms: {farm_df['farm_id'][unresolved].tolist()})"
+                )
+
+        provinces = farm_df["province"].to_numpy(dtype=str)
+        eco_ids = farm_df["eco_id"].to_numpy(dtype=np.int64)
+        climate_data = ClimateSoilDataManager.get_default_climate_soil_batch(
+            eco_ids, provinces
+        )
+        climate_data["locations"] = farm_df[["longitude", "latitude"]].to_numpy()
+        if source == "external":
+            climate_data.update(cls.fetch_external_batch(farm_df, by_year=by_year))
+        climate_keys = ["P", "PE", "FR_Topo", "locations", "soil_texture"]
+        if by_year:
+            climate_keys += ["P_by_year", "PE_by_year"]
+        climate_data = {key: climate_data[key] for key in climate_keys}
+
+        groups, crop_group_params = CropGroupManager.get_crop_group_parameters_batch(
+            farm_df["crop"]
+        )
+        crop_params = CropParametersManager.get_crop_parameters_batch(
+            farm_df["crop"], climate_data["P"], climate_data["PE"]
+        )
+        modifiers = ModifiersManager.get_modifiers_batch(provinces)
+
+        farm_data = {
+            "farm_id": farm_df["farm_id"].to_numpy(dtype=str),
+            "area": farm_df["area"].to_numpy(),
+            "latitude": farm_df["latitude"].to_numpy(),
+            "longitude": farm_df["longitude"].to_numpy(),
+            "crop": farm_df["crop"].to_numpy(dtype=str),
+            "yield": farm_df["yield"].to_numpy(),
+            "start_year": farm_df["start_year"].to_numpy(),
+            "end_year": farm_df["end_year"].to_numpy(),
+            "eco_id": eco_ids,
+            "province": provinces,
+            "group": groups.astype(str),
+        }
+
+        return {
+            "farm_data": farm_data,
+            "crop_group_params": crop_group_params,
+            "crop_parameters": crop_params,
+            "climate_data": climate_data,
+            "modifiers": modifiers,
+        }
+
+    @staticmethod
+    def fetch_external_batch(farm_df, by_year=False):
+        """
+        Fetches external precipitation, evapotranspiration and soil texture for many 
+        farms, requesting each distinct location and year range once.
+
+        Parameters
+        ----------
+        farm_df : DataFrame
+            Farms with the columns 'longitude', 'latitude', 'start_year' and 'end_year'.
+        by_year : bool, optional
+            Whether to also return the precipitation and evapotranspiration of each
+            year. Default is False.
+
+        Returns
+        -------
+        dict
+            A dictionary with NumPy arrays of 'P', 'PE' and 'soil_texture', one value per 
+            farm. Failed climate fetches yield NaN. With `by_year`, 'P_by_year' and
+            'PE_by_year' hold one row per farm and one column per year from the earliest
+            start year to the latest end year of all farms, NaN outside the farm's
+            years.
+        """
+        from src.data_loader.get_external_climate_params import (
+            ExternalClimateDataFetcher,
+        )
+        from src.data_loader.get_external_soil_params import (
+            ExternalSoilTextureDataFetcher,
+        )
+
+        points = list(zip(farm_df["longitude"], farm_df["latitude"]))
+        soil_data = ExternalSoilTextureDataFetcher(
+            list(dict.fromkeys(points))
+        ).get_soil_texture_values(midpoints_only=True)
+
+        P = np.full(len(farm_df), np.nan)
+        PE = np.full(len(farm_df), np.nan)
+        first_year = farm_df["start_year"].min()
+        num_years = farm_df["end_year"].max() - first_year + 1 if by_year else 0
+        P_by_year = np.full((len(farm_df), num_years), np.nan)
+        PE_by_year = np.full((len(farm_df), num_years), np.nan)
+        year_ranges = farm_df.groupby(["start_year", "end_year"]).indices
+        for (start_year, end_year), rows in year_ranges.items():
+            range_points = list(dict.fromkeys(points[row] for row in rows))
+            climate_data = ExternalClimateDataFetcher(
+                range_points, start_year, end_year
+            ).process_points_over_years(by_year=by_year)
+            years = slice(start_year - first_year, end_year - first_year + 1)
+            for row in rows:
+                point_data = climate_data[points[row]]
+                if point_data["success"]:
+                    P[row] = point_data["P"]
+                    PE[row] = point_data["PE"]
+                    if by_year:
+                        P_by_year[row, years] = point_data["P_by_year"]
+                        PE_by_year[row, years] = point_data["PE_by_year"]
+                else:
+                    print(
+                        f"Error fetching climate data for point {points[row]}: "
+                        f"{point_data['error']}"
+                    )
+
+        external_data = {
+            "P": P,
+            "PE": PE,
+            "soil_texture": np.array([soil_data[point] for point in points]),
+        }
+        if by_year:
+            external_data.update({"P_by_year": P_by_year, "PE_by_year": PE_by_year})
+        return external_data
+
 
 # Example usage
 if __name__ == "__main__":
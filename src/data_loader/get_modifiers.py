@@ -1,10 +1,205 @@
 import os
+import sys
 import json
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.samplers import Sampler
+from src.instrumentation import timed
+
 # import geopandas as gpd
 
+WESTERN_CANADA = [
+    "Alberta",
+    "British Columbia",
+    "Manitoba",
+    "Saskatchewan",
+    "Northwest Territories",
+    "Nunavut",
+]
+
+MODIFIER_NAMES = ["RF_AM", "RF_CS", "RF_NS", "RF_Till"]
+
+
+class ModifierTable:
+    """
+    Holos reduction factors compiled into one dense lookup array covering every
+    combination of region, tillage, application method, crop group and nitrogen source,
+    so that modifiers for any number of farms resolve with array indexing.
+
+    Parameters
+    ----------
+    rf_am_df : DataFrame
+        Reduction factors by application method ('method', 'value').
+    rf_cs_df : DataFrame
+        Reduction factors by cropping system group ('group', 'value').
+    rf_ns_df : DataFrame
+        Reduction factors by nitrogen source ('N_source', 'value').
+    rf_till_df : DataFrame
+        Reduction factors by region and tillage ('region', 'tillage', 'value').
+
+    Attributes
+    ----------
+    axes : dict
+        The labels along each axis of `values`, keyed by 'region', 'tillage', 'method',
+        'group' and 'n_source'.
+    values : numpy.ndarray
+        Array of shape (region, tillage, method, group, n_source, 4) holding RF_AM,
+        RF_CS, RF_NS and RF_Till for every combination.
+
+    Methods
+    -------
+    get_codes(axis, labels)
+        Converts labels along an axis into integer positions.
+    lookup(region, tillage, method, group, n_source)
+        Returns the reduction factors for scalar or array-valued keys.
+    """
+
+    def __init__(self, rf_am_df, rf_cs_df, rf_ns_df, rf_till_df):
+        self.axes = {
+            "region": sorted(rf_till_df["region"].unique()),
+            "tillage": sorted(rf_till_df["tillage"].unique()),
+            "method": list(rf_am_df["method"]),
+            "group": list(rf_cs_df["group"]),
+            "n_source": list(rf_ns_df["N_source"]),
+        }
+        self._positions = {
+            axis: {label: i for i, label in enumerate(labels)}
+            for axis, labels in self.axes.items()
+        }
+
+        till = np.full((len(self.axes["region"]), len(self.axes["tillage"])), np.nan)
+        regions = self.get_codes("region", rf_till_df["region"])
+        tillages = self.get_codes("tillage", rf_till_df["tillage"])
+        till[regions, tillages] = rf_till_df["value"].astype(float)
+
+        shape = [len(labels) for labels in self.axes.values()]
+        self.values = np.empty(shape + [len(MODIFIER_NAMES)], dtype=np.float64)
+        self.values[..., 0] = rf_am_df["value"].to_numpy(float)[
+            np.newaxis, np.newaxis, :, np.newaxis, np.newaxis
+        ]
+        self.values[..., 1] = rf_cs_df["value"].to_numpy(float)[
+            np.newaxis, np.newaxis, np.newaxis, :, np.newaxis
+        ]
+        self.values[..., 2] = rf_ns_df["value"].to_numpy(float)[
+            np.newaxis, np.newaxis, np.newaxis, np.newaxis, :
+        ]
+        self.values[..., 3] = till[:, :, np.newaxis, np.newaxis, np.newaxis]
+
+    def get_codes(self, axis, labels):
+        """
+        Converts labels along an axis into integer positions.
+
+        Parameters
+        ----------
+        axis : str
+            One of 'region', 'tillage', 'method', 'group' or 'n_source'.
+        labels : str or array-like of str
+            The labels to convert.
+
+        Returns
+        -------
+        numpy.ndarray
+            The integer position of each label.
+
+        Raises
+        ------
+        ValueError
+            If a label is not defined in the reduction factor tables.
+        """
+        positions = self._positions[axis]
+        labels = np.atleast_1d(np.asarray(labels, dtype=object))
+        unique_labels, inverse = np.unique(labels.astype(str), return_inverse=True)
+        unknown = [str(label) for label in unique_labels if label not in positions]
+        if unknown:
+            raise ValueError(f"Unknown {axis} for reduction factors: {unknown}")
+        unique_codes = np.array([positions[label] for label in unique_labels])
+        return unique_codes[inverse].reshape(labels.shape)
+
+    def lookup(self, region, tillage, method, group, n_source):
+        """
+        Returns the reduction factors for scalar or array-valued keys. Array keys are
+        broadcast against each other.
+
+        Parameters
+        ----------
+        region : str or array-like of str
+            'western_canada' or 'eastern_canada'.
+        tillage : str or array-like of str
+            Tillage practice, e.g. 'unknown' or 'no_tillage'.
+        method : str or array-like of str
+            Fertilizer application method, e.g. 'default'.
+        group : str or array-like of str
+            Cropping system group, e.g. 'Annual'.
+        n_source : str or array-like of str
+            Nitrogen source, e.g. 'RF_NS_CRN'.
+
+        Returns
+        -------
+        dict
+            A dictionary mapping RF_AM, RF_CS, RF_NS and RF_Till to NumPy arrays.
+        """
+        index = np.broadcast_arrays(
+            self.get_codes("region", region),
+            self.get_codes("tillage", tillage),
+            self.get_codes("method", method),
+            self.get_codes("group", group),
+            self.get_codes("n_source", n_source),
+        )
+        selected = self.values[tuple(index)]
+        return {name: selected[..., j] for j, name in enumerate(MODIFIER_NAMES)}
+
+
+def load_modifier_table(preprocessed_dir):
+    """
+    Reads the four reduction factor CSV files once and compiles them into a
+    ModifierTable.
+
+    Parameters
+    ----------
+    preprocessed_dir : str
+        Directory containing 'modifier_rf_am.csv', 'modifier_rf_cs.csv',
+        'modifier_rf_ns.csv' and 'modifier_rf_till.csv'.
+
+    Returns
+    -------
+    ModifierTable
+        The compiled reduction factor lookup table.
+    """
+    return _compile_modifier_table(os.path.abspath(preprocessed_dir))
+
+
+@lru_cache(maxsize=None)
+def _compile_modifier_table(preprocessed_dir):
+    return ModifierTable(
+        pd.read_csv(os.path.join(preprocessed_dir, "modifier_rf_am.csv")),
+        pd.read_csv(os.path.join(preprocessed_dir, "modifier_rf_cs.csv")),
+        pd.read_csv(os.path.join(preprocessed_dir, "modifier_rf_ns.csv")),
+        pd.read_csv(os.path.join(preprocessed_dir, "modifier_rf_till.csv")),
+    )
+
+
+def get_regions(provinces):
+    """
+    Categorizes provinces as 'western_canada' or 'eastern_canada'.
+
+    Parameters
+    ----------
+    provinces : str or array-like of str
+        Province names.
+
+    Returns
+    -------
+    numpy.ndarray
+        The region of each province.
+    """
+    provinces = np.atleast_1d(np.asarray(provinces, dtype=object))
+    return np.where(
+        np.isin(provinces, WESTERN_CANADA), "western_canada", "eastern_canada"
+    )
+
 
 class ModifiersManager:
     """
@@ -36,6 +231,9 @@ class ModifiersManager:
     get_modifiers()
         Retrieves the modification factors based on the farm's region ('western_canada'
         or 'eastern_canada') and specific farming practices.
+    get_modifiers_batch(provinces, rf_am, rf_cs, rf_ns, tillage)
+        Retrieves the modification factors for many farms at once from the compiled
+        modifier table.
     get_region()
         Determines the region of the farm based on its province, categorizing as
         'western_canada' or 'eastern_canada'.
@@ -76,10 +274,12 @@ class ModifiersManager:
             self.dir, "../../data/params_sampling_range/rf_params_dist.json"
         )
 
+    @timed("modifiers")
     def get_modifiers(self):
         """
-        Retrieves reduction factors from CSV files based on the farm's practices and region.
-        The values defined in these CSV files are defined in Holos.
+        Retrieves reduction factors from the compiled modifier table based on the farm's
+        practices and region. The values defined in the underlying CSV files are defined
+        in Holos.
 
         Returns
         -------
@@ -87,37 +287,45 @@ class ModifiersManager:
             A dictionary of reduction factors where each key is a modifier and each value
             is a NumPy array.
         """
-        region = self.get_region()
-        modifiers = {}
-        # Define the list of modifiers and the relevant files
-        modifier_files = {
-            "RF_AM": "modifier_rf_am.csv",
-            "RF_CS": "modifier_rf_cs.csv",
-            "RF_NS": "modifier_rf_ns.csv",
-            "RF_Till": "modifier_rf_till.csv",
-        }
+        modifiers = self.get_modifiers_batch(
+            [self.farm_data["province"]],
+            rf_am=self.rf_am,
+            rf_cs=self.rf_cs,
+            rf_ns=self.rf_ns,
+            tillage=self.tillage,
+        )
+        return {k: np.array([float(v[0])]) for k, v in modifiers.items()}
 
-        # Iterate over the modifier files, loading and querying as needed
-        for key, filename in modifier_files.items():
-            path = os.path.join(self.dir, f"../../data/preprocessed/{filename}")
-            df = pd.read_csv(path)
-
-            if key == "RF_AM":
-                value = float(df.query(f"method == '{self.rf_am}'")["value"].iloc[0])
-            elif key == "RF_CS":
-                value = float(df.query(f"group == '{self.rf_cs}'")["value"].iloc[0])
-            elif key == "RF_NS":
-                value = float(df.query(f"N_source == '{self.rf_ns}'")["value"].iloc[0])
-            elif key == "RF_Till":
-                value = float(
-                    df.query(f"region == '{region}' & tillage == '{self.tillage}'")[
-                        "value"
-                    ].iloc[0]
-                )
+    @staticmethod
+    def get_modifiers_batch(
+        provinces, rf_am="default", rf_cs="Annual", rf_ns="RF_NS_CRN", tillage="unknown"
+    ):
+        """
+        Retrieves reduction factors for a batch of farms with array indexing into the
+        compiled modifier table.
 
-            modifiers[key] = value
+        Parameters
+        ----------
+        provinces : array-like of str
+            The province of each farm.
+        rf_am : str or array-like of str, optional
+            Application method, per farm or shared. Defaults to "default".
+        rf_cs : str or array-like of str, optional
+            Cropping system group, per farm or shared. Defaults to "Annual".
+        rf_ns : str or array-like of str, optional
+            Nitrogen source, per farm or shared. Defaults to "RF_NS_CRN".
+        tillage : str or array-like of str, optional
+            Tillage practice, per farm or shared. Defaults to "unknown".
 
-        return {k: np.array([v]) for k, v in modifiers.items()}
+        Returns
+        -------
+        dict
+            A dictionary mapping each modifier to a NumPy array with one value per farm.
+        """
+        table = load_modifier_table(
+            os.path.join(os.path.dirname(__file__), "../../data/preprocessed")
+        )
+        return table.lookup(get_regions(provinces), tillage, rf_am, rf_cs, rf_ns)
 
     def get_region(self):
         """
@@ -128,17 +336,7 @@ class ModifiersManager:
         str
             The region of the farm categorized as either 'western_canada' or 'eastern_canada'.
         """
-        province = self.farm_data["province"]
-        western_canada = [
-            "Alberta",
-            "British Columbia",
-            "Manitoba",
-            "Saskatchewan",
-            "Northwest Territories",
-            "Nunavut",
-        ]
-
-        return "western_canada" if province in western_canada else "eastern_canada"
+        return str(get_regions(self.farm_data["province"])[0])
 
     def load_user_distributions(self):
         """
@@ -154,7 +352,8 @@ class ModifiersManager:
         with open(self.user_distributions_path, "r") as file:
             return json.load(file)
 
-    def sample_modifiers(self, sampling_mode="default", num_samples=10):
+    @timed("modifiers_sampling")
+    def sample_modifiers(self, sampling_mode="default", num_samples=10, sampler=None):
         """
         Samples reduction factors based on the provided mode and number of samples.
 
@@ -166,6 +365,9 @@ class ModifiersManager:
             - "user-define": user-defined ranges, which is loaded by load_user_distributions()
         num_samples : int, optional
             The number of samples to generate for each factor, by default 10.
+        sampler : Sampler, optional
+            The sampler drawing the uniform design, shared with the other managers of a
+            run. Defaults to plain Monte Carlo sampling.
 
         Returns
         -------
@@ -173,6 +375,8 @@ class ModifiersManager:
             A dictionary with sampled parameters, where each entry contains an array of sampled 
             values for a parameter, starting with the original value.
         """
+        if sampler is None:
+            sampler = Sampler()
         sampled_parameters = {}
 
         # Load user distributions only if the sampling mode is 'user_define'
@@ -185,23 +389,14 @@ class ModifiersManager:
 
         for param, value in self.modifiers.items():
             if sampling_mode == "default":
-                sampled_array = np.random.uniform(
-                    value * 0.75, value * 1.25, num_samples
+                sampled_array = sampler.sample(
+                    num_samples, "uniform", value * 0.75, value * 1.25
                 )
                 sampled_parameters[param] = np.insert(sampled_array, 0, value)
             elif sampling_mode == "user_define":
                 specs = user_distributions[param]
                 if specs:
-                    distribution_type = specs[0]
-                    if distribution_type == "uniform":
-                        low, high = specs[1], specs[2]
-                        sampled_array = np.random.uniform(low, high, num_samples)
-                    elif distribution_type == "normal":
-                        mean, sd = specs[1], specs[2]
-                        sampled_array = np.random.normal(mean, sd, num_samples)
-                    elif distribution_type == "lognormal":
-                        mean, sigma = specs[1], specs[2]
-                        sampled_array = np.random.lognormal(mean, sigma, num_samples)
+                    sampled_array = sampler.sample(num_samples, *specs[:3])
                     sampled_parameters[param] = np.insert(sampled_array, 0, value)
                 else:
                     raise KeyError(f"Parameter '{param}' not found in RF parameters.")
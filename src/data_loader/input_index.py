@@ -0,0 +1,346 @@
+"""
+This module reads single farms from very large input CSV files without parsing the
+whole file. An `InputIndex` maps each (farm_id, crop) pair to the byte offset of its
+first row. It is built by one streaming pass over the file and saved in 'data/cache',
+so that later tasks, including other processes of a batch, seek to the rows they need.
+The saved index is rebuilt when the size or modification time of the file changes.
+
+Input CSV files larger than `INDEXED_INPUT_SIZE` are read through the index by
+`FarmDataManager`; smaller files are parsed whole and cached in memory. Records may
+contain quoted fields with line breaks. JSON input files are not indexed.
+
+Functions
+---------
+get_input_index(path)
+    Returns the index of an input file, loading or building it as needed.
+is_indexed_input(path)
+    Returns whether an input file is read through its index.
+iter_input_chunks(path, chunksize, start=0)
+    Streams the rows of an input file in chunks.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+from functools import lru_cache
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.instrumentation import count, timed
+
+INDEXED_INPUT_SIZE = 32 * 1024**2
+INDEX_DIR = os.path.join(
+    os.path.dirname(__file__), "..", "..", "data", "cache", "input_index"
+)
+KEY_COLUMNS = ["farm_id", "common_crop_name"]
+# Keys are read as text whatever the size of the file, so numeric ids match
+KEY_DTYPES = {name: str for name in KEY_COLUMNS}
+
+
+def _split(line):
+    text = line.decode("utf-8")
+    if '"' not in text:
+        return text.rstrip("\r\n").split(",")
+    return next(csv.reader([text]))
+
+
+def _records(file):
+    """Yields the offset and bytes of each record, joining quoted line breaks."""
+    offset = file.tell()
+    record = b""
+    for line in file:
+        record += line
+        # A record ends at a line break outside of quotes
+        if record.count(b'"') % 2 == 0:
+            yield offset, record
+            offset += len(record)
+            record = b""
+    if record:
+        yield offset, record
+
+
+class InputIndex:
+    """
+    The byte offset of the first row of each (farm_id, crop) pair of an input CSV file.
+
+    Parameters
+    ----------
+    path : str
+        Path to the input CSV file.
+    header : bytes
+        The header line of the file.
+    offsets : dict
+        The offset of each (farm_id, crop) pair.
+    size, mtime_ns : int
+        The size and modification time of the indexed file version.
+
+    Methods
+    -------
+    build(path)
+        Builds the index of a file in one streaming pass.
+    load(path, index_path)
+        Loads a saved index, or returns None if it is missing or outdated.
+    save(index_path)
+        Saves the index.
+    crops(farm_id)
+        Returns the crops of a farm.
+    read_rows(farms)
+        Reads the rows of (farm_id, crop) pairs.
+
+    Examples
+    --------
+    >>> index = get_input_index("data/test/hypothetical_farm_data.csv")
+    >>> index.read_rows([("farm1", "Soybean")])
+       farm_id common_crop_name  yield_kg_per_m2 ...
+    0    farm1          Soybean             0.27 ...
+    """
+
+    def __init__(self, path, header, offsets, size, mtime_ns):
+        self.path = os.path.abspath(path)
+        self.header = header
+        self.offsets = offsets
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @classmethod
+    @timed("input_index_build")
+    def build(cls, path):
+        """
+        Builds the index of a file in one streaming pass.
+
+        Parameters
+        ----------
+        path : str
+            Path to the input CSV file.
+
+        Returns
+        -------
+        InputIndex
+            The index of the current version of the file.
+
+        Raises
+        ------
+        ValueError
+            If the file lacks the 'farm_id' or 'common_crop_name' column.
+        """
+        stat = os.stat(path)
+        offsets = {}
+        with open(path, "rb") as file:
+            records = _records(file)
+            _, header = next(records, (0, b""))
+            columns = [name.lstrip("\ufeff") for name in _split(header)]
+            if not set(KEY_COLUMNS) <= set(columns):
+                raise ValueError(f"Input file lacks the columns {KEY_COLUMNS}")
+            farm_column, crop_column = (columns.index(name) for name in KEY_COLUMNS)
+            for offset, record in records:
+                values = _split(record)
+                if len(values) <= max(farm_column, crop_column):
+                    continue  # Blank or truncated line
+                offsets.setdefault((values[farm_column], values[crop_column]), offset)
+        count("bytes_read", stat.st_size)
+        return cls(path, header, offsets, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, path, index_path):
+        """
+        Loads a saved index.
+
+        Parameters
+        ----------
+        path : str
+            Path to the input CSV file.
+        index_path : str
+            Path to the saved index.
+
+        Returns
+        -------
+        InputIndex or None
+            The index, or None if it is missing or belongs to another version of the
+            file.
+        """
+        try:
+            with open(index_path, "r") as file:
+                saved = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        stat = os.stat(path)
+        if (saved["size"], saved["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        offsets = {(farm, crop): offset for farm, crop, offset in saved["entries"]}
+        return cls(
+            path, saved["header"].encode(), offsets, saved["size"], saved["mtime_ns"]
+        )
+
+    def save(self, index_path):
+        """
+        Saves the index. It is written to a temporary file and renamed, so concurrent
+        tasks never read a partial index.
+
+        Parameters
+        ----------
+        index_path : str
+            Path to the saved index.
+        """
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        saved = {
+            "path": self.path,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "header": self.header.decode(),
+            "entries": [
+                [farm, crop, offset] for (farm, crop), offset in self.offsets.items()
+            ],
+        }
+        temp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(saved, file)
+        os.replace(temp_path, index_path)
+
+    def crops(self, farm_id):
+        """
+        Returns the crops of a farm.
+
+        Parameters
+        ----------
+        farm_id : str
+            Identifier for the farm.
+
+        Returns
+        -------
+        list of str
+            The distinct crops of the farm, in the order of the file.
+        """
+        return [crop for farm, crop in self.offsets if farm == farm_id]
+
+    def read_rows(self, farms):
+        """
+        Reads the first row of each (farm_id, crop) pair, seeking to its offset.
+
+        Parameters
+        ----------
+        farms : list of tuple
+            The (farm_id, crop) pairs.
+
+        Returns
+        -------
+        DataFrame
+            The rows as stored in the file, in the order of `farms`. Pairs missing from
+            the file are left out.
+        """
+        records = []
+        with open(self.path, "rb") as file:
+            for farm in farms:
+                if farm not in self.offsets:
+                    continue
+                file.seek(self.offsets[farm])
+                _, record = next(_records(file))
+                records.append(record if record.endswith(b"\n") else record + b"\n")
+        count("bytes_read", sum(len(record) for record in records))
+        # Parsing header and rows together keeps the types of a full read
+        return pd.read_csv(
+            io.BytesIO(self.header + b"".join(records)),
+            encoding="utf-8-sig",
+            dtype=KEY_DTYPES,
+        )
+
+
+def _index_path(path):
+    digest = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(INDEX_DIR, f"{name}-{digest}.json")
+
+
+@lru_cache(maxsize=16)
+def _get_index(path, size, mtime_ns):
+    count("cache_misses.input_index")
+    index = InputIndex.load(path, _index_path(path))
+    if index is None:
+        index = InputIndex.build(path)
+        index.save(_index_path(path))
+    return index
+
+
+def get_input_index(path):
+    """
+    Returns the index of an input file. The index is kept in memory per file version,
+    loaded from 'data/cache/input_index', or built and saved there.
+
+    Parameters
+    ----------
+    path : str
+        Path to the input CSV file.
+
+    Returns
+    -------
+    InputIndex
+        The index of the current version of the file.
+    """
+    count("cache_lookups.input_index")
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _get_index(path, stat.st_size, stat.st_mtime_ns)
+
+
+def is_indexed_input(path):
+    """
+    Returns whether an input file is read through its index.
+
+    Parameters
+    ----------
+    path : str
+        Path to the input file.
+
+    Returns
+    -------
+    bool
+        True for CSV files larger than `INDEXED_INPUT_SIZE`.
+    """
+    return (
+        os.path.splitext(path)[1] == ".csv"
+        and os.path.getsize(path) > INDEXED_INPUT_SIZE
+    )
+
+
+def iter_input_chunks(path, chunksize, start=0):
+    """
+    Streams the rows of an input CSV file in chunks, so that files larger than memory
+    can be processed.
+
+    Parameters
+    ----------
+    path : str
+        Path to the input CSV file.
+    chunksize : int
+        Number of rows per chunk.
+    start : int, optional
+        Number of rows skipped at the start of the file. Defaults to 0.
+
+    Yields
+    ------
+    DataFrame
+        The next rows, indexed by their position in the file.
+    """
+    reader = pd.read_csv(
+        path,
+        chunksize=chunksize,
+        skiprows=range(1, start + 1),
+        encoding="utf-8-sig",
+        dtype=KEY_DTYPES,
+    )
+    with reader:
+        for chunk in reader:
+            chunk.index += start
+            yield chunk
+
+
+# Example usage
+if __name__ == "__main__":
+    input_file = os.path.join(
+        os.path.dirname(__file__), "../../data/test/hypothetical_farm_data.csv"
+    )
+    index = get_input_index(input_file)
+    print(index.crops("farm1"))
+    print(index.read_rows([("farm1", "Soybean"), ("farm1", "Potato")]))
@@ -0,0 +1,214 @@
+"""
+This module stores the bundled shapefiles in a fast-loading binary form. Reading a
+shapefile and reprojecting it to EPSG:4326 dominates the start of a farm's run, so
+the layers are converted once by 'scripts/build_layer_store.py': reprojected, trimmed
+to the columns the loaders use and written to 'data/preprocessed/layers' as NumPy
+archives holding the geometries as well-known binary (WKB) and one array per column.
+
+Each stored layer records the SHA-256 checksum of the shapefile it was built from.
+`load_reference_layer` prefers the stored layer and falls back to the shapefile when
+the stored layer is missing, was built for another CRS or its checksum no longer
+matches the shapefile. When the shapefile itself is not available, the stored layer
+is used as it is.
+
+Functions
+---------
+stored_layer_path(path, store_dir=None)
+    Returns the stored layer of a shapefile.
+source_checksum(path)
+    Returns the SHA-256 checksum of the files of a shapefile.
+write_layer(path, columns, crs="EPSG:4326", store_dir=None)
+    Converts a shapefile to a stored layer.
+read_stored_layer(path, crs="EPSG:4326", store_dir=None)
+    Returns the stored layer of a shapefile if it is up to date.
+"""
+
+import hashlib
+import os
+import numpy as np
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+STORE_DIR = os.path.join(DATA_DIR, "preprocessed", "layers")
+EXTERNAL_DIR = os.path.join(DATA_DIR, "external")
+# The bundled layers and the columns the loaders use
+LAYERS = {
+    "province_100m": ["PRENAME"],
+    "province_10m": ["PRENAME"],
+    "slc_dissolved_ecodistrict": ["ECO_ID"],
+    "ca_us_border": [],
+}
+SHAPEFILE_EXTENSIONS = [".shp", ".shx", ".dbf", ".prj", ".cpg"]
+
+# Checksums by path, size and modification time of the files, so that a process
+# hashes each unchanged shapefile once
+_checksums = {}
+
+
+def _layer_name(path):
+    return os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+
+def _source_files(path):
+    if os.path.isdir(path):
+        folder, stem = path, None
+    else:
+        folder = os.path.dirname(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if os.path.splitext(name)[1].lower() in SHAPEFILE_EXTENSIONS
+        and (stem is None or os.path.splitext(name)[0] == stem)
+    )
+
+
+def stored_layer_path(path, store_dir=None):
+    """
+    Returns the stored layer of a shapefile.
+
+    Parameters
+    ----------
+    path : str
+        Path to the shapefile or its directory.
+    store_dir : str, optional
+        The folder of the stored layers. Defaults to `STORE_DIR`.
+
+    Returns
+    -------
+    str
+        The path '<store_dir>/<layer name>.npz'.
+    """
+    return os.path.join(store_dir or STORE_DIR, f"{_layer_name(path)}.npz")
+
+
+def source_checksum(path):
+    """
+    Returns the SHA-256 checksum of the geometry, attribute, index and projection
+    files of a shapefile.
+
+    Parameters
+    ----------
+    path : str
+        Path to the shapefile or its directory.
+
+    Returns
+    -------
+    str or None
+        The checksum, or None if the shapefile is not available.
+    """
+    files = _source_files(path)
+    if not any(name.lower().endswith(".shp") for name in files):
+        return None
+    signature = tuple(
+        (name, os.path.getsize(name), os.stat(name).st_mtime_ns) for name in files
+    )
+    if signature not in _checksums:
+        sha = hashlib.sha256()
+        for name in files:
+            sha.update(os.path.basename(name).encode())
+            with open(name, "rb") as file:
+                for block in iter(lambda: file.read(1024**2), b""):
+                    sha.update(block)
+        _checksums[signature] = sha.hexdigest()
+    return _checksums[signature]
+
+
+def write_layer(path, columns, crs="EPSG:4326", store_dir=None):
+    """
+    Converts a shapefile to a stored layer, reprojected to `crs` and trimmed to
+    `columns` and the geometry.
+
+    Parameters
+    ----------
+    path : str
+        Path to the shapefile or its directory.
+    columns : list of str
+        The attribute columns to keep.
+    crs : str, optional
+        Target coordinate reference system. Defaults to 'EPSG:4326'.
+    store_dir : str, optional
+        The folder of the stored layers. Defaults to `STORE_DIR`.
+
+    Returns
+    -------
+    str
+        The path of the stored layer.
+
+    Raises
+    ------
+    FileNotFoundError
+        If the shapefile is not available.
+    """
+    import geopandas as gpd
+    import shapely
+
+    checksum = source_checksum(path)
+    if checksum is None:
+        raise FileNotFoundError(f"No shapefile found at {path}")
+    layer = gpd.read_file(path).to_crs(crs)
+    wkb = shapely.to_wkb(layer.geometry.values)
+    offsets = np.concatenate([[0], np.cumsum([len(value) for value in wkb])])
+    arrays = {
+        "wkb": np.frombuffer(b"".join(wkb), dtype=np.uint8),
+        "offsets": offsets.astype(np.int64),
+        "columns": np.array(columns, dtype=str),
+        "checksum": np.array(checksum),
+        "crs": np.array(crs),
+    }
+    for column in columns:
+        values = layer[column].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[f"column_{column}"] = values
+
+    store_path = stored_layer_path(path, store_dir)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    temp_path = f"{store_path}.{os.getpid()}.tmp.npz"
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, store_path)
+    return store_path
+
+
+def read_stored_layer(path, crs="EPSG:4326", store_dir=None):
+    """
+    Returns the stored layer of a shapefile if it is up to date.
+
+    Parameters
+    ----------
+    path : str
+        Path to the shapefile or its directory.
+    crs : str, optional
+        Coordinate reference system of the layer. Defaults to 'EPSG:4326'.
+    store_dir : str, optional
+        The folder of the stored layers. Defaults to `STORE_DIR`.
+
+    Returns
+    -------
+    GeoDataFrame or None
+        The stored columns and geometry, or None if the layer is not stored, was
+        stored for another CRS or the shapefile changed since.
+    """
+    store_path = stored_layer_path(path, store_dir)
+    if not os.path.exists(store_path):
+        return None
+    import geopandas as gpd
+    import shapely
+
+    with np.load(store_path) as stored:
+        if str(stored["crs"]) != crs:
+            return None
+        checksum = source_checksum(path)
+        if checksum is not None and str(stored["checksum"]) != checksum:
+            return None
+        buffer = stored["wkb"].tobytes()
+        offsets = stored["offsets"]
+        data = {
+            column: stored[f"column_{column}"] for column in stored["columns"].tolist()
+        }
+    wkb = np.array(
+        [buffer[start:end] for start, end in zip(offsets[:-1], offsets[1:])],
+        dtype=object,
+    )
+    return gpd.GeoDataFrame(data, geometry=shapely.from_wkb(wkb), crs=crs)
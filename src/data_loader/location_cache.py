@@ -0,0 +1,211 @@
+"""
+This module memoizes the results of a farm location that do not depend on the crop:
+the climate and soil data, the ecodistrict ID and the emission factors of the farmer's
+mode. Several crops of one farm, and repeated runs at the same coordinate, then skip
+the ecodistrict join, the climate fetch, the soil lookup and the emission factor
+calculation, and only the crop residue and emissions are recomputed.
+
+Entries are keyed by the coordinate rounded like the location index, the year range
+and the data source, and are kept in a process-wide cache of bounded size that evicts
+the least recently used locations. Cached values are copied on the way in and out, so
+callers may modify them. The scientific mode samples around the farm and is never
+cached. Results of a failed climate fetch, whose P and PE are NaN, are not cached
+either, so that the location is fetched again by the next calculation.
+
+Functions
+---------
+location_key(farm_data, source)
+    Returns the cache key of a farm's location.
+has_climate_data(climate_data)
+    Returns whether climate data can be cached.
+get_location_cache()
+    Returns the process-wide cache.
+clear_location_cache(longitude=None, latitude=None)
+    Drops the cached results of one location, or of all locations.
+"""
+
+import os
+import sys
+import copy
+import threading
+from collections import OrderedDict
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.location_index import LocationIndex
+from src.instrumentation import count
+
+LOCATION_CACHE_SIZE = 4096
+
+
+def location_key(farm_data, source):
+    """
+    Returns the cache key of a farm's location.
+
+    Parameters
+    ----------
+    farm_data : dict
+        The farm's 'longitude', 'latitude', 'start_year' and 'end_year', as values or
+        one-element arrays.
+    source : str
+        The source of the climate and soil data ('default' or 'external').
+
+    Returns
+    -------
+    tuple
+        The rounded (longitude, latitude), the start and end year and the source.
+    """
+    value = {
+        key: np.ravel(farm_data[key])[0]
+        for key in ["longitude", "latitude", "start_year", "end_year"]
+    }
+    return (
+        LocationIndex.make_key(value["longitude"], value["latitude"]),
+        int(value["start_year"]),
+        int(value["end_year"]),
+        source,
+    )
+
+
+def has_climate_data(climate_data):
+    """
+    Returns whether the precipitation and evapotranspiration of climate data are
+    known, so that the results derived from them can be cached.
+
+    Parameters
+    ----------
+    climate_data : dict
+        Climate data with 'P' and 'PE', as values or arrays.
+
+    Returns
+    -------
+    bool
+        False if P or PE is NaN, e.g. after a failed climate fetch.
+    """
+    return bool(
+        np.isfinite(climate_data["P"]).all() and np.isfinite(climate_data["PE"]).all()
+    )
+
+
+class LocationCache:
+    """
+    A bounded, thread-safe cache of named results per farm location.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The largest number of cached locations. Defaults to `LOCATION_CACHE_SIZE`.
+
+    Methods
+    -------
+    get(key, name)
+        Returns a copy of a cached result, or None.
+    put(key, name, value)
+        Stores a copy of a result.
+    invalidate(longitude=None, latitude=None)
+        Drops the cached results of one location, or of all locations.
+
+    Examples
+    --------
+    >>> cache = LocationCache()
+    >>> key = location_key(farm_data, "default")
+    >>> cache.put(key, "eco_id", 950)
+    >>> cache.get(key, "eco_id")
+    950
+    """
+
+    def __init__(self, maxsize=LOCATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, name):
+        """
+        Returns a copy of a cached result.
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the location, see `location_key`.
+        name : str
+            The name of the result, e.g. 'climate_data'.
+
+        Returns
+        -------
+        object or None
+            The result, or None if it is not cached.
+        """
+        count("cache_lookups.location")
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or name not in entry:
+                count("cache_misses.location")
+                return None
+            self.entries.move_to_end(key)
+            return copy.deepcopy(entry[name])
+
+    def put(self, key, name, value):
+        """
+        Stores a copy of a result, evicting the least recently used locations beyond
+        `maxsize`.
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the location, see `location_key`.
+        name : str
+            The name of the result.
+        value : object
+            The result.
+        """
+        with self.lock:
+            self.entries.setdefault(key, {})[name] = copy.deepcopy(value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, longitude=None, latitude=None):
+        """
+        Drops the cached results of one location for every year range and source, or
+        of all locations.
+
+        Parameters
+        ----------
+        longitude, latitude : float, optional
+            The location to drop. By default, all locations are dropped.
+        """
+        with self.lock:
+            if longitude is None and latitude is None:
+                self.entries.clear()
+                return
+            point = LocationIndex.make_key(longitude, latitude)
+            for key in [key for key in self.entries if key[0] == point]:
+                del self.entries[key]
+
+
+_location_cache = LocationCache()
+
+
+def get_location_cache():
+    """
+    Returns the process-wide location cache.
+
+    Returns
+    -------
+    LocationCache
+        The cache shared by all calculations of the process.
+    """
+    return _location_cache
+
+
+def clear_location_cache(longitude=None, latitude=None):
+    """
+    Drops the cached results of one location, or of all locations, e.g. after the
+    reference data or an external data source changed.
+
+    Parameters
+    ----------
+    longitude, latitude : float, optional
+        The location to drop. By default, all locations are dropped.
+    """
+    _location_cache.invalidate(longitude, latitude)
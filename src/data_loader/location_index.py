@@ -0,0 +1,286 @@
+"""
+This module provides the LocationIndex class, a precomputed lookup of the province and
+ecodistrict of farm coordinates. Resolving a known location through the index avoids
+loading the province and ecodistrict shapefiles (and importing geopandas) on every run.
+
+The index is a CSV file with the columns 'longitude', 'latitude', 'province' and
+'eco_id'. It is built from the shapefiles by `scripts/build_location_index.py`, which
+uses `resolve_locations` to join all farm points with the shapefiles at once.
+"""
+
+import os
+import sys
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.reference_data import load_reference_layer
+from src.data_loader.province_lookup import lookup_provinces
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(__file__), "../../data/preprocessed/location_index.csv"
+)
+
+# Coordinates are matched after rounding, which absorbs float formatting noise
+COORDINATE_DECIMALS = 7
+
+
+class LocationIndex:
+    """
+    Precomputed mapping of (longitude, latitude) points to their province and
+    ecodistrict ID.
+
+    Parameters
+    ----------
+    records : DataFrame, optional
+        Rows with the columns 'longitude', 'latitude', 'province' and 'eco_id'.
+
+    Attributes
+    ----------
+    locations : dict
+        Maps rounded (longitude, latitude) tuples to dictionaries with the keys
+        'province' and 'eco_id'.
+
+    Methods
+    -------
+    make_key(longitude, latitude)
+        Returns the rounded coordinate tuple used as the lookup key.
+    lookup(longitude, latitude)
+        Returns the province and ecodistrict ID of a point, or None if not indexed.
+    lookup_many(longitudes, latitudes)
+        Returns the province and ecodistrict ID of many points as a DataFrame.
+    update(records)
+        Adds or replaces indexed locations.
+    to_frame()
+        Returns the indexed locations as a DataFrame.
+    save(index_path)
+        Writes the index to a CSV file.
+    load(index_path)
+        Reads an index from a CSV file.
+
+    Examples
+    --------
+    >>> index = LocationIndex.load()
+    >>> index.lookup(-123.2373389, 49.99704167)
+    {'province': 'British Columbia', 'eco_id': 950}
+    """
+
+    def __init__(self, records=None):
+        self.locations = {}
+        if records is not None:
+            self.update(records)
+
+    @staticmethod
+    def make_key(longitude, latitude):
+        """
+        Returns the rounded coordinate tuple used as the lookup key.
+
+        Parameters
+        ----------
+        longitude : float
+            Longitude of the point.
+        latitude : float
+            Latitude of the point.
+
+        Returns
+        -------
+        tuple
+            The rounded (longitude, latitude) pair.
+        """
+        return (
+            round(float(longitude), COORDINATE_DECIMALS),
+            round(float(latitude), COORDINATE_DECIMALS),
+        )
+
+    def lookup(self, longitude, latitude):
+        """
+        Returns the province and ecodistrict ID of a point.
+
+        Parameters
+        ----------
+        longitude : float
+            Longitude of the point.
+        latitude : float
+            Latitude of the point.
+
+        Returns
+        -------
+        dict or None
+            A dictionary with the keys 'province' and 'eco_id', or None if the point
+            is not in the index.
+        """
+        location = self.locations.get(self.make_key(longitude, latitude))
+        return dict(location) if location is not None else None
+
+    def lookup_many(self, longitudes, latitudes):
+        """
+        Returns the province and ecodistrict ID of many points.
+
+        Parameters
+        ----------
+        longitudes : array-like of float
+            Longitudes of the points.
+        latitudes : array-like of float
+            Latitudes of the points.
+
+        Returns
+        -------
+        DataFrame
+            The columns 'province' and 'eco_id', one row per point in input order.
+            Points that are not in the index have NaN values.
+        """
+        found = [
+            self.locations.get(self.make_key(lon, lat), {})
+            for lon, lat in zip(longitudes, latitudes)
+        ]
+        return pd.DataFrame(
+            {
+                "province": [location.get("province") for location in found],
+                "eco_id": [location.get("eco_id", np.nan) for location in found],
+            }
+        )
+
+    def update(self, records):
+        """
+        Adds or replaces indexed locations.
+
+        Parameters
+        ----------
+        records : DataFrame
+            Rows with the columns 'longitude', 'latitude', 'province' and 'eco_id'.
+        """
+        for row in records.itertuples(index=False):
+            self.locations[self.make_key(row.longitude, row.latitude)] = {
+                "province": row.province,
+                "eco_id": int(row.eco_id),
+            }
+
+    def to_frame(self):
+        """
+        Returns the indexed locations as a DataFrame.
+
+        Returns
+        -------
+        DataFrame
+            One row per indexed location.
+        """
+        return pd.DataFrame(
+            [
+                {"longitude": lon, "latitude": lat, **location}
+                for (lon, lat), location in self.locations.items()
+            ],
+            columns=["longitude", "latitude", "province", "eco_id"],
+        )
+
+    def save(self, index_path=DEFAULT_INDEX_PATH):
+        """
+        Writes the index to a CSV file.
+
+        Parameters
+        ----------
+        index_path : str, optional
+            Destination CSV file. Defaults to 'data/preprocessed/location_index.csv'.
+        """
+        self.to_frame().to_csv(index_path, index=False)
+
+    @classmethod
+    def load(cls, index_path=DEFAULT_INDEX_PATH):
+        """
+        Reads an index from a CSV file. A missing file yields an empty index.
+
+        Parameters
+        ----------
+        index_path : str, optional
+            CSV file to read. Defaults to 'data/preprocessed/location_index.csv'.
+
+        Returns
+        -------
+        LocationIndex
+            The loaded index.
+        """
+        if not os.path.exists(index_path):
+            return cls()
+        return cls(pd.read_csv(index_path))
+
+
+def resolve_locations(longitudes, latitudes):
+    """
+    Resolves the province and ecodistrict ID of many points, looking the provinces
+    up coarse-to-fine with `lookup_provinces` and the ecodistricts with one spatial
+    join. Only the points within a province are joined with the ecodistricts, so
+    points that the province lookup rejects up front are never joined.
+
+    Parameters
+    ----------
+    longitudes : array-like of float
+        Longitudes of the points.
+    latitudes : array-like of float
+        Latitudes of the points.
+
+    Returns
+    -------
+    DataFrame
+        The columns 'longitude', 'latitude', 'province' and 'eco_id', one row per point
+        in input order. Points outside Canada or outside any ecodistrict have missing
+        values in the unresolved columns.
+    """
+    import geopandas as gpd
+
+    data_dir = os.path.join(os.path.dirname(__file__), "../../data/external")
+    points = gpd.GeoDataFrame(
+        {"longitude": list(longitudes), "latitude": list(latitudes)},
+        geometry=gpd.points_from_xy(longitudes, latitudes),
+        crs="EPSG:4326",
+    )
+    points["province"] = lookup_provinces(longitudes, latitudes)
+    points["eco_id"] = np.nan
+    candidates = points["province"].notna()
+    if candidates.any():
+        ecodistricts = load_reference_layer(
+            os.path.join(data_dir, "slc_dissolved_ecodistrict")
+        )
+        joined = gpd.sjoin(
+            points[candidates][["geometry"]],
+            ecodistricts[["ECO_ID", "geometry"]],
+            how="left",
+            predicate="within",
+        )
+        # A point on a shared boundary joins twice; keep its first match
+        joined = joined[~joined.index.duplicated(keep="first")]
+        points.loc[joined.index, "eco_id"] = joined["ECO_ID"]
+
+    return pd.DataFrame(
+        points[["longitude", "latitude", "province", "eco_id"]]
+    ).reset_index(drop=True)
+
+
+@lru_cache(maxsize=8)
+def _load_cached(index_path, modified_time):
+    return LocationIndex.load(index_path)
+
+
+def get_location_index(index_path=DEFAULT_INDEX_PATH):
+    """
+    Returns the location index at `index_path`, reusing the parsed index until the
+    file changes.
+
+    Parameters
+    ----------
+    index_path : str, optional
+        CSV file to read. Defaults to 'data/preprocessed/location_index.csv'.
+
+    Returns
+    -------
+    LocationIndex
+        The loaded index, empty if the file does not exist.
+    """
+    if not os.path.exists(index_path):
+        return LocationIndex()
+    return _load_cached(index_path, os.path.getmtime(index_path))
+
+
+if __name__ == "__main__":
+    test_index = get_location_index()
+    print(f"{len(test_index.locations)} indexed locations")
+    print(test_index.lookup(-123.2373389, 49.99704167))
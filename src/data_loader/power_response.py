@@ -0,0 +1,98 @@
+"""
+This module decodes daily NASA POWER API responses straight into NumPy arrays. The
+response holds one JSON object per parameter, keyed by date. Instead of indexing these
+objects day by day, the values of each parameter are copied into one column of a
+(days x parameters) array, so that the growing-season totals are computed with array
+operations.
+
+Responses are decoded with `orjson` when it is installed, which is several times
+faster than the standard `json` module, and with `json` otherwise.
+
+Functions
+---------
+parse_power_response(content, parameters=POWER_PARAMETERS)
+    Decodes a POWER response into aligned daily arrays.
+"""
+
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The daily parameters requested by the climate fetcher
+POWER_PARAMETERS = ["PRECTOTCORR", "T2M", "RH2M", "ALLSKY_SFC_SW_DWN"]
+
+
+def _loads(content):
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def parse_power_response(content, parameters=POWER_PARAMETERS):
+    """
+    Decodes a daily POWER response into one array with a row per day and a column per
+    parameter.
+
+    Parameters
+    ----------
+    content : bytes or str
+        The body of the POWER API response.
+    parameters : list of str, optional
+        The parameters to read, in the order of the columns. Defaults to
+        `POWER_PARAMETERS`.
+
+    Returns
+    -------
+    dict
+        'start' and 'end', the first and last date of the request as 'YYYYMMDD'
+        strings, 'parameters' and 'values', the float array of shape
+        (days, parameters).
+
+    Raises
+    ------
+    ValueError
+        If the response is not valid JSON, a parameter is missing or the parameters
+        are not given for the same days.
+    """
+    data = _loads(content)
+    try:
+        series = [data["properties"]["parameter"][name] for name in parameters]
+        header = data["header"]
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Unexpected POWER response, missing {error}") from None
+
+    days = list(series[0])
+    for name, values in zip(parameters[1:], series[1:]):
+        if list(values) != days:
+            raise ValueError(f"POWER parameter {name} is not given for the same days")
+    values = np.empty((len(days), len(parameters)))
+    for column, daily_values in enumerate(series):
+        values[:, column] = np.fromiter(
+            daily_values.values(), dtype=float, count=len(days)
+        )
+    return {
+        "start": header["start"],
+        "end": header["end"],
+        "parameters": list(parameters),
+        "values": values,
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    example = {
+        "header": {"start": "20210501", "end": "20210502"},
+        "properties": {
+            "parameter": {
+                "PRECTOTCORR": {"20210501": 5.0, "20210502": 0.2},
+                "T2M": {"20210501": 20.1, "20210502": 21.4},
+                "RH2M": {"20210501": 50.0, "20210502": 55.2},
+                "ALLSKY_SFC_SW_DWN": {"20210501": 20.0, "20210502": 21.0},
+            }
+        },
+    }
+    print(parse_power_response(json.dumps(example).encode()))
@@ -0,0 +1,142 @@
+"""
+This module finds the province of farm locations in two tiers. Points are first tested
+against the simplified 'province_100m' layer, whose polygons have far fewer vertices
+than those of 'province_10m'. A point inside a simplified province and farther than
+`BOUNDARY_TOLERANCE` from its boundary lies in the same province of the detailed
+layer, because the two layers differ by less than the tolerance. Only points within
+the tolerance band of a simplified boundary, and points outside every simplified
+province, are re-tested against 'province_10m', so the results are identical to a
+lookup in the detailed layer alone. Points that `outside_canada` rejects are not
+tested against either layer.
+
+The tolerance is given in degrees. 0.02 degrees are at least 270 m in both directions
+up to the northern tip of Canada, well above the 100 m simplification. The data tests
+check it against the `boundary_deviations` of the bundled layers.
+
+Functions
+---------
+lookup_provinces(longitudes, latitudes, tolerance=BOUNDARY_TOLERANCE)
+    Returns the province of each point.
+boundary_deviations()
+    Returns the distance between the simplified and detailed shape of each province.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.canada_prefilter import outside_canada
+from src.data_loader.reference_data import load_reference_layer
+from src.instrumentation import count
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "external")
+COARSE_PROVINCES = os.path.join(DATA_DIR, "province_100m")
+FINE_PROVINCES = os.path.join(DATA_DIR, "province_10m")
+BOUNDARY_TOLERANCE = 0.02
+
+# The prepared boundaries of the loaded coarse layers, by layer
+_boundaries = {}
+
+
+def _prepared_boundaries(layer):
+    import shapely
+
+    if id(layer) not in _boundaries:
+        boundaries = shapely.boundary(layer.geometry.values)
+        shapely.prepare(boundaries)
+        # The layer is kept with its boundaries so that its id is not reused
+        _boundaries.clear()
+        _boundaries[id(layer)] = (layer, boundaries)
+    return _boundaries[id(layer)][1]
+
+
+def _first_within(layer, points):
+    """Returns the points within a polygon of the layer and the first such polygon."""
+    point_index, polygon_index = layer.sindex.query(points, predicate="within")
+    point_index, first = np.unique(point_index, return_index=True)
+    return point_index, polygon_index[first]
+
+
+def lookup_provinces(longitudes, latitudes, tolerance=BOUNDARY_TOLERANCE):
+    """
+    Returns the province of each point, testing the detailed province layer only for
+    points near a province boundary.
+
+    Parameters
+    ----------
+    longitudes : array-like of float
+        Longitudes of the points.
+    latitudes : array-like of float
+        Latitudes of the points.
+    tolerance : float, optional
+        Distance in degrees from a simplified boundary within which points are
+        re-tested against the detailed layer. Defaults to `BOUNDARY_TOLERANCE`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The province name of each point, or None for points outside Canada.
+    """
+    import shapely
+
+    longitudes = np.asarray(longitudes, dtype=float)
+    latitudes = np.asarray(latitudes, dtype=float)
+    provinces = np.full(len(longitudes), None, dtype=object)
+    candidates = np.flatnonzero(~outside_canada(longitudes, latitudes))
+    if not candidates.size:
+        return provinces
+    points = shapely.points(longitudes[candidates], latitudes[candidates])
+
+    coarse = load_reference_layer(COARSE_PROVINCES)
+    point_index, polygon_index = _first_within(coarse, points)
+    near = shapely.dwithin(
+        points[point_index],
+        _prepared_boundaries(coarse)[polygon_index],
+        tolerance,
+    )
+    interior = point_index[~near]
+    provinces[candidates[interior]] = coarse["PRENAME"].to_numpy()[
+        polygon_index[~near]
+    ]
+    count("province_lookups.coarse", len(interior))
+
+    retest = np.setdiff1d(np.arange(len(points)), interior)
+    if retest.size:
+        fine = load_reference_layer(FINE_PROVINCES)
+        point_index, polygon_index = _first_within(fine, points[retest])
+        provinces[candidates[retest[point_index]]] = fine["PRENAME"].to_numpy()[
+            polygon_index
+        ]
+        count("province_lookups.fine", retest.size)
+    return provinces
+
+
+def boundary_deviations():
+    """
+    Returns the Hausdorff distance between the simplified and the detailed shape of
+    each province, which must stay below `BOUNDARY_TOLERANCE`.
+
+    Returns
+    -------
+    dict
+        The distance in degrees by province name. Provinces missing from one of the
+        layers have an infinite distance.
+    """
+    import shapely
+
+    coarse = load_reference_layer(COARSE_PROVINCES).dissolve("PRENAME").geometry
+    fine = load_reference_layer(FINE_PROVINCES).dissolve("PRENAME").geometry
+    return {
+        name: (
+            shapely.hausdorff_distance(coarse[name], fine[name])
+            if name in coarse.index and name in fine.index
+            else np.inf
+        )
+        for name in coarse.index.union(fine.index)
+    }
+
+
+# Example usage
+if __name__ == "__main__":
+    print(lookup_provinces([-123.2373389, -100.0], [49.99704167, 30.0]))
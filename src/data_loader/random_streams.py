@@ -0,0 +1,105 @@
+"""
+This module derives the random number streams of the scientific mode from one seed.
+
+Every (farm, crop, chunk) gets its own `numpy.random.SeedSequence`, keyed by stable
+hashes of the text of the farm ID and crop name and by the chunk number, e.g. the
+batch of an adaptive run. Each sampler of a run then draws from a named child stream
+of it. The samples of a farm therefore do not depend on which other farms or chunks
+were run before it, or in which process, so splitting a batch across processes or
+nodes gives bit-identical results to a serial run with the same seed.
+
+Streams
+-------
+- 'design': the uniform design of the parameter samples (see `samplers.Sampler`).
+- 'points': the random locations in the farm's ecodistrict.
+- 'soil_texture': the soil texture reduction factors of the random locations.
+"""
+
+import hashlib
+import numpy as np
+
+STREAMS = ["design", "points", "soil_texture"]
+
+
+def stable_key(value):
+    """
+    Returns a 64-bit integer key of the text of a value that is the same in every
+    process, unlike Python's salted `hash` of strings. Farm ID 1 and '1' share a key.
+
+    Parameters
+    ----------
+    value : str or int
+        The value to key.
+
+    Returns
+    -------
+    int
+        The key.
+    """
+    digest = hashlib.sha256(str(value).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def farm_seed_sequence(seed, farm_id, crop, chunk=0):
+    """
+    Returns the seed sequence of one farm, crop and chunk.
+
+    Parameters
+    ----------
+    seed : int or None
+        The seed of the whole run. None draws fresh entropy from the operating system.
+    farm_id : str
+        Identifier of the farm.
+    crop : str
+        Name of the crop.
+    chunk : int, optional
+        Number of the chunk of runs, e.g. the batch of an adaptive run. Defaults to 0.
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        The seed sequence.
+    """
+    return np.random.SeedSequence(
+        seed, spawn_key=(stable_key(farm_id), stable_key(crop), int(chunk))
+    )
+
+
+def farm_generators(seed, farm_id, crop, chunk=0):
+    """
+    Returns a random number generator for each stream of one farm, crop and chunk.
+
+    Parameters
+    ----------
+    seed : int or None
+        The seed of the whole run. None draws fresh entropy from the operating system.
+    farm_id : str
+        Identifier of the farm.
+    crop : str
+        Name of the crop.
+    chunk : int, optional
+        Number of the chunk of runs. Defaults to 0.
+
+    Returns
+    -------
+    dict
+        A `numpy.random.Generator` for each name in `STREAMS`.
+
+    Examples
+    --------
+    >>> rngs = farm_generators(42, "farm1", "Soybean")
+    >>> rngs["design"].random()
+    0.8125...
+    """
+    base = farm_seed_sequence(seed, farm_id, crop, chunk)
+    return {
+        name: np.random.default_rng(
+            np.random.SeedSequence(base.entropy, spawn_key=base.spawn_key + (i,))
+        )
+        for i, name in enumerate(STREAMS)
+    }
+
+
+if __name__ == "__main__":
+    test_rngs = farm_generators(42, "farm1", "Soybean")
+    print({name: rng.random() for name, rng in test_rngs.items()})
@@ -0,0 +1,133 @@
+"""
+This module provides process-wide caches for the reference data read by the data
+loaders: the preprocessed Holos CSV tables, the farm input files and the bundled
+shapefiles. Each file is parsed once and reused until it changes on disk, which keeps
+long-running processes such as the calculation service warm. Shapefiles are read from
+their preprocessed form in 'data/preprocessed/layers' when it is up to date, see
+`layer_store`.
+
+Cached tables are shared between callers and must not be modified in place. Lookups,
+misses and the bytes of the files read are counted as 'reference_table' and
+'reference_layer' instrumentation counters.
+
+Functions
+---------
+load_reference_table(path, dtype=None)
+    Returns the DataFrame of a CSV file, parsed once per file version.
+load_reference_layer(path, crs)
+    Returns the GeoDataFrame of a shapefile reprojected to `crs`, loaded once per
+    file version.
+clear_reference_cache()
+    Drops all cached tables and layers.
+"""
+
+import os
+from functools import lru_cache
+import pandas as pd
+from src.data_loader.layer_store import (
+    _source_files,
+    read_stored_layer,
+    stored_layer_path,
+)
+from src.instrumentation import count
+
+
+def _file_version(path):
+    """Returns the absolute path and modification time identifying a file version."""
+    path = os.path.abspath(path)
+    return path, os.path.getmtime(path)
+
+
+def _modified_time(path):
+    """Returns the modification time of a file in nanoseconds, or None if missing."""
+    return os.stat(path).st_mtime_ns if os.path.exists(path) else None
+
+
+@lru_cache(maxsize=64)
+def _read_table(path, modified_time, dtype_items):
+    count("cache_misses.reference_table")
+    count("bytes_read", os.path.getsize(path))
+    return pd.read_csv(path, dtype=dict(dtype_items) if dtype_items else None)
+
+
+@lru_cache(maxsize=8)
+def _read_layer(path, modified_times, crs):
+    import geopandas as gpd
+
+    count("cache_misses.reference_layer")
+    layer = read_stored_layer(path, crs)
+    if layer is not None:
+        count("bytes_read", os.path.getsize(stored_layer_path(path)))
+        return layer
+    count("bytes_read", _layer_size(path))
+    return gpd.read_file(path).to_crs(crs)
+
+
+def _layer_size(path):
+    """Returns the size in bytes of the files of a shapefile, or of its directory."""
+    if os.path.isdir(path):
+        folder, stem = path, None
+    else:
+        folder = os.path.dirname(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+    return sum(
+        os.path.getsize(os.path.join(folder, name))
+        for name in os.listdir(folder)
+        if stem is None or os.path.splitext(name)[0] == stem
+    )
+
+
+def load_reference_table(path, dtype=None):
+    """
+    Returns the DataFrame of a CSV file, parsed once per file version.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file.
+    dtype : dict, optional
+        Types of columns, as for `pandas.read_csv`. Other columns are inferred.
+
+    Returns
+    -------
+    DataFrame
+        The cached table. It is shared between callers and must not be modified.
+    """
+    count("cache_lookups.reference_table")
+    dtype_items = tuple(dtype.items()) if dtype else ()
+    return _read_table(*_file_version(path), dtype_items)
+
+
+def load_reference_layer(path, crs="EPSG:4326"):
+    """
+    Returns the GeoDataFrame of a shapefile reprojected to `crs`, loaded once per
+    file version. The preprocessed layer of `layer_store` is loaded instead when it is
+    up to date; it holds only the columns used by the loaders.
+
+    Parameters
+    ----------
+    path : str
+        Path to the shapefile or its directory.
+    crs : str, optional
+        Target coordinate reference system. Defaults to 'EPSG:4326'.
+
+    Returns
+    -------
+    GeoDataFrame
+        The cached layer. It is shared between callers and must not be modified.
+    """
+    count("cache_lookups.reference_layer")
+    # The layer is reloaded when a file of the shapefile or its stored layer changes.
+    # Files overwritten in place do not change the modification time of their
+    # directory, so the files themselves are checked.
+    modified_times = (
+        max(map(_modified_time, _source_files(path)), default=None),
+        _modified_time(stored_layer_path(path)),
+    )
+    return _read_layer(os.path.abspath(path), modified_times, crs)
+
+
+def clear_reference_cache():
+    """Drops all cached tables and layers."""
+    _read_table.cache_clear()
+    _read_layer.cache_clear()
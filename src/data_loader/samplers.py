@@ -0,0 +1,248 @@
+"""
+This module provides the Sampler class, which draws the uniform designs behind the
+scientific mode's parameter samples. The managers map the columns of a design through
+the distributions of their parameters with `src.data_loader.distributions.ppf`, so the
+sampling method can be changed without touching the distributions.
+
+Methods
+-------
+- 'mc': independent pseudo-random values (plain Monte Carlo).
+- 'lhs': Latin hypercube sampling. Every input has exactly one value in each of the
+  `num_samples` equal strata of [0, 1].
+- 'sobol': a Sobol low-discrepancy sequence with the direction numbers of Joe and Kuo
+  (2008) and a random digital shift. The first 2^k points fill the unit hypercube
+  evenly, so percentiles converge with several times fewer runs than with 'mc'. Powers
+  of two as the number of samples give the best balance.
+
+One Sampler is shared by all managers of a run. Each call to `draw` takes the next
+columns of the same design, so the inputs of different managers do not reuse the same
+Sobol dimensions and stay independent.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.distributions import ppf
+
+SAMPLING_METHODS = ["mc", "lhs", "sobol"]
+
+# Direction numbers of the Sobol sequence from the 'new-joe-kuo-6.21201' file: the
+# degree s and coefficients a of a primitive polynomial, and the initial odd integers
+# m_1, ..., m_s. The first dimension uses m_k = 1 for every bit.
+_SOBOL_DIRECTIONS = [
+    (1, 0, [1]),
+    (2, 1, [1, 3]),
+    (3, 1, [1, 3, 1]),
+    (3, 2, [1, 1, 1]),
+    (4, 1, [1, 1, 3, 3]),
+    (4, 4, [1, 3, 5, 13]),
+    (5, 2, [1, 1, 5, 5, 17]),
+    (5, 4, [1, 1, 5, 5, 5]),
+    (5, 7, [1, 1, 7, 11, 19]),
+    (5, 11, [1, 1, 5, 1, 1]),
+    (5, 13, [1, 1, 1, 3, 11]),
+    (5, 14, [1, 3, 5, 5, 31]),
+    (6, 1, [1, 3, 3, 9, 7, 49]),
+    (6, 13, [1, 1, 1, 15, 21, 21]),
+    (6, 16, [1, 3, 1, 13, 27, 49]),
+    (6, 19, [1, 1, 1, 15, 7, 5]),
+    (6, 22, [1, 3, 1, 15, 13, 25]),
+    (6, 25, [1, 1, 5, 5, 19, 61]),
+    (7, 1, [1, 3, 7, 11, 23, 15, 103]),
+    (7, 4, [1, 3, 7, 13, 13, 15, 69]),
+    (7, 7, [1, 1, 3, 13, 7, 35, 63]),
+    (7, 8, [1, 3, 5, 9, 1, 25, 53]),
+    (7, 14, [1, 3, 1, 13, 9, 35, 107]),
+    (7, 19, [1, 3, 1, 5, 27, 61, 31]),
+    (7, 21, [1, 1, 5, 11, 19, 41, 61]),
+    (7, 28, [1, 3, 5, 3, 3, 13, 69]),
+    (7, 31, [1, 1, 7, 13, 1, 19, 1]),
+    (7, 32, [1, 3, 7, 5, 13, 19, 59]),
+    (7, 37, [1, 1, 3, 9, 25, 29, 41]),
+    (7, 41, [1, 3, 5, 13, 23, 1, 55]),
+    (7, 42, [1, 3, 7, 3, 13, 59, 17]),
+]
+SOBOL_MAX_DIMS = len(_SOBOL_DIRECTIONS) + 1
+_SOBOL_BITS = 32
+
+
+def _direction_integers(dim):
+    # The direction integers v_k = m_k * 2^(32 - k) of one dimension
+    if dim == 0:
+        m = [1] * _SOBOL_BITS
+    else:
+        s, a, m = _SOBOL_DIRECTIONS[dim - 1]
+        m = list(m)
+        for k in range(s, _SOBOL_BITS):
+            value = m[k - s] ^ (m[k - s] << s)
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    value ^= m[k - i] << i
+            m.append(value)
+    return np.array(
+        [m[k] << (_SOBOL_BITS - 1 - k) for k in range(_SOBOL_BITS)], dtype=np.uint64
+    )
+
+
+def sobol_sequence(num_samples, first_dim, num_dims, rng):
+    """
+    Returns points of a digitally shifted Sobol sequence.
+
+    Parameters
+    ----------
+    num_samples : int
+        The number of points, taken from the start of the sequence.
+    first_dim : int
+        The first dimension of the sequence to return.
+    num_dims : int
+        The number of dimensions to return.
+    rng : numpy.random.Generator
+        The random number generator drawing the digital shift.
+
+    Returns
+    -------
+    numpy.ndarray
+        Uniform values in (0, 1) of shape (num_samples, num_dims).
+
+    Raises
+    ------
+    ValueError
+        If more than `SOBOL_MAX_DIMS` dimensions are requested.
+    """
+    if first_dim + num_dims > SOBOL_MAX_DIMS:
+        raise ValueError(
+            f"The Sobol sequence supports at most {SOBOL_MAX_DIMS} sampled inputs."
+        )
+    index = np.arange(num_samples, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    shift = rng.integers(0, 2**_SOBOL_BITS, num_dims, dtype=np.uint64)
+    points = np.empty((num_samples, num_dims))
+    for j in range(num_dims):
+        directions = _direction_integers(first_dim + j)
+        x = np.zeros(num_samples, dtype=np.uint64)
+        for bit in range(max(int(num_samples).bit_length(), 1)):
+            x ^= np.where((gray >> np.uint64(bit)) & np.uint64(1), directions[bit], 0)
+        # Points are centered in their cell of width 2^-32, which keeps them off 0
+        points[:, j] = ((x ^ shift[j]).astype(np.float64) + 0.5) / 2.0**_SOBOL_BITS
+    return points
+
+
+def latin_hypercube(num_samples, num_dims, rng):
+    """
+    Returns a Latin hypercube design.
+
+    Parameters
+    ----------
+    num_samples : int
+        The number of points.
+    num_dims : int
+        The number of dimensions.
+    rng : numpy.random.Generator
+        The random number generator.
+
+    Returns
+    -------
+    numpy.ndarray
+        Uniform values in (0, 1) of shape (num_samples, num_dims), with exactly one
+        value of each column in each interval [i / num_samples, (i + 1) / num_samples).
+    """
+    strata = np.argsort(rng.random((num_samples, num_dims)), axis=0)
+    return (strata + rng.random((num_samples, num_dims))) / num_samples
+
+
+class Sampler:
+    """
+    Draws the columns of one uniform design for all parameters sampled in a run.
+
+    Parameters
+    ----------
+    method : str, optional
+        The sampling method, 'mc', 'lhs' or 'sobol'. Defaults to 'mc'.
+    seed : int or numpy.random.Generator, optional
+        Seed of the random number generator.
+
+    Attributes
+    ----------
+    num_dims : int
+        The number of columns drawn so far.
+
+    Methods
+    -------
+    draw(num_samples, num_dims=1)
+        Draws the next columns of the design.
+    sample(num_samples, distribution, a, b)
+        Draws the next column of the design and maps it through a distribution.
+
+    Raises
+    ------
+    ValueError
+        If the sampling method is not supported.
+
+    Examples
+    --------
+    >>> sampler = Sampler("sobol", seed=0)
+    >>> sampler.sample(8, "uniform", 0.75, 1.25)
+    array([1.17531211, 0.92531211, 0.80031211, 1.05031211, 1.11281211, ...])
+    """
+
+    def __init__(self, method="mc", seed=None):
+        if method not in SAMPLING_METHODS:
+            raise ValueError(
+                f"Invalid sampling method '{method}', choose one of {SAMPLING_METHODS}."
+            )
+        self.method = method
+        self.rng = np.random.default_rng(seed)
+        self.num_dims = 0
+
+    def draw(self, num_samples, num_dims=1):
+        """
+        Draws the next columns of the design.
+
+        Parameters
+        ----------
+        num_samples : int
+            The number of samples, the same for every draw of a Sobol design.
+        num_dims : int, optional
+            The number of columns. Defaults to 1.
+
+        Returns
+        -------
+        numpy.ndarray
+            Uniform values in [0, 1) of shape (num_samples, num_dims).
+        """
+        if self.method == "sobol":
+            points = sobol_sequence(num_samples, self.num_dims, num_dims, self.rng)
+        elif self.method == "lhs":
+            points = latin_hypercube(num_samples, num_dims, self.rng)
+        else:
+            points = self.rng.random((num_samples, num_dims))
+        self.num_dims += num_dims
+        return points
+
+    def sample(self, num_samples, distribution, a, b):
+        """
+        Draws the next column of the design and maps it through a distribution.
+
+        Parameters
+        ----------
+        num_samples : int
+            The number of samples.
+        distribution : str
+            'uniform', 'normal' or 'lognormal', see `src.data_loader.distributions`.
+        a, b : float or numpy.ndarray
+            The distribution's parameters, either one value or one value per sample.
+
+        Returns
+        -------
+        numpy.ndarray
+            The sampled values, of shape (num_samples,).
+        """
+        return ppf(distribution, a, b, self.draw(num_samples)[:, 0])
+
+
+if __name__ == "__main__":
+    for test_method in SAMPLING_METHODS:
+        test_sampler = Sampler(test_method, seed=0)
+        print(test_method, np.sort(test_sampler.draw(8, 2), axis=0)[:, 0])
@@ -1,7 +1,12 @@
+import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.samplers import Sampler
 
-def sampling_fr_topo(value, n, distribution="uniform"):
+
+def sampling_fr_topo(value, n, distribution="uniform", sampler=None):
     """
     Generates a sample of 'n' values from a specified statistical distribution
     based on a given FR_topo value (i.e., the fraction of land occupied by the
@@ -20,6 +25,9 @@ def sampling_fr_topo(value, n, distribution="uniform"):
     distribution : str, optional
         The type of distribution to sample from. Supported values are 'uniform', 'normal',
         and 'lognormal'. The default is 'uniform'.
+    sampler : Sampler, optional
+        The sampler drawing the uniform design, shared with the other managers of a
+        run. Defaults to plain Monte Carlo sampling.
 
     Returns
     -------
@@ -42,24 +50,20 @@ def sampling_fr_topo(value, n, distribution="uniform"):
     >>> sampling_fr_topo(0.5, 2, 'lognormal')
     array([0.512, 0.488])
     """
+    if sampler is None:
+        sampler = Sampler()
     low = value * 0.75
     high = value * 1.25
-    results = []
 
     if distribution == "uniform":
-        results = np.random.uniform(low, high, n)
-    elif distribution == "normal":
-        mean = value
+        return sampler.sample(n, "uniform", low, high)
+    if distribution == "normal":
         std_dev = (high - low) / 6  # Approx. 99.7% data within ±25%
-        results = np.random.normal(mean, std_dev, n)
-    elif distribution == "lognormal":
-        mean = np.log(value)
+        return sampler.sample(n, "normal", value, std_dev)
+    if distribution == "lognormal":
         std_dev = (np.log(high) - np.log(low)) / 6  # Scale to match range
-        results = np.random.lognormal(mean, std_dev, n)
-    else:
-        raise ValueError("Unsupported distribution type.")
-
-    return results
+        return sampler.sample(n, "lognormal", np.log(value), std_dev)
+    raise ValueError("Unsupported distribution type.")
 
 
 if __name__ == "__main__":
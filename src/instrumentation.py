@@ -0,0 +1,378 @@
+"""
+This module provides lightweight timing and counter instrumentation for the stages of
+a calculation: loading shapefiles and tables, spatial joins, POWER fetches, raster
+reads, sampling, the calculator loops and writing the output.
+
+Nothing is recorded unless a `Metrics` collection is active in the current thread.
+Without one, `stage` returns a shared no-op context manager, `timed` calls the wrapped
+function directly and `count` returns immediately, so instrumented code pays one
+context variable lookup per call.
+
+Stages nest: a stage entered inside another is recorded under the path of its parents,
+e.g. 'calculate/gather_all_data/climate_soil_data'. Counters are plain sums, such as
+'bytes_read'. The lookups and misses of a cache are counted as 'cache_lookups.<name>'
+and 'cache_misses.<name>' and reported with their hits under 'caches'.
+
+A collection with `memory=True` also traces allocations with `tracemalloc`, which
+slows the calculation down severalfold. Each stage then records the peak of traced
+memory above its start, the memory it left allocated and the peak resident set size
+(RSS) of the process when it ended, so that peaks are attributed to the stage that
+caused them. The largest allocations between the start and the end of the collection
+are compared in snapshots and reported by source line.
+
+Functions
+---------
+collect(memory=False)
+    Context manager activating a new `Metrics` collection.
+stage(name)
+    Context manager timing a stage.
+timed(name)
+    Decorator timing every call of a function as a stage.
+count(name, value=1)
+    Adds a value to a counter.
+aggregate_memory_reports(reports)
+    Combines the memory reports of many tasks.
+
+Examples
+--------
+>>> with collect() as metrics:
+...     output = calculate("data/test/hypothetical_farm_data.csv", "farm1", "Soybean")
+>>> metrics.as_dict()["stages"]["calculate"]
+{'calls': 1, 'seconds': 0.41...}
+"""
+
+import contextlib
+import contextvars
+import functools
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+_active = contextvars.ContextVar("metrics", default=None)
+_disabled = contextlib.nullcontext()
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+]
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of the process so far.
+
+    Returns
+    -------
+    int or None
+        The peak RSS in bytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Metrics:
+    """
+    Wall time and call count of each stage, and counters, of one calculation.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Whether stages also record traced memory and peak RSS. `tracemalloc` must be
+        tracing, as arranged by `collect`. Defaults to False.
+
+    Attributes
+    ----------
+    stages : dict
+        'calls' and 'seconds' of each stage path.
+    counters : dict
+        The value of each counter.
+    top_allocations : list of dict
+        The source lines that allocated the most memory during the collection, set by
+        `collect` when memory is traced.
+
+    Methods
+    -------
+    stage(name)
+        Context manager timing a stage.
+    count(name, value=1)
+        Adds a value to a counter.
+    as_dict()
+        Returns the metrics as a dictionary that can be written to JSON.
+    memory_report()
+        Returns the memory use of each stage and the largest allocations.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.stages = {}
+        self.counters = {}
+        self.top_allocations = []
+        self._path = []
+        self._memory_stack = []
+        self._start = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager timing a stage.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage.
+        """
+        self._path.append(name)
+        path = "/".join(self._path)
+        if self.memory:
+            self._enter_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.stages.setdefault(path, {"calls": 0, "seconds": 0.0})
+            record["calls"] += 1
+            record["seconds"] += time.perf_counter() - start
+            if self.memory:
+                self._exit_memory(record)
+            self._path.pop()
+
+    def _enter_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        # The peak is reset for the new stage, so the enclosing stage keeps its own
+        if self._memory_stack:
+            self._memory_stack[-1]["peak"] = max(self._memory_stack[-1]["peak"], peak)
+        tracemalloc.reset_peak()
+        self._memory_stack.append(
+            {"start": current, "peak": current, "rss": peak_rss()}
+        )
+
+    def _exit_memory(self, record):
+        current, peak = tracemalloc.get_traced_memory()
+        entry = self._memory_stack.pop()
+        peak = max(entry["peak"], peak)
+        if self._memory_stack:
+            self._memory_stack[-1]["peak"] = max(self._memory_stack[-1]["peak"], peak)
+        rss = peak_rss()
+        record["peak_bytes"] = max(record.get("peak_bytes", 0), peak - entry["start"])
+        record["allocated_bytes"] = (
+            record.get("allocated_bytes", 0) + current - entry["start"]
+        )
+        if rss is not None:
+            record["peak_rss"] = rss
+            record["rss_growth"] = record.get("rss_growth", 0) + rss - entry["rss"]
+
+    def count(self, name, value=1):
+        """
+        Adds a value to a counter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter.
+        value : int or float, optional
+            The value to add. Defaults to 1.
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """
+        Returns the metrics as a dictionary that can be written to JSON.
+
+        Returns
+        -------
+        dict
+            'wall_time' in seconds since the collection started, 'stages', 'counters'
+            and the 'lookups', 'hits' and 'misses' of each cache under 'caches'.
+        """
+        caches = {}
+        for name, lookups in self.counters.items():
+            if name.startswith("cache_lookups."):
+                cache = name[len("cache_lookups.") :]
+                misses = self.counters.get(f"cache_misses.{cache}", 0)
+                caches[cache] = {
+                    "lookups": lookups,
+                    "hits": lookups - misses,
+                    "misses": misses,
+                }
+        return {
+            "wall_time": time.perf_counter() - self._start,
+            "stages": {
+                path: {"calls": record["calls"], "seconds": record["seconds"]}
+                for path, record in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "caches": caches,
+        }
+
+    def memory_report(self):
+        """
+        Returns the memory use of each stage and the largest allocations.
+
+        Returns
+        -------
+        dict
+            'peak_rss' of the process in bytes, and for each stage path its 'calls',
+            'peak_bytes' (the largest traced memory above its start), 'allocated_bytes'
+            (the traced memory it left allocated), 'peak_rss' when it last ended and
+            'rss_growth' (how much it raised the peak RSS), under 'stages'. The
+            'top_allocations' list the source lines allocating the most memory.
+        """
+        memory_keys = ["peak_bytes", "allocated_bytes", "peak_rss", "rss_growth"]
+        return {
+            "peak_rss": peak_rss(),
+            "stages": {
+                path: {
+                    "calls": record["calls"],
+                    **{key: record[key] for key in memory_keys if key in record},
+                }
+                for path, record in self.stages.items()
+            },
+            "top_allocations": self.top_allocations,
+        }
+
+
+@contextlib.contextmanager
+def collect(memory=False, top=10):
+    """
+    Context manager activating a new `Metrics` collection in the current thread.
+
+    Parameters
+    ----------
+    memory : bool, optional
+        Whether to trace memory allocations. Defaults to False.
+    top : int, optional
+        The number of source lines reported in `Metrics.top_allocations`. Defaults
+        to 10.
+
+    Yields
+    ------
+    Metrics
+        The collection.
+    """
+    started_tracing = memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    first = None
+    if memory:
+        first = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+    metrics = Metrics(memory)
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
+        if memory:
+            last = tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+            metrics.top_allocations = [
+                {
+                    "line": f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}",
+                    "size_diff": diff.size_diff,
+                    "count_diff": diff.count_diff,
+                }
+                for diff in last.compare_to(first, "lineno")[:top]
+            ]
+            if started_tracing:
+                tracemalloc.stop()
+
+
+def stage(name):
+    """
+    Returns a context manager timing a stage, or a no-op one when no collection is
+    active.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+    """
+    metrics = _active.get()
+    if metrics is None:
+        return _disabled
+    return metrics.stage(name)
+
+
+def timed(name):
+    """
+    Decorator timing every call of a function as a stage.
+
+    Parameters
+    ----------
+    name : str
+        The name of the stage.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _active.get()
+            if metrics is None:
+                return function(*args, **kwargs)
+            with metrics.stage(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, value=1):
+    """
+    Adds a value to a counter of the active collection, if any.
+
+    Parameters
+    ----------
+    name : str
+        The name of the counter.
+    value : int or float, optional
+        The value to add. Defaults to 1.
+    """
+    metrics = _active.get()
+    if metrics is not None:
+        metrics.count(name, value)
+
+
+def aggregate_memory_reports(reports):
+    """
+    Combines the memory reports of many tasks, e.g. the farms of a batch run.
+
+    Parameters
+    ----------
+    reports : dict
+        The `Metrics.memory_report` of each task, keyed by task name.
+
+    Returns
+    -------
+    dict
+        The number of 'tasks', the largest 'peak_rss' and the 'peak_rss_task' it
+        occurred in, and for each stage path the number of 'tasks' it ran in, its
+        largest and mean 'peak_bytes' and the task with the largest peak under
+        'stages'.
+    """
+    peaks = {name: report.get("peak_rss") or 0 for name, report in reports.items()}
+    stages = {}
+    for name, report in reports.items():
+        for path, record in report["stages"].items():
+            if "peak_bytes" in record:
+                stages.setdefault(path, []).append((record["peak_bytes"], name))
+    return {
+        "tasks": len(reports),
+        "peak_rss": max(peaks.values(), default=None),
+        "peak_rss_task": max(peaks, key=peaks.get, default=None),
+        "stages": {
+            path: {
+                "tasks": len(values),
+                "max_peak_bytes": max(values)[0],
+                "mean_peak_bytes": sum(value for value, _ in values) / len(values),
+                "max_peak_task": max(values)[1],
+            }
+            for path, values in stages.items()
+        },
+    }
@@ -1,11 +1,16 @@
 import argparse
+import contextlib
 import json
 import os
+import sys
 import numpy as np
-from data_loader.get_full_params import FarmDataHub
-from calculator.crop_residue_aggregator import CropResidueAggregator
-from calculator.emission_factor_aggregator import EmissionFactorAggregator
-from calculator.emission_aggregator import EmissionAggregator
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.instrumentation import collect, stage, timed
+from src.result_cache import ResultStore, is_cacheable, is_complete, task_key
+
+# The data loaders and calculators are imported inside calculate() so that parsing the
+# command line, e.g. --help, stays fast. The loaders defer the geospatial stack further.
 
 
 class NumpyEncoder(json.JSONEncoder):
@@ -17,7 +22,8 @@ class NumpyEncoder(json.JSONEncoder):
         return json.JSONEncoder.default(self, obj)
 
 
-def main(
+@timed("calculate")
+def calculate(
     input_file,
     farm_id,
     crop,
@@ -27,12 +33,14 @@ def main(
     sampl_modifier="default",
     sampl_crop="default",
     sampl_crop_group="default",
-    output_file="output.json",
+    location_index=None,
+    sampling_method="mc",
+    seed=None,
+    chunk=0,
 ):
     """
-    Main function to process parameters for calculation, analyze crop residue, calculate 
-    emission factors, and aggregate emissions output, finally outputting the results as 
-    a JSON file.
+    Processes parameters for calculation, analyzes crop residue, calculates emission
+    factors, and aggregates emissions output.
 
     Parameters
     ----------
@@ -54,14 +62,33 @@ def main(
         Type of sampling crop. Default is 'default'.
     sampl_crop_group : str, optional
         Type of sampling crop group. Default is 'default'.
-    output_file : str, optional
-        Name of the output JSON file. Default is 'output.json'.
+    location_index : LocationIndex, optional
+        Precomputed farm locations. Defaults to the index in 'data/preprocessed'.
+    sampling_method : str, optional
+        Design of the scientific mode's samples ('mc', 'lhs' or 'sobol'). Default is
+        'mc'.
+    seed : int, optional
+        Seed of the scientific mode's samples. Default is None, for fresh entropy.
+    chunk : int, optional
+        Number of this chunk of runs, which selects independent random streams for
+        each chunk of the same farm. Default is 0.
 
     Returns
     -------
-    None
-        This function does not return any value but writes results to a file.
+    dict
+        The input parameters, crop nitrogen residue, emission factors and total direct
+        nitrogen emission, as written to the output JSON file by `main`.
     """
+    from data_loader.get_full_params import FarmDataHub
+    from src.data_loader.location_cache import (
+        get_location_cache,
+        has_climate_data,
+        location_key,
+    )
+    from calculator.crop_residue_aggregator import CropResidueAggregator
+    from calculator.emission_factor_aggregator import EmissionFactorAggregator
+    from calculator.emission_aggregator import EmissionAggregator
+
     farm_data_manager = FarmDataHub(
         input_file=input_file,
         farm_id=farm_id,
@@ -72,6 +99,10 @@ def main(
         sampl_modifier=sampl_modifier,
         sampl_crop=sampl_crop,
         sampl_crop_group=sampl_crop_group,
+        location_index=location_index,
+        sampling_method=sampling_method,
+        seed=seed,
+        chunk=chunk,
     )
     all_data = farm_data_manager.gather_all_data()
     # print(all_data)
@@ -80,10 +111,18 @@ def main(
     crop_residue = crop_resid.crop_analysis()
     # print(crop_residue)
 
-    emission_factor_calc = EmissionFactorAggregator(
-        all_data, operation_mode=operation_mode
-    )
-    emission_factor = emission_factor_calc.get_result()
+    # Emission factors depend on the location but not on the crop
+    emission_factor = None
+    if operation_mode == "farmer":
+        location = location_key(all_data["farm_data"], source)
+        emission_factor = get_location_cache().get(location, "emission_factors")
+    if emission_factor is None:
+        emission_factor_calc = EmissionFactorAggregator(
+            all_data, operation_mode=operation_mode
+        )
+        emission_factor = emission_factor_calc.get_result()
+        if operation_mode == "farmer" and has_climate_data(all_data["climate_data"]):
+            get_location_cache().put(location, "emission_factors", emission_factor)
     # print(emission_factor)
 
     emission_calc = EmissionAggregator(
@@ -92,20 +131,569 @@ def main(
     N_emission = emission_calc.get_result()
     # print(N_emission)
 
-    output = {
+    return {
         "Input Parameters": all_data,
         "Crop Nitrogen Residue": crop_residue,
         "Emission Factors": emission_factor,
         "Total Direct Nitrogen Emission": N_emission,
     }
 
+
+@timed("calculate_farm")
+def calculate_farm(
+    input_file,
+    farm_id,
+    crops=None,
+    source="default",
+    location_index=None,
+    by_year=False,
+):
+    """
+    Calculates the farmer's mode emissions of several crops of one farm in one pass.
+    The farm's location is resolved once, its climate and soil data are looked up or
+    fetched once, and the crop residue, emission factors and emissions of all crops
+    are calculated together by the vectorized `BatchCalculator`.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input data file.
+    farm_id : str
+        Identifier for the farm.
+    crops : list of str, optional
+        Names of the crops. Defaults to every crop of the farm in the input file, in
+        the order of the file.
+    source : str, optional
+        Source of the data ('default' or 'external'). Default is 'default'.
+    location_index : LocationIndex, optional
+        Precomputed farm locations. Defaults to the index in 'data/preprocessed'.
+    by_year : bool, optional
+        Whether to also calculate the emission factors and emissions of each year
+        from the climate of that year instead of the climate averaged over the years,
+        see `BatchCalculator.get_time_series`. Requires the 'external' source. Default
+        is False.
+
+    Returns
+    -------
+    dict
+        The 'farm_id' and, under 'Crops', the output of each crop with the structure
+        of `calculate`. With `by_year`, each crop also has a 'Time Series' holding its
+        'years' and the emission factors and emissions of each of these years.
+
+    Raises
+    ------
+    ValueError
+        If the farm or one of the crops is missing from the input file, or `by_year`
+        is set without the 'external' source.
+    """
+    from data_loader.get_farm_data import FarmDataManager
+    from data_loader.get_full_params import FarmDataHub
+    from calculator.batch_calculator import BatchCalculator
+
+    if crops is None:
+        crops = FarmDataManager.get_farm_crops(input_file, farm_id)
+
+    all_data = FarmDataHub.gather_many(
+        input_file,
+        farms=[(farm_id, crop) for crop in crops],
+        source=source,
+        location_index=location_index,
+        by_year=by_year,
+    )
+    calculator = BatchCalculator(all_data)
+    result = calculator.get_result()
+
+    def select(data, row):
+        return {
+            key: select(value, row) if isinstance(value, dict) else value[row : row + 1]
+            for key, value in data.items()
+        }
+
+    output = {
+        "farm_id": farm_id,
+        "Crops": {
+            crop: {"Input Parameters": select(all_data, row), **select(result, row)}
+            for row, crop in enumerate(crops)
+        },
+    }
+    if by_year:
+        time_series = calculator.get_time_series()
+        years = time_series.pop("years")
+        farm = all_data["farm_data"]
+        for row, crop in enumerate(crops):
+            # Each crop keeps only the years of its own input row
+            in_range = (years >= farm["start_year"][row]) & (
+                years <= farm["end_year"][row]
+            )
+            output["Crops"][crop]["Time Series"] = {
+                "years": years[in_range],
+                **{
+                    section: {
+                        key: values[row, in_range] for key, values in data.items()
+                    }
+                    for section, data in time_series.items()
+                },
+            }
+    return output
+
+
+def merge_outputs(first, second, num_runs):
+    """
+    Appends the sampled runs of a second scientific mode output to a first one. Arrays
+    holding the farm point followed by `num_runs` samples lose the farm point and are
+    concatenated; all other values are taken from the first output.
+
+    Parameters
+    ----------
+    first : dict
+        The output of the runs so far.
+    second : dict
+        The output of the next batch, as returned by `calculate`.
+    num_runs : int
+        The number of sampled runs of the second output.
+
+    Returns
+    -------
+    dict
+        The merged output.
+    """
+    if isinstance(first, dict):
+        return {
+            key: merge_outputs(value, second[key], num_runs)
+            for key, value in first.items()
+        }
+    if isinstance(second, (list, np.ndarray)) and len(second) == num_runs + 1:
+        if isinstance(first, list):
+            return first + list(second[1:])
+        return np.concatenate([first, second[1:]])
+    return first
+
+
+def write_raw_chunk(raw_file, output, chunk):
+    """
+    Appends the output of one chunk of runs to a JSON Lines file, so that raw samples
+    can be kept without holding them in memory.
+
+    Parameters
+    ----------
+    raw_file : file object
+        The open text file.
+    output : dict
+        The output of `calculate` for the chunk.
+    chunk : int
+        The number of the chunk.
+    """
+    raw_file.write(json.dumps({"chunk": chunk, **output}, cls=NumpyEncoder) + "\n")
+
+
+def calculate_summary(
+    input_file,
+    farm_id,
+    crop,
+    num_runs,
+    chunk_size=10_000,
+    quantiles=(0.05, 0.5, 0.95),
+    raw_file=None,
+    **kwargs,
+):
+    """
+    Runs the scientific mode in chunks and keeps only streaming statistics of the
+    sampled values, so that memory use does not grow with the number of runs.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input data file.
+    farm_id : str
+        Identifier for the farm.
+    crop : str
+        Name of the crop.
+    num_runs : int
+        Number of simulation runs.
+    chunk_size : int, optional
+        Number of runs calculated at once. Default is 10000.
+    quantiles : list of float, optional
+        Quantiles reported for each sampled value. Default is [0.05, 0.5, 0.95].
+    raw_file : file object, optional
+        Open text file to which the raw samples of each chunk are appended as JSON
+        lines. By default raw samples are discarded.
+    **kwargs
+        Further arguments of `calculate`, e.g. 'source' or 'seed'.
+
+    Returns
+    -------
+    dict
+        The output of `calculate` where each sampled array is replaced by its farm
+        value, count, mean, variance, minimum, maximum, quantiles and histogram.
+    """
+    from calculator.streaming_stats import OutputSummary
+
+    kwargs = {"source": "external", **kwargs, "operation_mode": "scientific"}
+    summary = OutputSummary(quantiles)
+    for chunk, start in enumerate(range(0, num_runs, chunk_size)):
+        runs = min(chunk_size, num_runs - start)
+        output = calculate(
+            input_file, farm_id, crop, num_runs=runs, chunk=chunk, **kwargs
+        )
+        if raw_file is not None:
+            write_raw_chunk(raw_file, output, chunk)
+        summary.update(output, runs)
+    return summary.result()
+
+
+def calculate_adaptive(
+    input_file,
+    farm_id,
+    crop,
+    initial_runs=16,
+    max_runs=4096,
+    tolerance=0.01,
+    quantiles=(0.05, 0.5, 0.95),
+    max_time=None,
+    max_fetches=None,
+    summarize=False,
+    raw_file=None,
+    **kwargs,
+):
+    """
+    Runs the scientific mode in growing batches until the mean and quantiles of
+    'co2_crop_direct' of every sampled variable stabilize, or a budget is exhausted.
+    Each batch doubles the number of runs so far.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input data file.
+    farm_id : str
+        Identifier for the farm.
+    crop : str
+        Name of the crop.
+    initial_runs : int, optional
+        Number of runs of the first batch. Default is 16.
+    max_runs : int, optional
+        Largest total number of runs. Default is 4096.
+    tolerance : float, optional
+        Largest relative change of a statistic between two batches that counts as
+        converged. Default is 0.01.
+    quantiles : list of float, optional
+        Quantiles tracked in addition to the mean. Default is [0.05, 0.5, 0.95].
+    max_time : float, optional
+        Time budget in seconds. No new batch is started once it is spent.
+    max_fetches : int, optional
+        Largest number of locations whose external climate and soil data is fetched,
+        counting the farm point once.
+    summarize : bool, optional
+        Whether to keep only streaming statistics of the sampled values instead of
+        all samples, see `calculate_summary`. Default is False.
+    raw_file : file object, optional
+        Open text file to which the raw samples of each batch are appended as JSON
+        lines.
+    **kwargs
+        Further arguments of `calculate`, e.g. 'source' or 'sampling_method'.
+
+    Returns
+    -------
+    dict
+        The output of `calculate` over all runs, with a 'Convergence' entry holding
+        whether the statistics converged, why the runs stopped and the trace of
+        statistics after each batch.
+    """
+    import time
+    from calculator.convergence import ConvergenceMonitor
+    from calculator.streaming_stats import OutputSummary
+
+    if initial_runs < 2:
+        raise ValueError("initial_runs must be at least 2.")
+    if max_fetches is not None and max_fetches < initial_runs + 1:
+        raise ValueError("max_fetches must cover the farm point and the first batch.")
+    kwargs = {"source": "external", **kwargs, "operation_mode": "scientific"}
+
+    monitor = ConvergenceMonitor(tolerance, quantiles)
+    summary = OutputSummary(quantiles) if summarize else None
+    start = time.perf_counter()
+    output, total_runs, batch_runs = None, 0, initial_runs
+    chunk = 0
+    while True:
+        batch = calculate(
+            input_file, farm_id, crop, num_runs=batch_runs, chunk=chunk, **kwargs
+        )
+        if raw_file is not None:
+            write_raw_chunk(raw_file, batch, chunk)
+        chunk += 1
+        total_runs += batch_runs
+
+        emissions = batch["Total Direct Nitrogen Emission"]
+        if summary is not None:
+            summary.update(batch, batch_runs)
+            outputs = {
+                name: summary.statistics(
+                    "Total Direct Nitrogen Emission", name, "co2_crop_direct"
+                )
+                for name in emissions
+            }
+        else:
+            if output is None:
+                output = batch
+            else:
+                output = merge_outputs(output, batch, batch_runs)
+            outputs = {
+                name: values["co2_crop_direct"][1:]
+                for name, values in output["Total Direct Nitrogen Emission"].items()
+            }
+        monitor.update(
+            outputs,
+            batch_runs=batch_runs,
+            fetches=total_runs + 1,
+            elapsed=time.perf_counter() - start,
+        )
+        batch_runs = min(total_runs, max_runs - total_runs)
+        if max_fetches is not None:
+            batch_runs = min(batch_runs, max_fetches - total_runs - 1)
+
+        if monitor.converged:
+            stop_reason = "converged"
+        elif max_time is not None and time.perf_counter() - start >= max_time:
+            stop_reason = "max_time"
+        elif total_runs >= max_runs:
+            stop_reason = "max_runs"
+        elif batch_runs < 1:
+            stop_reason = "max_fetches"
+        else:
+            continue
+        break
+
+    if summary is not None:
+        output = summary.result()
+    output["Convergence"] = {
+        "converged": monitor.converged,
+        "stop_reason": stop_reason,
+        "tolerance": tolerance,
+        "quantiles": list(quantiles),
+        "trace": monitor.trace,
+    }
+    return output
+
+
+def main(
+    input_file,
+    farm_id,
+    crop,
+    source="default",
+    operation_mode="farmer",
+    num_runs=10,
+    sampl_modifier="default",
+    sampl_crop="default",
+    sampl_crop_group="default",
+    output_file="output.json",
+    sampling_method="mc",
+    adaptive=False,
+    tolerance=0.01,
+    quantiles=(0.05, 0.5, 0.95),
+    max_runs=4096,
+    max_time=None,
+    max_fetches=None,
+    seed=None,
+    summary=False,
+    chunk_size=10_000,
+    raw_output=None,
+    metrics=False,
+    memory_profile=False,
+    result_cache=False,
+    by_year=False,
+):
+    """
+    Main function to process parameters for calculation, analyze crop residue, calculate 
+    emission factors, and aggregate emissions output, finally outputting the results as 
+    a JSON file.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input data file.
+    farm_id : str
+        Identifier for the farm.
+    crop : str or None
+        Name of the crop. None calculates every crop of the farm in one farmer's mode
+        pass, see `calculate_farm`, and writes the output of each crop under 'Crops'.
+    source : str, optional
+        Source of the data ('default' or 'external'). Default is 'default'.
+    operation_mode : str, optional
+        Mode of operation for data processing ('farmer' or 'scientific'). Default is 'farmer'.
+    num_runs : int, optional
+        Number of simulation runs. Default is 10.
+    sampl_modifier : str, optional
+        Type of sampling modifier. Default is 'default'.
+    sampl_crop : str, optional
+        Type of sampling crop. Default is 'default'.
+    sampl_crop_group : str, optional
+        Type of sampling crop group. Default is 'default'.
+    output_file : str, optional
+        Name of the output JSON file. Default is 'output.json'.
+    sampling_method : str, optional
+        Design of the scientific mode's samples ('mc', 'lhs' or 'sobol'). Default is
+        'mc'.
+    adaptive : bool, optional
+        Whether to run the scientific mode in growing batches until the outputs
+        converge, starting with `num_runs` runs. See `calculate_adaptive`. Default is
+        False.
+    tolerance, quantiles, max_runs, max_time, max_fetches : optional
+        Convergence criteria and budgets of the adaptive mode.
+    seed : int, optional
+        Seed of the scientific mode's samples, for reproducible runs.
+    summary : bool, optional
+        Whether the output file holds streaming statistics of the scientific mode's
+        samples instead of every sample. See `calculate_summary`. Default is False.
+    chunk_size : int, optional
+        Number of runs calculated at once in summary mode. Default is 10000.
+    raw_output : str, optional
+        Name of a JSON Lines file in the outputs folder receiving the raw samples of
+        each chunk in summary mode. By default raw samples are not written.
+    metrics : bool, optional
+        Whether to write the wall time and call count of each stage, the cache hits
+        and the bytes read to a sidecar file next to the output file, named like
+        'output_metrics.json'. Default is False.
+    memory_profile : bool, optional
+        Whether to trace memory allocations and write the peak memory of each stage,
+        the peak RSS and the largest allocations to a sidecar file named like
+        'output_memory.json'. Slows the run down severalfold. Default is False.
+    result_cache : bool, optional
+        Whether to look the task up in the local result store and to store its output
+        there. A task is recomputed only when its input row, the reference data or
+        the options changed. The scientific mode is cached only with a seed, and runs
+        of all crops, with a time budget or with raw output are never cached. See
+        `src.result_cache`. Default is False.
+    by_year : bool, optional
+        Whether to also write the emission factors and emissions of each year, from
+        the external climate data of that year, next to the results of the averaged
+        climate. Requires the farmer's mode and the 'external' source; the output has
+        the structure of `calculate_farm` also when a crop is given. Default is False.
+
+    Returns
+    -------
+    None
+        This function does not return any value but writes results to a file.
+    """
+    if summary and operation_mode != "scientific":
+        raise ValueError("Summary statistics require the scientific mode.")
+    if adaptive and operation_mode != "scientific":
+        raise ValueError("The adaptive run count requires the scientific mode.")
+    if crop is None and operation_mode != "farmer":
+        raise ValueError("Runs of all crops of a farm require the farmer's mode.")
+    if by_year and (operation_mode != "farmer" or source != "external"):
+        raise ValueError(
+            "Per-year results require the farmer's mode and the 'external' source."
+        )
+
     # Get the directory of the current script
     dir_path = os.path.dirname(os.path.realpath(__file__))
+    sampling_options = {
+        "source": source,
+        "sampl_modifier": sampl_modifier,
+        "sampl_crop": sampl_crop,
+        "sampl_crop_group": sampl_crop_group,
+        "sampling_method": sampling_method,
+        "seed": seed,
+    }
     output_path = os.path.join(dir_path, "..", "data/outputs", output_file)
+    with contextlib.ExitStack() as stack:
+        metrics_collection = None
+        if metrics or memory_profile:
+            metrics_collection = stack.enter_context(collect(memory=memory_profile))
+
+        cache_options = {
+            "operation_mode": operation_mode,
+            "num_runs": num_runs,
+            "adaptive": adaptive,
+            "tolerance": tolerance,
+            "quantiles": quantiles,
+            "max_runs": max_runs,
+            "max_time": max_time,
+            "max_fetches": max_fetches,
+            "summary": summary,
+            "chunk_size": chunk_size,
+            "by_year": by_year,
+            **sampling_options,
+        }
+        store = cache_key = cached = None
+        if (
+            result_cache
+            and crop is not None
+            and raw_output is None
+            and is_cacheable(cache_options)
+        ):
+            with stage("result_cache"):
+                store = ResultStore()
+                cache_key = task_key(input_file, farm_id, crop, cache_options)
+                cached = store.get(cache_key)
+
+        raw_file = None
+        if summary and raw_output is not None:
+            raw_path = os.path.join(dir_path, "..", "data/outputs", raw_output)
+            raw_file = stack.enter_context(open(raw_path, "w"))
+
+        if cached is not None:
+            text = cached
+        elif crop is None or by_year:
+            output = calculate_farm(
+                input_file,
+                farm_id,
+                crops=None if crop is None else [crop],
+                source=source,
+                by_year=by_year,
+            )
+        elif adaptive:
+            output = calculate_adaptive(
+                input_file,
+                farm_id,
+                crop,
+                initial_runs=num_runs,
+                max_runs=max_runs,
+                tolerance=tolerance,
+                quantiles=quantiles,
+                max_time=max_time,
+                max_fetches=max_fetches,
+                summarize=summary,
+                raw_file=raw_file,
+                **sampling_options,
+            )
+        elif summary:
+            output = calculate_summary(
+                input_file,
+                farm_id,
+                crop,
+                num_runs,
+                chunk_size=chunk_size,
+                quantiles=quantiles,
+                raw_file=raw_file,
+                **sampling_options,
+            )
+        else:
+            output = calculate(
+                input_file,
+                farm_id,
+                crop,
+                operation_mode=operation_mode,
+                num_runs=num_runs,
+                **sampling_options,
+            )
 
-    # Write the JSON to the outputs folder
-    with open(output_path, "w") as f:
-        json.dump(output, f, indent=4, cls=NumpyEncoder)
+        # Write the JSON to the outputs folder
+        with stage("write_output"):
+            if cached is None:
+                text = json.dumps(output, indent=4, cls=NumpyEncoder)
+            with open(output_path, "w") as f:
+                f.write(text)
+        if store is not None and cached is None and is_complete(output):
+            store.put(cache_key, text)
+
+    if metrics:
+        metrics_path = os.path.splitext(output_path)[0] + "_metrics.json"
+        with open(metrics_path, "w") as f:
+            json.dump(metrics_collection.as_dict(), f, indent=4)
+    if memory_profile:
+        memory_path = os.path.splitext(output_path)[0] + "_memory.json"
+        with open(memory_path, "w") as f:
+            json.dump(metrics_collection.memory_report(), f, indent=4)
 
 
 def convert_numpy(data):
@@ -144,7 +732,12 @@ if __name__ == "__main__":
     parser.add_argument(
         "--farm_id", type=str, required=True, help="Farm ID is required"
     )
-    parser.add_argument("--crop", type=str, required=True, help="Crop name is required")
+    parser.add_argument(
+        "--crop",
+        type=str,
+        default=None,
+        help="Crop name; omit it to calculate every crop of the farm in one pass",
+    )
     parser.add_argument(
         "--mode",
         type=str,
@@ -183,6 +776,83 @@ if __name__ == "__main__":
         default="default",
         help="Sampling crop group type",
     )
+    parser.add_argument(
+        "--sampling_method",
+        type=str,
+        default="mc",
+        choices=["mc", "lhs", "sobol"],
+        help="Design of the scientific mode's samples",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="Seed of the scientific mode's samples"
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Write streaming statistics of the samples instead of every sample",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=10_000,
+        help="Number of runs calculated at once with --summary",
+    )
+    parser.add_argument(
+        "--raw_output",
+        type=str,
+        default=None,
+        help="JSON Lines file for the raw samples with --summary",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="Write per-stage timings and counters to <output>_metrics.json",
+    )
+    parser.add_argument(
+        "--memory_profile",
+        action="store_true",
+        help="Write per-stage peak memory and allocations to <output>_memory.json",
+    )
+    parser.add_argument(
+        "--result_cache",
+        action="store_true",
+        help="Reuse the stored output of unchanged tasks and store new outputs",
+    )
+    parser.add_argument(
+        "--by_year",
+        action="store_true",
+        help="Also write the emissions of each year (farmer's mode, external source)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Add runs in growing batches until the outputs converge",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.01,
+        help="Relative change of the mean and quantiles that counts as converged",
+    )
+    parser.add_argument(
+        "--quantiles",
+        type=float,
+        nargs="+",
+        default=[0.05, 0.5, 0.95],
+        help="Quantiles that must converge in addition to the mean",
+    )
+    parser.add_argument(
+        "--max_runs", type=int, default=4096, help="Largest number of adaptive runs"
+    )
+    parser.add_argument(
+        "--max_time", type=float, default=None, help="Time budget in seconds"
+    )
+    parser.add_argument(
+        "--max_fetches",
+        type=int,
+        default=None,
+        help="Largest number of locations fetched from external sources",
+    )
 
     args = parser.parse_args()
     main(
@@ -196,4 +866,19 @@ if __name__ == "__main__":
         args.sampl_crop,
         args.sampl_crop_group,
         args.output,
+        args.sampling_method,
+        args.adaptive,
+        args.tolerance,
+        args.quantiles,
+        args.max_runs,
+        args.max_time,
+        args.max_fetches,
+        args.seed,
+        args.summary,
+        args.chunk_size,
+        args.raw_output,
+        args.metrics,
+        args.memory_profile,
+        args.result_cache,
+        args.by_year,
     )
@@ -0,0 +1,336 @@
+"""
+This module stores the finished outputs of farm and crop calculations in a local
+content-addressed store, so that re-running a batch returns the outputs of unchanged
+tasks instantly and only recomputes the tasks whose inputs or reference data changed.
+
+A task is addressed by the SHA-256 hash of everything its output depends on:
+
+- the farm's normalized input row, i.e. the converted values of `get_farm_data_batch`,
+  so that reformatting or moving the input file does not invalidate the cache,
+- the version of the reference data, a hash over the contents of the preprocessed
+  tables, the Holos tables, the external shapefiles and tables and, in the scientific
+  mode, the sampling distributions. The location index and the stored layers are
+  derived from the hashed shapefiles and left out, so that rebuilding the index to
+  add farms keeps the outputs of the other farms,
+- the mode, source, sampling and run options and the seed,
+- `CACHE_VERSION`, which is raised when a change of the calculators changes outputs.
+
+Files larger than `LARGE_FILE_SIZE`, such as the soil raster, are versioned by their
+size and modification time instead of their contents. Outputs are written as the JSON
+text of the output file, under '<root>/<first two hash characters>/<hash>.json'.
+
+Only deterministic tasks are cached: the scientific mode needs a seed, and runs limited
+by a time budget are never cached. Outputs with missing climate data, emission factors
+or emissions, e.g. after a failed climate fetch, are not stored, so that the task is
+recomputed once the data is available.
+
+Functions
+---------
+reference_data_version(scientific=False)
+    Returns the hash of the reference data.
+task_key(input_file, farm_id, crop, options)
+    Returns the hash addressing a task.
+is_cacheable(options)
+    Returns whether a task's output is deterministic.
+is_complete(output)
+    Returns whether an output has no missing values.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.instrumentation import count
+
+CACHE_VERSION = 1
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+RESULT_CACHE_DIR = os.path.join(DATA_DIR, "cache", "results")
+REFERENCE_DIRS = ["preprocessed", "raw/Holos", "external"]
+SAMPLING_DIRS = ["params_sampling_range"]
+# Files and folders of the reference folders derived from the external shapefiles
+DERIVED_PATHS = ["preprocessed/location_index.csv", "preprocessed/layers"]
+LARGE_FILE_SIZE = 64 * 1024**2
+# The sections of an output that are NaN when the climate data is missing
+COMPLETE_SECTIONS = [
+    "climate_data",
+    "Emission Factors",
+    "Total Direct Nitrogen Emission",
+]
+
+# Digests of the reference files by path, size and modification time, so that a
+# process hashes each unchanged file once
+_file_digests = {}
+
+
+def _file_digest(path):
+    stat = os.stat(path)
+    signature = (path, stat.st_size, stat.st_mtime_ns)
+    if signature not in _file_digests:
+        if stat.st_size > LARGE_FILE_SIZE:
+            digest = f"size={stat.st_size},mtime={stat.st_mtime_ns}"
+        else:
+            sha = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1024**2), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+        _file_digests[signature] = digest
+    return _file_digests[signature]
+
+
+def reference_data_version(scientific=False, data_dir=None):
+    """
+    Returns the hash of the reference data a calculation reads.
+
+    Parameters
+    ----------
+    scientific : bool, optional
+        Whether the sampling distributions of the scientific mode are included.
+        Defaults to False.
+    data_dir : str, optional
+        The data folder. Defaults to the repository's 'data' folder.
+
+    Returns
+    -------
+    str
+        The SHA-256 hash over the relative path and digest of every reference file,
+        except the `DERIVED_PATHS`.
+    """
+    data_dir = data_dir or DATA_DIR
+
+    def relative(path):
+        return os.path.relpath(path, data_dir).replace(os.sep, "/")
+
+    sha = hashlib.sha256()
+    for folder in REFERENCE_DIRS + (SAMPLING_DIRS if scientific else []):
+        for root, dirs, files in os.walk(os.path.join(data_dir, folder)):
+            dirs[:] = sorted(
+                name
+                for name in dirs
+                if relative(os.path.join(root, name)) not in DERIVED_PATHS
+            )
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if relative(path) not in DERIVED_PATHS:
+                    sha.update(f"{relative(path)}:{_file_digest(path)}\n".encode())
+    return sha.hexdigest()
+
+
+def _normalize(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def is_cacheable(options):
+    """
+    Returns whether a task's output is deterministic, and can be cached.
+
+    Parameters
+    ----------
+    options : dict
+        The options of the task, see `task_key`.
+
+    Returns
+    -------
+    bool
+        False for the scientific mode without a seed and for runs limited by a time
+        budget, True otherwise.
+    """
+    if options.get("operation_mode") == "scientific" and options.get("seed") is None:
+        return False
+    return options.get("max_time") is None
+
+
+def _is_finite(value):
+    if isinstance(value, dict):
+        return all(_is_finite(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return all(_is_finite(item) for item in value)
+    if isinstance(value, (float, np.floating, np.ndarray)):
+        array = np.asarray(value)
+        return array.dtype.kind != "f" or bool(np.isfinite(array).all())
+    return True
+
+
+def is_complete(output):
+    """
+    Returns whether an output has no missing values, and can be stored.
+
+    Parameters
+    ----------
+    output : dict
+        The output of a task, as written to its output file.
+
+    Returns
+    -------
+    bool
+        False if any climate data, emission factor or emission of the output, at any
+        depth, is NaN or infinite, True otherwise.
+    """
+    if not isinstance(output, dict):
+        return True
+    return all(
+        _is_finite(value) if name in COMPLETE_SECTIONS else is_complete(value)
+        for name, value in output.items()
+    )
+
+
+def task_key(input_file, farm_id, crop, options):
+    """
+    Returns the hash addressing a task.
+
+    Parameters
+    ----------
+    input_file : str
+        Path to the input CSV or JSON file relative to the project root.
+    farm_id : str
+        Identifier for the farm.
+    crop : str
+        Name of the crop.
+    options : dict
+        Every option the output depends on, e.g. 'operation_mode', 'source',
+        'num_runs', the sampling options and 'seed'.
+
+    Returns
+    -------
+    str
+        The SHA-256 hash of the normalized input row, the reference data version, the
+        options and `CACHE_VERSION`.
+
+    Raises
+    ------
+    ValueError
+        If the farm is missing from the input file or its values are out of range.
+    """
+    from src.data_loader.get_farm_data import FarmDataManager
+
+    row = FarmDataManager.get_farm_data_batch(input_file, [(farm_id, crop)]).iloc[0]
+    task = {
+        "version": CACHE_VERSION,
+        "row": {name: _normalize(value) for name, value in row.items()},
+        "reference_data": reference_data_version(
+            options.get("operation_mode") == "scientific"
+        ),
+        "options": {name: _normalize(value) for name, value in options.items()},
+    }
+    text = json.dumps(task, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultStore:
+    """
+    A local content-addressed store of output files.
+
+    Parameters
+    ----------
+    root : str, optional
+        The folder of the store. Defaults to `RESULT_CACHE_DIR`.
+
+    Methods
+    -------
+    path(key)
+        Returns the file of a key.
+    get(key)
+        Returns the stored output text of a key, or None.
+    put(key, text)
+        Stores the output text of a key.
+    clear()
+        Removes every stored output.
+
+    Examples
+    --------
+    >>> store = ResultStore()
+    >>> key = task_key(input_file, "farm1", "Soybean", {"operation_mode": "farmer"})
+    >>> store.get(key) is None
+    True
+    >>> store.put(key, json.dumps(output))
+    """
+
+    def __init__(self, root=None):
+        self.root = root or RESULT_CACHE_DIR
+
+    def path(self, key):
+        """
+        Returns the file of a key.
+
+        Parameters
+        ----------
+        key : str
+            The hash of the task, see `task_key`.
+
+        Returns
+        -------
+        str
+            The path '<root>/<first two characters>/<key>.json'.
+        """
+        return os.path.join(self.root, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Returns the stored output text of a key.
+
+        Parameters
+        ----------
+        key : str
+            The hash of the task.
+
+        Returns
+        -------
+        str or None
+            The JSON text of the output, or None if it is not stored.
+        """
+        count("cache_lookups.result")
+        try:
+            with open(self.path(key), "r") as file:
+                text = file.read()
+        except FileNotFoundError:
+            count("cache_misses.result")
+            return None
+        count("bytes_read", len(text))
+        return text
+
+    def put(self, key, text):
+        """
+        Stores the output text of a key. The file is written to a temporary file and
+        renamed, so concurrent tasks never read a partial output.
+
+        Parameters
+        ----------
+        key : str
+            The hash of the task.
+        text : str
+            The JSON text of the output.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                file.write(text)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def clear(self):
+        """Removes every stored output."""
+        for root, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(".json"):
+                    os.remove(os.path.join(root, name))
+
+
+# Example usage
+if __name__ == "__main__":
+    options = {"operation_mode": "farmer", "source": "default"}
+    key = task_key("data/test/hypothetical_farm_data.csv", "farm1", "Soybean", options)
+    print(key, ResultStore().get(key) is not None)
@@ -0,0 +1,318 @@
+"""
+This module provides the MorrisAnalysis class, an elementary-effects screening of the
+N2O emission calculation. It needs far fewer model evaluations than a Sobol analysis
+and is meant to find the few influential inputs of each farm before sampling them, or
+fetching external data for them, in more expensive studies.
+
+A trajectory starts at a random point of a grid with `num_levels` levels per input in
+the unit hypercube and moves every input once, in random order and direction, by the
+jump `num_levels / (2 * (num_levels - 1))`. The elementary effect of an input is the
+change of the output divided by its jump. For every input, mu is the mean of its
+elementary effects, mu_star the mean of their absolute values (Campolongo et al., 2007)
+and sigma their standard deviation, which reveals non-linear effects and interactions.
+Effects are measured in units of the output per full range of the input's uniform
+value, so they can be compared across inputs.
+
+Usage:
+    python src/sensitivity/morris.py -i data/test/hypothetical_farm_data.csv
+        --num_trajectories 100
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.data_loader.random_streams import farm_generators
+from src.sensitivity.problem import SensitivityProblem, select_farm
+
+
+class MorrisAnalysis:
+    """
+    Computes the elementary-effects statistics mu, mu_star and sigma of one
+    calculation output for each input of a problem.
+
+    Parameters
+    ----------
+    problem : SensitivityProblem
+        The uncertain inputs and the model evaluation.
+    num_trajectories : int, optional
+        The number of trajectories. The model is evaluated
+        num_trajectories * (num_vars + 1) times. Defaults to 100.
+    num_levels : int, optional
+        The even number of grid levels per input. Defaults to 4.
+    seed : int, optional
+        Seed of the random number generator drawing the trajectories.
+
+    Attributes
+    ----------
+    delta : float
+        The jump of each input in the unit hypercube.
+    rng : numpy.random.Generator
+        The random number generator.
+
+    Methods
+    -------
+    sample()
+        Draws the trajectories in the unit hypercube.
+    compute_statistics(U, f)
+        Computes mu, mu_star and sigma from the outputs along the trajectories.
+    run(output='co2_crop_direct')
+        Runs the screening and returns the statistics of each input.
+
+    Examples
+    --------
+    >>> problem = SensitivityProblem.from_farm_data(all_data)
+    >>> result = MorrisAnalysis(problem, num_trajectories=100, seed=1).run()
+    >>> screen(result)
+    ['N_p', 'P', ...]
+    """
+
+    def __init__(self, problem, num_trajectories=100, num_levels=4, seed=None):
+        if num_trajectories < 2:
+            raise ValueError("num_trajectories must be at least 2.")
+        if num_levels < 2 or num_levels % 2:
+            raise ValueError("num_levels must be an even number of at least 2.")
+        self.problem = problem
+        self.num_trajectories = int(num_trajectories)
+        self.num_levels = int(num_levels)
+        self.delta = num_levels / (2 * (num_levels - 1))
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self):
+        """
+        Draws the trajectories in the unit hypercube.
+
+        Returns
+        -------
+        numpy.ndarray
+            Uniform values of shape (num_trajectories, num_vars + 1, num_vars), where
+            consecutive points of a trajectory differ in exactly one input.
+        """
+        r, d = self.num_trajectories, self.problem.num_vars
+        # Base points on the lower half of the grid so that every jump stays in [0, 1]
+        base = self.rng.integers(0, self.num_levels // 2, (r, d)) / (
+            self.num_levels - 1
+        )
+        direction = self.rng.choice([-1.0, 1.0], (r, d))
+        start = base + self.delta * (direction < 0)
+        order = np.argsort(self.rng.random((r, d)), axis=1)
+
+        steps = np.zeros((r, d + 1, d))
+        rows = np.arange(r)[:, np.newaxis]
+        steps[rows, np.arange(1, d + 1), order] = (
+            self.delta * direction[rows, order]
+        )
+        return start[:, np.newaxis, :] + np.cumsum(steps, axis=1)
+
+    def compute_statistics(self, U, f):
+        """
+        Computes mu, mu_star and sigma from the outputs along the trajectories.
+
+        Parameters
+        ----------
+        U : numpy.ndarray
+            Trajectories of shape (num_trajectories, num_vars + 1, num_vars).
+        f : numpy.ndarray
+            Outputs at the trajectory points, of shape (num_trajectories, num_vars + 1).
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            mu, mu_star and sigma, each of shape (num_vars,).
+        """
+        step = np.diff(U, axis=1)
+        moved = np.argmax(np.abs(step), axis=2)
+        jump = np.take_along_axis(step, moved[..., np.newaxis], axis=2)[..., 0]
+        effects = np.empty_like(jump)
+        np.put_along_axis(effects, moved, np.diff(f, axis=1) / jump, axis=1)
+        return (
+            effects.mean(axis=0),
+            np.abs(effects).mean(axis=0),
+            effects.std(axis=0, ddof=1),
+        )
+
+    def run(self, output="co2_crop_direct"):
+        """
+        Runs the screening and returns the statistics of each input.
+
+        Parameters
+        ----------
+        output : str, optional
+            The calculated quantity to analyze. Defaults to 'co2_crop_direct'.
+
+        Returns
+        -------
+        dict
+            'output', 'num_evaluations' and 'indices' mapping each input to its
+            'group', 'mu', 'mu_star' and 'sigma'.
+        """
+        U = self.sample()
+        r, points, d = U.shape
+        # Non-uniform inputs are read at the grid cell centers, since the extreme
+        # levels 0 and 1 map to infinite quantiles
+        U_model = U.reshape(r * points, d).copy()
+        for j, (distribution, _, _) in enumerate(self.problem.distributions):
+            if distribution != "uniform":
+                U_model[:, j] = (
+                    U_model[:, j] * (self.num_levels - 1) + 0.5
+                ) / self.num_levels
+        f = self.problem.evaluate(self.problem.scale(U_model), output)
+        mu, mu_star, sigma = self.compute_statistics(U, f.reshape(r, points))
+
+        indices = {}
+        for i, name in enumerate(self.problem.names):
+            indices[name] = {
+                "group": self.problem.groups[i],
+                "mu": float(mu[i]),
+                "mu_star": float(mu_star[i]),
+                "sigma": float(sigma[i]),
+            }
+        return {
+            "output": output,
+            "num_evaluations": int(r * points),
+            "indices": indices,
+        }
+
+
+def screen(result, threshold=0.1):
+    """
+    Selects the influential inputs of a screening result.
+
+    Parameters
+    ----------
+    result : dict
+        The output of `MorrisAnalysis.run`.
+    threshold : float, optional
+        The minimum mu_star of an influential input, relative to the largest mu_star.
+        Defaults to 0.1.
+
+    Returns
+    -------
+    list of str
+        The influential inputs, by decreasing mu_star.
+    """
+    mu_star = {name: values["mu_star"] for name, values in result["indices"].items()}
+    largest = max(mu_star.values(), default=0)
+    if largest == 0:
+        return []
+    return sorted(
+        [name for name, value in mu_star.items() if value >= threshold * largest],
+        key=lambda name: -mu_star[name],
+    )
+
+
+def screen_farms(
+    data,
+    num_trajectories=100,
+    num_levels=4,
+    output="co2_crop_direct",
+    threshold=0.1,
+    seed=None,
+    **sampling_modes,
+):
+    """
+    Runs the screening for every farm of a `FarmDataHub.gather_many` result.
+
+    Parameters
+    ----------
+    data : dict
+        Farm parameters with one value per farm in every array.
+    num_trajectories, num_levels : int, optional
+        See `MorrisAnalysis`.
+    output : str, optional
+        The calculated quantity to analyze. Defaults to 'co2_crop_direct'.
+    threshold : float, optional
+        See `screen`.
+    seed : int, optional
+        Seed of the run. Each farm and crop draws from its own stream, so the result
+        of a farm does not depend on the other farms of `data`.
+    **sampling_modes
+        'sampl_modifier', 'sampl_crop' and 'sampl_crop_group' as in
+        `SensitivityProblem.from_farm_data`.
+
+    Returns
+    -------
+    list of dict
+        For each farm, its 'farm_id', 'crop', 'influential' inputs and the screening
+        result.
+    """
+    results = []
+    for i in range(len(data["farm_data"]["farm_id"])):
+        farm_params = select_farm(data, i)
+        farm_id = str(farm_params["farm_data"]["farm_id"][0])
+        crop = str(farm_params["farm_data"]["crop"][0])
+        problem = SensitivityProblem.from_farm_data(farm_params, **sampling_modes)
+        rng = farm_generators(seed, farm_id, crop)["design"]
+        analysis = MorrisAnalysis(problem, num_trajectories, num_levels, seed=rng)
+        result = analysis.run(output)
+        results.append(
+            {
+                "farm_id": farm_id,
+                "crop": crop,
+                "influential": screen(result, threshold),
+                **result,
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    import warnings
+    from src.data_loader.get_full_params import FarmDataHub
+
+    parser = argparse.ArgumentParser(description="Morris elementary-effects screening")
+    parser.add_argument("-i", "--input", type=str, required=True, help="Input file")
+    parser.add_argument(
+        "--source", type=str, default="default", help="Data source type"
+    )
+    parser.add_argument(
+        "--num_trajectories", type=int, default=100, help="Number of trajectories"
+    )
+    parser.add_argument(
+        "--num_levels", type=int, default=4, help="Number of grid levels per input"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Minimum relative mu_star of an influential input",
+    )
+    parser.add_argument(
+        "--output_variable",
+        type=str,
+        default="co2_crop_direct",
+        help="Calculated quantity to analyze",
+    )
+    parser.add_argument("--sampl_modifier", type=str, default="default")
+    parser.add_argument("--sampl_crop", type=str, default="default")
+    parser.add_argument("--sampl_crop_group", type=str, default="default")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument(
+        "-o", "--output", type=str, default="morris.json", help="Output file name"
+    )
+    args = parser.parse_args()
+
+    farms_params = FarmDataHub.gather_many(args.input, source=args.source)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        morris_results = screen_farms(
+            farms_params,
+            args.num_trajectories,
+            args.num_levels,
+            args.output_variable,
+            args.threshold,
+            args.seed,
+            sampl_modifier=args.sampl_modifier,
+            sampl_crop=args.sampl_crop,
+            sampl_crop_group=args.sampl_crop_group,
+        )
+
+    output_path = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "../../data/outputs", args.output
+    )
+    with open(output_path, "w") as f:
+        json.dump(morris_results, f, indent=4)
+    print(f"Morris screening saved to {output_path}")
@@ -0,0 +1,252 @@
+"""
+This module defines the SensitivityProblem class, which describes the uncertain inputs
+of the N2O emission calculation for one farm and evaluates the calculation for many
+sampled input sets at once. It is shared by the global sensitivity analysis methods
+in this package.
+"""
+
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.calculator.batch_calculator import BatchCalculator
+from src.data_loader.distributions import ppf, default_distribution
+from src.data_loader.get_crop_params import CropParametersManager
+from src.data_loader.get_crop_group_params import CropGroupManager
+from src.data_loader.get_modifiers import ModifiersManager
+
+# The data groups holding the uncertain inputs, in the order they are listed
+PARAMETER_GROUPS = ["crop_parameters", "crop_group_params", "modifiers", "climate_data"]
+
+CLIMATE_PARAMETERS = ["P", "PE", "FR_Topo", "soil_texture"]
+
+
+def select_farm(data, index):
+    """
+    Selects one farm of a `FarmDataHub.gather_many` result, in the structure of
+    `FarmDataHub.gather_all_data`.
+
+    Parameters
+    ----------
+    data : dict
+        Farm parameters with one value per farm in every array.
+    index : int
+        The position of the farm.
+
+    Returns
+    -------
+    dict
+        The farm's parameters, where every array holds one value.
+    """
+    return {
+        group: {key: values[index : index + 1] for key, values in params.items()}
+        for group, params in data.items()
+    }
+
+
+class SensitivityProblem:
+    """
+    The uncertain inputs of the emission calculation for one farm, with the
+    distribution of each input, and a vectorized model evaluation.
+
+    Parameters
+    ----------
+    base_data : dict
+        The farm's parameters as returned by `FarmDataHub.gather_all_data`. The first
+        value of each array is used for inputs that are not varied.
+    names : list of str
+        The names of the varied inputs.
+    groups : list of str
+        The data group of each input, e.g. 'crop_parameters' or 'climate_data'.
+    distributions : list of tuple
+        The `(distribution, a, b)` tuple of each input, see
+        `src.data_loader.distributions`.
+
+    Attributes
+    ----------
+    num_vars : int
+        The number of varied inputs.
+
+    Methods
+    -------
+    from_farm_data(base_data, sampl_modifier, sampl_crop, sampl_crop_group)
+        Builds the problem from a farm's parameters and the managers' sampling modes.
+    scale(U)
+        Maps a design of uniform values to input values.
+    evaluate(X, output='co2_crop_direct')
+        Evaluates the emission calculation for each row of input values.
+
+    Examples
+    --------
+    >>> all_data = FarmDataHub(input_file, "farm1", "Soybean").gather_all_data()
+    >>> problem = SensitivityProblem.from_farm_data(all_data)
+    >>> U = np.random.default_rng(0).random((1000, problem.num_vars))
+    >>> problem.evaluate(problem.scale(U)).shape
+    (1000,)
+    """
+
+    def __init__(self, base_data, names, groups, distributions):
+        if not len(names) == len(groups) == len(distributions):
+            raise ValueError("Each input needs a name, a group and a distribution.")
+        self.base_data = base_data
+        self.names = list(names)
+        self.groups = list(groups)
+        self.distributions = [tuple(spec) for spec in distributions]
+
+    @property
+    def num_vars(self):
+        return len(self.names)
+
+    @classmethod
+    def from_farm_data(
+        cls,
+        base_data,
+        sampl_modifier="default",
+        sampl_crop="default",
+        sampl_crop_group="default",
+    ):
+        """
+        Builds the problem from a farm's parameters. Crop parameters, crop group
+        parameters and modifiers follow the managers' sampling modes: 'default' varies
+        every input uniformly by +/- 25% around its value, and 'user_define' uses the
+        distributions in 'data/params_sampling_range' and keeps inputs without a
+        user-defined distribution fixed. Climate and soil inputs always use the default.
+
+        Parameters
+        ----------
+        base_data : dict
+            The farm's parameters as returned by `FarmDataHub.gather_all_data`.
+        sampl_modifier : str, optional
+            Sampling mode for modifiers ('default' or 'user_define').
+        sampl_crop : str, optional
+            Sampling mode for crop parameters ('default' or 'user_define').
+        sampl_crop_group : str, optional
+            Sampling mode for crop group parameters ('default' or 'user_define').
+
+        Returns
+        -------
+        SensitivityProblem
+            The problem over all crop, crop group, modifier and climate inputs.
+
+        Raises
+        ------
+        ValueError
+            If a sampling mode is invalid or no user-defined distributions exist for
+            the farm's crop or crop group.
+        """
+        for mode in [sampl_modifier, sampl_crop, sampl_crop_group]:
+            if mode not in ["default", "user_define"]:
+                raise ValueError("Invalid sampling mode specified.")
+
+        farm = {key: value[0] for key, value in base_data["farm_data"].items()}
+        user_distributions = {}
+        if sampl_crop == "user_define":
+            crop_manager = CropParametersManager(farm, base_data["climate_data"])
+            user_distributions["crop_parameters"] = (
+                crop_manager.load_user_distributions().get(farm["crop"])
+            )
+        if sampl_crop_group == "user_define":
+            user_distributions["crop_group_params"] = (
+                CropGroupManager(farm).load_user_distributions().get(farm["group"])
+            )
+        if sampl_modifier == "user_define":
+            user_distributions["modifiers"] = ModifiersManager(
+                farm
+            ).load_user_distributions()
+
+        names, groups, distributions = [], [], []
+        for group in PARAMETER_GROUPS:
+            if group in user_distributions and user_distributions[group] is None:
+                raise ValueError(f"No user-defined distributions found for {group}.")
+            params = (
+                CLIMATE_PARAMETERS if group == "climate_data" else base_data[group]
+            )
+            for param in params:
+                if group in user_distributions:
+                    spec = user_distributions[group].get(param)
+                    if spec is None:
+                        continue
+                else:
+                    spec = default_distribution(base_data[group][param][0])
+                names.append(param)
+                groups.append(group)
+                distributions.append(tuple(spec[:3]))
+        return cls(base_data, names, groups, distributions)
+
+    def scale(self, U):
+        """
+        Maps a design of uniform values to input values through each input's
+        distribution.
+
+        Parameters
+        ----------
+        U : numpy.ndarray
+            Uniform values in [0, 1] of shape (N, num_vars).
+
+        Returns
+        -------
+        numpy.ndarray
+            Input values of shape (N, num_vars).
+        """
+        U = np.asarray(U, dtype=np.float64)
+        X = np.empty_like(U)
+        for j, (distribution, a, b) in enumerate(self.distributions):
+            X[:, j] = ppf(distribution, a, b, U[:, j])
+        return X
+
+    def evaluate(self, X, output="co2_crop_direct", chunk_size=200_000):
+        """
+        Evaluates the emission calculation for each row of input values with the
+        vectorized BatchCalculator.
+
+        Parameters
+        ----------
+        X : numpy.ndarray
+            Input values of shape (N, num_vars), e.g. from `scale`.
+        output : str, optional
+            The calculated quantity to return, e.g. 'co2_crop_direct', 'EF' or
+            'n_crop_residue'. Defaults to 'co2_crop_direct'.
+        chunk_size : int, optional
+            The maximum number of rows evaluated at once, which bounds memory use.
+
+        Returns
+        -------
+        numpy.ndarray
+            The output for each row of `X`.
+
+        Raises
+        ------
+        KeyError
+            If `output` is not calculated by the BatchCalculator.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        results = np.empty(len(X))
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start : start + chunk_size]
+            data = self._build_batch(chunk)
+            for values in BatchCalculator(data).get_result().values():
+                if output in values:
+                    results[start : start + chunk_size] = values[output]
+                    break
+            else:
+                raise KeyError(f"Unknown output '{output}'.")
+        return results
+
+    def _build_batch(self, X):
+        n = len(X)
+        data = {
+            "farm_data": {
+                key: np.full(n, self.base_data["farm_data"][key][0])
+                for key in ["area", "yield", "group"]
+            }
+        }
+        for group in PARAMETER_GROUPS:
+            data[group] = {
+                param: np.full(n, float(values[0]))
+                for param, values in self.base_data[group].items()
+                if param != "locations"
+            }
+        for j, (name, group) in enumerate(zip(self.names, self.groups)):
+            data[group][name] = X[:, j]
+        return data
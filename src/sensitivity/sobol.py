@@ -0,0 +1,259 @@
+"""
+This module provides the SobolAnalysis class, a variance-based global sensitivity
+analysis of the N2O emission calculation for one farm. Unlike the one-at-a-time spreads
+of the scientific mode, Sobol indices account for interactions between inputs.
+
+The Saltelli scheme draws two independent matrices A and B of N input sets each and,
+for every input i, the matrix AB_i that equals A except for column i taken from B. The
+model is evaluated on all N * (d + 2) input sets in vectorized batches. First-order
+indices use the estimator of Saltelli et al. (2010) and total-order indices the
+estimator of Jansen (1999). Confidence intervals are percentile bootstrap intervals
+over resampled rows.
+
+Usage:
+    python src/sensitivity/sobol.py -i data/test/hypothetical_farm_data.csv
+        --farm_id farm1 --crop Soybean --num_samples 40000
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from src.sensitivity.problem import SensitivityProblem
+
+
+class SobolAnalysis:
+    """
+    Computes first-order and total-order Sobol indices of one calculation output with
+    bootstrap confidence intervals.
+
+    Parameters
+    ----------
+    problem : SensitivityProblem
+        The uncertain inputs and the model evaluation.
+    num_samples : int, optional
+        The number N of base input sets. The model is evaluated N * (num_vars + 2)
+        times. Defaults to 10000.
+    num_resamples : int, optional
+        The number of bootstrap resamples for the confidence intervals. Defaults to 100.
+    conf_level : float, optional
+        The confidence level of the intervals. Defaults to 0.95.
+    seed : int, optional
+        Seed of the random number generator drawing the samples and resamples.
+
+    Attributes
+    ----------
+    rng : numpy.random.Generator
+        The random number generator.
+
+    Methods
+    -------
+    sample()
+        Draws the uniform base matrices A and B.
+    evaluate(A, B, output='co2_crop_direct')
+        Evaluates the model on A, B and every AB_i matrix.
+    compute_indices(f_A, f_B, f_AB)
+        Computes first-order and total-order indices from model outputs.
+    run(output='co2_crop_direct')
+        Runs the full analysis and returns the indices with confidence intervals.
+
+    Examples
+    --------
+    >>> problem = SensitivityProblem.from_farm_data(all_data)
+    >>> result = SobolAnalysis(problem, num_samples=40000, seed=1).run()
+    >>> result["indices"]["N_p"]["S1"]
+    0.41...
+    """
+
+    def __init__(
+        self, problem, num_samples=10000, num_resamples=100, conf_level=0.95, seed=None
+    ):
+        if num_samples < 2:
+            raise ValueError("num_samples must be at least 2.")
+        if not 0 < conf_level < 1:
+            raise ValueError("conf_level must be between 0 and 1.")
+        self.problem = problem
+        self.num_samples = int(num_samples)
+        self.num_resamples = int(num_resamples)
+        self.conf_level = conf_level
+        self.rng = np.random.default_rng(seed)
+
+    def sample(self):
+        """
+        Draws the uniform base matrices A and B.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            A and B, each of shape (num_samples, num_vars).
+        """
+        U = self.rng.random((self.num_samples, 2 * self.problem.num_vars))
+        return U[:, : self.problem.num_vars], U[:, self.problem.num_vars :]
+
+    def evaluate(self, A, B, output="co2_crop_direct"):
+        """
+        Evaluates the model on A, B and every AB_i matrix.
+
+        Parameters
+        ----------
+        A, B : numpy.ndarray
+            Uniform base matrices of shape (N, num_vars).
+        output : str, optional
+            The calculated quantity to analyze. Defaults to 'co2_crop_direct'.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            f_A and f_B of shape (N,), and f_AB of shape (num_vars, N).
+        """
+        X_A = self.problem.scale(A)
+        X_B = self.problem.scale(B)
+        f_A = self.problem.evaluate(X_A, output)
+        f_B = self.problem.evaluate(X_B, output)
+        f_AB = np.empty((self.problem.num_vars, len(A)))
+        X_AB = X_A.copy()
+        for i in range(self.problem.num_vars):
+            X_AB[:, i] = X_B[:, i]
+            f_AB[i] = self.problem.evaluate(X_AB, output)
+            X_AB[:, i] = X_A[:, i]
+        return f_A, f_B, f_AB
+
+    @staticmethod
+    def compute_indices(f_A, f_B, f_AB):
+        """
+        Computes first-order and total-order indices from model outputs. Resampled
+        outputs can be passed with a leading resample axis.
+
+        Parameters
+        ----------
+        f_A, f_B : numpy.ndarray
+            Outputs on A and B, of shape (..., N).
+        f_AB : numpy.ndarray
+            Outputs on every AB_i, of shape (..., num_vars, N).
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            First-order and total-order indices, each of shape (..., num_vars). Indices
+            are NaN when the output does not vary.
+        """
+        f_A = f_A[..., np.newaxis, :]
+        f_B = f_B[..., np.newaxis, :]
+        variance = np.var(np.concatenate([f_A, f_B], axis=-1), axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            first_order = np.mean(f_B * (f_AB - f_A), axis=-1) / variance
+            total_order = 0.5 * np.mean((f_A - f_AB) ** 2, axis=-1) / variance
+        return first_order, total_order
+
+    def run(self, output="co2_crop_direct"):
+        """
+        Runs the full analysis and returns the indices with confidence intervals.
+
+        Parameters
+        ----------
+        output : str, optional
+            The calculated quantity to analyze. Defaults to 'co2_crop_direct'.
+
+        Returns
+        -------
+        dict
+            'output', 'num_evaluations', the output's 'mean' and 'variance', and
+            'indices' mapping each input to its 'S1', 'S1_conf', 'ST' and 'ST_conf',
+            where the confidence intervals are [low, high] lists.
+        """
+        A, B = self.sample()
+        f_A, f_B, f_AB = self.evaluate(A, B, output)
+        first_order, total_order = self.compute_indices(f_A, f_B, f_AB)
+
+        # Resample rows in chunks to bound the memory of the gathered outputs
+        boot_first = np.empty((self.num_resamples, self.problem.num_vars))
+        boot_total = np.empty((self.num_resamples, self.problem.num_vars))
+        chunk = max(1, 10_000_000 // (self.num_samples * (self.problem.num_vars + 2)))
+        for start in range(0, self.num_resamples, chunk):
+            stop = min(start + chunk, self.num_resamples)
+            rows = self.rng.integers(
+                0, self.num_samples, (stop - start, self.num_samples)
+            )
+            boot_first[start:stop], boot_total[start:stop] = self.compute_indices(
+                f_A[rows], f_B[rows], np.swapaxes(f_AB[:, rows], 0, 1)
+            )
+        tail = 100 * (1 - self.conf_level) / 2
+        first_conf = np.nanpercentile(boot_first, [tail, 100 - tail], axis=0)
+        total_conf = np.nanpercentile(boot_total, [tail, 100 - tail], axis=0)
+
+        indices = {}
+        for i, name in enumerate(self.problem.names):
+            indices[name] = {
+                "group": self.problem.groups[i],
+                "S1": float(first_order[i]),
+                "S1_conf": first_conf[:, i].tolist(),
+                "ST": float(total_order[i]),
+                "ST_conf": total_conf[:, i].tolist(),
+            }
+        f_all = np.concatenate([f_A, f_B])
+        return {
+            "output": output,
+            "num_evaluations": int(self.num_samples * (self.problem.num_vars + 2)),
+            "mean": float(np.mean(f_all)),
+            "variance": float(np.var(f_all)),
+            "indices": indices,
+        }
+
+
+if __name__ == "__main__":
+    import warnings
+    from src.data_loader.get_full_params import FarmDataHub
+
+    parser = argparse.ArgumentParser(description="Sobol sensitivity analysis")
+    parser.add_argument("-i", "--input", type=str, required=True, help="Input file")
+    parser.add_argument("--farm_id", type=str, required=True, help="Farm ID")
+    parser.add_argument("--crop", type=str, required=True, help="Crop name")
+    parser.add_argument(
+        "--source", type=str, default="default", help="Data source type"
+    )
+    parser.add_argument(
+        "--num_samples", type=int, default=10000, help="Number of base input sets"
+    )
+    parser.add_argument(
+        "--num_resamples", type=int, default=100, help="Number of bootstrap resamples"
+    )
+    parser.add_argument(
+        "--output_variable",
+        type=str,
+        default="co2_crop_direct",
+        help="Calculated quantity to analyze",
+    )
+    parser.add_argument("--sampl_modifier", type=str, default="default")
+    parser.add_argument("--sampl_crop", type=str, default="default")
+    parser.add_argument("--sampl_crop_group", type=str, default="default")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument(
+        "-o", "--output", type=str, default="sobol.json", help="Output file name"
+    )
+    args = parser.parse_args()
+
+    farm_params = FarmDataHub(
+        input_file=args.input,
+        farm_id=args.farm_id,
+        crop=args.crop,
+        source=args.source,
+        operation_mode="farmer",
+    ).gather_all_data()
+    sobol_problem = SensitivityProblem.from_farm_data(
+        farm_params, args.sampl_modifier, args.sampl_crop, args.sampl_crop_group
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        sobol_result = SobolAnalysis(
+            sobol_problem, args.num_samples, args.num_resamples, seed=args.seed
+        ).run(args.output_variable)
+
+    output_path = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)), "../../data/outputs", args.output
+    )
+    with open(output_path, "w") as f:
+        json.dump(sobol_result, f, indent=4)
+    print(f"Sobol indices saved to {output_path}")
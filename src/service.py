@@ -0,0 +1,246 @@
+"""
+This module runs the N2O emission calculator as a long-running local HTTP service.
+Keeping one process alive avoids paying the import and data loading cost of
+`src/main.py` on every calculation: the reference tables, compiled crop and modifier
+tables, location index, shapefiles and fetched POWER climate data stay cached in memory
+between requests.
+
+Endpoints
+---------
+GET /health
+    Returns {"status": "ok"}.
+POST /farmer
+    Runs a farmer-mode calculation. The JSON body holds 'input_file', 'farm_id' and
+    'crop', and optionally 'source' ('default' or 'external') and 'metrics'.
+POST /scientific
+    Runs a scientific-mode calculation. The JSON body holds 'input_file', 'farm_id' and
+    'crop', and optionally 'source' (defaults to 'external'), 'num_runs',
+    'sampl_modifier', 'sampl_crop', 'sampl_crop_group', 'sampling_method', 'seed'
+    and 'metrics'.
+
+Both calculation endpoints respond with the same structure `main.main` writes to its
+output JSON file. With "metrics": true, the response also holds a 'Metrics' entry with
+the wall time and call count of each stage, the cache hits and the bytes read. Invalid requests are answered with status 400 and {"error": message}.
+
+Usage:
+    python src/service.py --host 127.0.0.1 --port 8000
+
+    curl -X POST localhost:8000/farmer -d '{"input_file":
+        "data/test/hypothetical_farm_data.csv", "farm_id": "farm1", "crop": "Soybean"}'
+"""
+
+import os
+import sys
+import json
+import argparse
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from main import NumpyEncoder, calculate
+from src.instrumentation import collect
+
+REQUIRED_FIELDS = ["input_file", "farm_id", "crop"]
+
+OPTIONAL_FIELDS = {
+    "farmer": {"source": "default", "metrics": False},
+    "scientific": {
+        "source": "external",
+        "num_runs": 10,
+        "sampl_modifier": "default",
+        "sampl_crop": "default",
+        "sampl_crop_group": "default",
+        "sampling_method": "mc",
+        "seed": None,
+        "metrics": False,
+    },
+}
+
+
+def parse_request(body, operation_mode):
+    """
+    Builds the keyword arguments of `main.calculate` from a request body.
+
+    Parameters
+    ----------
+    body : dict
+        The decoded JSON request body.
+    operation_mode : str
+        'farmer' or 'scientific'.
+
+    Returns
+    -------
+    dict
+        Keyword arguments for `main.calculate`, and whether to collect 'metrics'.
+
+    Raises
+    ------
+    ValueError
+        If the body is not a JSON object, a required field is missing or an unknown
+        field is given.
+    """
+    if not isinstance(body, dict):
+        raise ValueError("Request body must be a JSON object.")
+
+    optional_fields = OPTIONAL_FIELDS[operation_mode]
+    missing = [field for field in REQUIRED_FIELDS if field not in body]
+    if missing:
+        raise ValueError(f"Missing required fields: {missing}")
+    unknown = [
+        field
+        for field in body
+        if field not in REQUIRED_FIELDS and field not in optional_fields
+    ]
+    if unknown:
+        raise ValueError(f"Unknown fields for {operation_mode} mode: {unknown}")
+
+    kwargs = {field: body[field] for field in REQUIRED_FIELDS}
+    for field, default in optional_fields.items():
+        kwargs[field] = body.get(field, default)
+    if "num_runs" in kwargs:
+        kwargs["num_runs"] = int(kwargs["num_runs"])
+    kwargs["operation_mode"] = operation_mode
+    return kwargs
+
+
+def warm_up():
+    """
+    Loads the reference data shared by all calculations, so that the first request
+    is as fast as the following ones.
+    """
+    from src.data_loader.get_crop_params import load_crop_condition_tables
+    from src.data_loader.get_modifiers import load_modifier_table
+    from src.data_loader.location_index import get_location_index
+    from src.data_loader.reference_data import load_reference_table
+
+    data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
+    load_crop_condition_tables(
+        os.path.join(data_dir, "preprocessed", "crop_parameters.csv")
+    )
+    load_modifier_table(os.path.join(data_dir, "preprocessed"))
+    get_location_index()
+    for table in [
+        "preprocessed/crop_to_group.csv",
+        "preprocessed/crop_group_parameters.csv",
+        "preprocessed/modifier_rf_tx.csv",
+        "raw/Holos/ecodistrict_to_ecozone_mapping.csv",
+    ]:
+        load_reference_table(os.path.join(data_dir, table))
+
+
+class CalculationRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the health check and calculation requests of the service.
+
+    Methods
+    -------
+    do_GET()
+        Answers the health check.
+    do_POST()
+        Runs a farmer- or scientific-mode calculation.
+    send_json(status, payload)
+        Sends a JSON response.
+    """
+
+    routes = {"/farmer": "farmer", "/scientific": "scientific"}
+
+    def do_GET(self):
+        """Answers the health check."""
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        """Runs a farmer- or scientific-mode calculation."""
+        operation_mode = self.routes.get(self.path)
+        if operation_mode is None:
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            kwargs = parse_request(body, operation_mode)
+            metrics = kwargs.pop("metrics")
+            with collect() if metrics else contextlib.nullcontext() as collection:
+                output = calculate(**kwargs, location_index=self.server.location_index)
+            if collection is not None:
+                output["Metrics"] = collection.as_dict()
+        except (ValueError, KeyError, FileNotFoundError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            self.send_json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+
+        self.send_json(200, output)
+
+    def send_json(self, status, payload):
+        """
+        Sends a JSON response.
+
+        Parameters
+        ----------
+        status : int
+            The HTTP status code.
+        payload : dict
+            The response body, which may contain numpy arrays.
+        """
+        content = json.dumps(payload, cls=NumpyEncoder).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(host="127.0.0.1", port=8000, location_index=None, quiet=False):
+    """
+    Creates the calculation service without starting it.
+
+    Parameters
+    ----------
+    host : str, optional
+        Interface to listen on. Defaults to '127.0.0.1'.
+    port : int, optional
+        Port to listen on; 0 picks a free port. Defaults to 8000.
+    location_index : LocationIndex, optional
+        Precomputed farm locations. Defaults to the index in 'data/preprocessed'.
+    quiet : bool, optional
+        Whether to suppress the per-request log lines. Defaults to False.
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        The server; call `serve_forever()` to start handling requests.
+    """
+    server = ThreadingHTTPServer((host, port), CalculationRequestHandler)
+    server.location_index = location_index
+    server.quiet = quiet
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nitrogen emission calculation service")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument(
+        "--quiet", action="store_true", help="Do not log individual requests"
+    )
+    args = parser.parse_args()
+
+    warm_up()
+    calculation_server = create_server(args.host, args.port, quiet=args.quiet)
+    print(f"Serving on http://{args.host}:{calculation_server.server_port}")
+    try:
+        calculation_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        calculation_server.server_close()
@@ -0,0 +1,534 @@
+"""
+This module provides a durable local work queue for batch runs, kept in one SQLite
+file. Workers that share the file claim (farm_id, crop, options) tasks from it, so a
+large run is spread over more processes by starting more workers, without a central
+service.
+
+Each task moves through the states 'pending', 'leased', 'done' and 'failed':
+
+- A worker claims the oldest pending task and holds a lease on it for
+  `LEASE_SECONDS`. While the task runs, the worker renews the lease with heartbeats.
+- A lease that expires, e.g. because its worker was killed, makes the task claimable
+  again. Only the holder of the lease can complete the task.
+- A finished task stores a result pointer, by default the output file written by
+  `main.main`.
+- A task that raised is retried until it has been attempted `MAX_ATTEMPTS` times, and
+  is then marked as failed with its last error.
+
+Every operation runs in its own short `BEGIN IMMEDIATE` transaction on a fresh
+connection, so concurrent workers never claim the same task. This relies on SQLite's
+file locks, which are unreliable on network file systems such as NFS or SMB, where two
+workers could claim the same task or corrupt the file. The queue must therefore be on
+a local disk of the machine that runs its workers; a run is spread over several
+machines by giving each machine a queue with its share of the input rows.
+
+Functions
+---------
+run_worker(queue_path=DEFAULT_QUEUE_PATH, worker=None, max_tasks=None, wait=False)
+    Claims and runs tasks until the queue is drained.
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.instrumentation import count
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+DEFAULT_QUEUE_PATH = os.path.join(DATA_DIR, "cache", "work_queue.sqlite")
+LEASE_SECONDS = 600.0
+MAX_ATTEMPTS = 3
+# Seconds a connection waits for the lock of another worker's transaction
+LOCK_TIMEOUT = 60.0
+# Heartbeats wait less, so that a finished task does not wait for a pending heartbeat
+HEARTBEAT_LOCK_TIMEOUT = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL,
+    farm_id TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    options TEXT NOT NULL,
+    output_file TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    UNIQUE (input_file, farm_id, crop, options)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+"""
+TASK_COLUMNS = ["id", "input_file", "farm_id", "crop", "options", "output_file"]
+TASK_COLUMNS += ["status", "attempts", "worker", "result", "error"]
+
+
+class WorkQueue:
+    """
+    A durable queue of calculation tasks in a SQLite file.
+
+    Parameters
+    ----------
+    path : str, optional
+        The SQLite file, created if missing. Defaults to `DEFAULT_QUEUE_PATH`.
+    lease_seconds : float, optional
+        How long a claimed task stays leased without a heartbeat. Defaults to
+        `LEASE_SECONDS`.
+    max_attempts : int, optional
+        How often a task is attempted before it is marked as failed. Defaults to
+        `MAX_ATTEMPTS`.
+
+    Methods
+    -------
+    enqueue(tasks)
+        Adds tasks that are not queued yet.
+    claim(worker)
+        Leases the oldest claimable task to a worker.
+    heartbeat(task_id, worker, timeout=LOCK_TIMEOUT)
+        Renews the lease of a task.
+    complete(task_id, worker, result)
+        Marks a leased task as done with its result pointer.
+    fail(task_id, worker, error)
+        Releases a leased task for a retry, or marks it as failed.
+    retry_failed()
+        Makes the failed tasks pending again.
+    status()
+        Returns the number of tasks in each state.
+    tasks(status=None)
+        Returns the tasks, optionally of one state.
+
+    Examples
+    --------
+    >>> queue = WorkQueue("data/cache/work_queue.sqlite")
+    >>> queue.enqueue([{"input_file": "farms.csv", "farm_id": "farm1",
+    ...                 "crop": "Soybean", "options": {"source": "external"}}])
+    1
+    >>> task = queue.claim("worker-1")
+    >>> queue.complete(task["id"], "worker-1", "farm1_Soybean.json")
+    True
+    """
+
+    def __init__(
+        self, path=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS
+    ):
+        self.path = path or DEFAULT_QUEUE_PATH
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = self._connect()
+        try:
+            # The statements create the table and index only if they do not exist
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self, timeout=LOCK_TIMEOUT):
+        return sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+
+    @contextlib.contextmanager
+    def _transaction(self, timeout=LOCK_TIMEOUT):
+        connection = self._connect(timeout)
+        try:
+            # The write lock is taken at the start, so reads and updates are atomic
+            connection.execute("BEGIN IMMEDIATE")
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def enqueue(self, tasks):
+        """
+        Adds tasks that are not queued yet. A task that is already in the queue with
+        the same input file, farm, crop and options is left as it is, so a run can be
+        enqueued again after an interruption.
+
+        Parameters
+        ----------
+        tasks : iterable of dict
+            Tasks with 'input_file', 'farm_id', 'crop' and 'options', the keyword
+            arguments of `main.main`, and optionally 'output_file'.
+
+        Returns
+        -------
+        int
+            The number of tasks added.
+        """
+        now = time.time()
+        rows = [
+            (
+                task["input_file"],
+                task["farm_id"],
+                task["crop"],
+                json.dumps(task.get("options", {}), sort_keys=True),
+                task.get("output_file"),
+                now,
+            )
+            for task in tasks
+        ]
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (input_file, farm_id, crop, options, "
+                "output_file, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return connection.total_changes - before
+
+    def claim(self, worker):
+        """
+        Leases the oldest pending task, or a task whose lease expired, to a worker.
+        Tasks whose lease expired on their last attempt are marked as failed.
+
+        Parameters
+        ----------
+        worker : str
+            The name of the worker.
+
+        Returns
+        -------
+        dict or None
+            The task with its 'id', 'input_file', 'farm_id', 'crop', 'options',
+            'output_file' and 'attempts', or None if no task can be claimed.
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE tasks SET status = 'failed', worker = NULL, "
+                "lease_expires = NULL, error = 'Lease expired on the last attempt', "
+                "updated = ? WHERE status = 'leased' AND lease_expires < ? "
+                "AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = connection.execute(
+                "SELECT id FROM tasks WHERE status = 'pending' OR "
+                "(status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated = ? WHERE id = ?",
+                (worker, now + self.lease_seconds, now, row[0]),
+            )
+            task = self._select(connection, "WHERE id = ?", (row[0],))[0]
+        count("work_queue.claimed")
+        return task
+
+    def heartbeat(self, task_id, worker, timeout=LOCK_TIMEOUT):
+        """
+        Renews the lease of a task held by a worker for another `lease_seconds`.
+
+        Parameters
+        ----------
+        task_id : int
+            The id of the task.
+        worker : str
+            The name of the worker.
+        timeout : float, optional
+            Seconds to wait for the lock of another worker's transaction. Defaults to
+            `LOCK_TIMEOUT`.
+
+        Returns
+        -------
+        bool
+            Whether the worker still held the lease.
+
+        Raises
+        ------
+        sqlite3.OperationalError
+            If the queue stayed locked for `timeout` seconds.
+        """
+        now = time.time()
+        return self._update_leased(
+            task_id,
+            worker,
+            "lease_expires = ?, updated = ?",
+            (now + self.lease_seconds, now),
+            timeout,
+        )
+
+    def complete(self, task_id, worker, result=None):
+        """
+        Marks a task leased by a worker as done.
+
+        Parameters
+        ----------
+        task_id : int
+            The id of the task.
+        worker : str
+            The name of the worker.
+        result : str, optional
+            The result pointer, e.g. the path of the output file.
+
+        Returns
+        -------
+        bool
+            Whether the worker still held the lease. A worker whose lease expired and
+            was claimed by another worker cannot complete the task.
+        """
+        return self._update_leased(
+            task_id,
+            worker,
+            "status = 'done', lease_expires = NULL, result = ?, error = NULL, "
+            "updated = ?",
+            (result, time.time()),
+        )
+
+    def fail(self, task_id, worker, error):
+        """
+        Releases a task leased by a worker after an error. The task is pending again
+        until it has been attempted `max_attempts` times, and failed after that.
+
+        Parameters
+        ----------
+        task_id : int
+            The id of the task.
+        worker : str
+            The name of the worker.
+        error : str
+            The error message.
+
+        Returns
+        -------
+        bool
+            Whether the worker still held the lease.
+        """
+        return self._update_leased(
+            task_id,
+            worker,
+            "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_expires = NULL, error = ?, updated = ?",
+            (self.max_attempts, error, time.time()),
+        )
+
+    def _update_leased(
+        self, task_id, worker, assignments, parameters, timeout=LOCK_TIMEOUT
+    ):
+        with self._transaction(timeout) as connection:
+            cursor = connection.execute(
+                f"UPDATE tasks SET {assignments} WHERE id = ? AND status = 'leased' "
+                "AND worker = ?",
+                (*parameters, task_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def retry_failed(self):
+        """
+        Makes the failed tasks pending again, with their attempts reset.
+
+        Returns
+        -------
+        int
+            The number of tasks released.
+        """
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = 'pending', attempts = 0, updated = ? "
+                "WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def status(self):
+        """
+        Returns the number of tasks in each state.
+
+        Returns
+        -------
+        dict
+            The counts of 'pending', 'leased', 'done' and 'failed' tasks.
+        """
+        counts = dict.fromkeys(["pending", "leased", "done", "failed"], 0)
+        with self._transaction() as connection:
+            counts.update(
+                connection.execute(
+                    "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+                ).fetchall()
+            )
+        return counts
+
+    def tasks(self, status=None):
+        """
+        Returns the tasks, optionally of one state, in the order they were added.
+
+        Parameters
+        ----------
+        status : str, optional
+            'pending', 'leased', 'done' or 'failed'. Defaults to all tasks.
+
+        Returns
+        -------
+        list of dict
+            The tasks with their state, attempts, worker, result pointer and last
+            error.
+        """
+        with self._transaction() as connection:
+            if status is None:
+                return self._select(connection, "ORDER BY id", ())
+            return self._select(connection, "WHERE status = ? ORDER BY id", (status,))
+
+    @staticmethod
+    def _select(connection, condition, parameters):
+        rows = connection.execute(
+            f"SELECT {', '.join(TASK_COLUMNS)} FROM tasks {condition}", parameters
+        ).fetchall()
+        tasks = [dict(zip(TASK_COLUMNS, row)) for row in rows]
+        for task in tasks:
+            task["options"] = json.loads(task["options"])
+        return tasks
+
+
+@contextlib.contextmanager
+def _heartbeats(queue, task_id, worker):
+    """
+    Renews the lease of a task in the background while the block runs. A heartbeat
+    waits at most `HEARTBEAT_LOCK_TIMEOUT` for the lock, so the end of the block is
+    not held up by a busy queue.
+    """
+    stop = threading.Event()
+
+    def beat():
+        interval = queue.lease_seconds / 4
+        while not stop.wait(interval):
+            try:
+                if not queue.heartbeat(task_id, worker, HEARTBEAT_LOCK_TIMEOUT):
+                    break
+            except sqlite3.Error:
+                # E.g. a lock timeout on a busy queue, retried sooner so that the
+                # lease is renewed before it expires
+                count("work_queue.heartbeat_errors")
+                interval = queue.lease_seconds / 16
+            else:
+                interval = queue.lease_seconds / 4
+
+    # The thread runs in the worker's context, so that it counts into its metrics
+    thread = threading.Thread(
+        target=contextvars.copy_context().run, args=(beat,), daemon=True
+    )
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_main_task(task):
+    """
+    Runs a task with `main.main` and returns its output file as the result pointer.
+
+    Parameters
+    ----------
+    task : dict
+        A claimed task.
+
+    Returns
+    -------
+    str
+        The output file, relative to 'data/outputs' unless it is absolute.
+    """
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    import main
+
+    output_file = task["output_file"] or f"{task['farm_id']}_{task['crop']}.json"
+    main.main(
+        task["input_file"],
+        task["farm_id"],
+        task["crop"],
+        output_file=output_file,
+        **task["options"],
+    )
+    return output_file
+
+
+def run_worker(
+    queue_path=DEFAULT_QUEUE_PATH,
+    worker=None,
+    max_tasks=None,
+    wait=False,
+    poll_interval=5.0,
+    run_task=run_main_task,
+    lease_seconds=LEASE_SECONDS,
+    max_attempts=MAX_ATTEMPTS,
+):
+    """
+    Claims and runs tasks of a work queue one at a time, renewing the lease of the
+    running task, until no task is left or `max_tasks` tasks ran. The process keeps
+    its caches between tasks, so the reference data is loaded once per worker.
+
+    Parameters
+    ----------
+    queue_path : str, optional
+        The SQLite file of the queue. Defaults to `DEFAULT_QUEUE_PATH`.
+    worker : str, optional
+        The name of the worker. Defaults to '<host name>-<process id>'.
+    max_tasks : int, optional
+        The largest number of tasks to run. By default the worker runs until the
+        queue is drained.
+    wait : bool, optional
+        Whether to keep polling while other workers hold leases, so that the tasks
+        of workers that stopped are retried. By default the worker stops as soon as
+        no task can be claimed.
+    poll_interval : float, optional
+        Seconds between claims while waiting. Defaults to 5.
+    run_task : callable, optional
+        Runs a claimed task and returns its result pointer. Defaults to
+        `run_main_task`.
+    lease_seconds : float, optional
+        How long a claimed task stays leased without a heartbeat.
+    max_attempts : int, optional
+        How often a task is attempted before it is marked as failed.
+
+    Returns
+    -------
+    dict
+        The number of tasks the worker 'completed' and 'failed', and of tasks it
+        'lost' because its lease expired and another worker claimed the task before
+        it finished.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    queue = WorkQueue(queue_path, lease_seconds, max_attempts)
+    outcomes = {"completed": 0, "failed": 0, "lost": 0}
+    while max_tasks is None or sum(outcomes.values()) < max_tasks:
+        task = queue.claim(worker)
+        if task is None:
+            status = queue.status()
+            if not wait or status["pending"] + status["leased"] == 0:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        with _heartbeats(queue, task["id"], worker):
+            try:
+                result = run_task(task)
+            except Exception as error:
+                if queue.fail(task["id"], worker, f"{type(error).__name__}: {error}"):
+                    outcomes["failed"] += 1
+                else:
+                    outcomes["lost"] += 1
+                continue
+        if queue.complete(task["id"], worker, result):
+            outcomes["completed"] += 1
+        else:
+            outcomes["lost"] += 1
+    return outcomes
+
+
+# Example usage
+if __name__ == "__main__":
+    print(WorkQueue().status())
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from src.calculator.batch_calculator import BatchCalculator
+from src.calculator.crop_residue_aggregator import CropResidueAggregator
+from src.calculator.emission_factor_aggregator import EmissionFactorAggregator
+from src.calculator.emission_aggregator import EmissionAggregator
+
+
+@pytest.fixture
+def batch_data():
+    # One farm per crop group, covering the P > PE, P == PE and P < PE branches
+    return {
+        "farm_data": {
+            "area": np.array([10.0, 10.0, 2.5, 0.1409, 40.0]),
+            "yield": np.array([2700.0, 31000.0, 4000.0, 2700.0, 9000.0]),
+            "group": np.array(["Annual", "Root", "Perennial", "Cover", "Silage"]),
+        },
+        "crop_group_params": {
+            "carbon_concentration": np.array([0.45, 0.45, 0.45, 0.45, 0.45]),
+            "S_s": np.array([100.0, 100.0, 100.0, 100.0, 0.0]),
+            "S_r": np.array([100.0, 0.0, 100.0, 100.0, 100.0]),
+            "S_p": np.array([2.0, 0.0, 2.0, 100.0, 2.0]),
+        },
+        "crop_parameters": {
+            "moisture": np.array([14.0, 75.0, 12.0, 14.0, 65.0]),
+            "R_p": np.array([0.304, 0.736, 0.219, 0.0, 0.65]),
+            "R_s": np.array([0.455, 0.239, 0.551, 0.5, 0.0]),
+            "R_r": np.array([0.146, 0.015, 0.136, 0.3, 0.25]),
+            "R_e": np.array([0.095, 0.01, 0.095, 0.2, 0.1]),
+            "N_p": np.array([67.0, 15.0, 27.9, 12.0, 12.0]),
+            "N_s": np.array([6.0, 20.0, 8.6, 5.0, 0.0]),
+            "N_r": np.array([10.0, 10.0, 13.4, 3.0, 10.0]),
+            "N_e": np.array([10.0, 10.0, 13.4, 2.0, 10.0]),
+        },
+        "climate_data": {
+            "P": np.array([512.0, 483.0, 159.0, 652.0, 348.0]),
+            "PE": np.array([483.0, 483.0, 678.0, 556.0, 453.0]),
+            "FR_Topo": np.array([0.0, 5.0, 7.57, 11.71, 0.0]),
+            "soil_texture": np.array([1.0, 1.0, 0.49, 0.49, 2.55]),
+        },
+        "modifiers": {
+            "RF_AM": np.array([1.0, 1.0, 1.0, 1.0, 1.0]),
+            "RF_CS": np.array([1.0, 1.0, 0.19, 1.0, 1.0]),
+            "RF_NS": np.array([0.84, 0.84, 0.84, 0.84, 0.84]),
+            "RF_Till": np.array([1.0, 1.0, 1.0, 0.68, 1.0]),
+        },
+    }
+
+
+def test_matches_farmer_mode_aggregators(batch_data):
+    result = BatchCalculator(batch_data).get_result()
+
+    for i in range(len(batch_data["farm_data"]["group"])):
+        farm = {
+            group: {param: value[i : i + 1] for param, value in params.items()}
+            for group, params in batch_data.items()
+        }
+        crop_residue = CropResidueAggregator(farm, "farmer").crop_analysis()
+        emission_factor = EmissionFactorAggregator(farm, "farmer").get_result()
+        emission = EmissionAggregator(emission_factor, crop_residue).get_result()
+
+        for name, expected in [
+            ("Crop Nitrogen Residue", crop_residue),
+            ("Emission Factors", emission_factor),
+            ("Total Direct Nitrogen Emission", emission),
+        ]:
+            assert list(result[name]) == list(expected)
+            for key, value in expected.items():
+                assert np.isclose(result[name][key][i], value[0], rtol=1e-12, atol=0)
+
+
+def test_invalid_group(batch_data):
+    batch_data["farm_data"]["group"][0] = "Tree"
+    with pytest.raises(ValueError, match="group must be one of"):
+        BatchCalculator(batch_data)
+
+
+def test_invalid_moisture(batch_data):
+    batch_data["crop_parameters"]["moisture"][1] = 120.0
+    with pytest.raises(ValueError, match="Moisture must be between 0 and 100"):
+        BatchCalculator(batch_data)
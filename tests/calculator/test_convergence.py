@@ -0,0 +1,57 @@
+import os
+import sys
+import numpy as np
+import pytest
+from src.calculator.convergence import ConvergenceMonitor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+import main  # noqa: E402
+
+
+def test_monitor_statistics_and_convergence():
+    monitor = ConvergenceMonitor(tolerance=0.01, quantiles=[0.5])
+    values = np.arange(1, 101, dtype=float)
+
+    first = monitor.update({"P": values}, elapsed=0.1)
+    assert first["statistics"]["P"] == {"mean": 50.5, "q50": 50.5}
+    assert first["max_relative_change"] is None
+    assert first["elapsed"] == 0.1
+    assert not monitor.converged
+
+    monitor.update({"P": np.concatenate([values, values + 2])})
+    assert monitor.trace[-1]["max_relative_change"] == pytest.approx(1 / 50.5)
+    assert not monitor.converged
+
+    monitor.update({"P": np.concatenate([values, values + 2, values + 1])})
+    assert monitor.converged
+    assert [record["num_runs"] for record in monitor.trace] == [100, 200, 300]
+
+
+def test_adaptive_runs_until_converged(mock_calculate):
+    output = main.calculate_adaptive("farms.csv", "farm1", "Soybean", tolerance=0.02)
+    convergence = output["Convergence"]
+
+    assert convergence["converged"]
+    assert convergence["stop_reason"] == "converged"
+    runs = [record["num_runs"] for record in convergence["trace"]]
+    assert runs == [16 * 2**i for i in range(len(runs))]
+    assert len(output["Total Direct Nitrogen Emission"]["P"]["co2_crop_direct"]) == (
+        runs[-1] + 1
+    )
+    assert output["Input Parameters"]["farm_data"]["farm_id"].tolist() == ["farm1"]
+    assert mock_calculate.call_args.kwargs["operation_mode"] == "scientific"
+
+
+def test_adaptive_respects_budgets(mock_calculate):
+    output = main.calculate_adaptive(
+        "farms.csv", "farm1", "Soybean", tolerance=1e-9, max_fetches=50
+    )
+    convergence = output["Convergence"]
+    assert convergence["stop_reason"] == "max_fetches"
+    assert [record["fetches"] for record in convergence["trace"]] == [17, 33, 50]
+
+    output = main.calculate_adaptive(
+        "farms.csv", "farm1", "Soybean", tolerance=1e-9, max_runs=100
+    )
+    assert output["Convergence"]["stop_reason"] == "max_runs"
+    assert output["Convergence"]["trace"][-1]["num_runs"] == 100
@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import sys
+import numpy as np
+import pytest
+from src.calculator.streaming_stats import (
+    OutputSummary,
+    StreamingStatistics,
+    TDigest,
+)
+from tests.conftest import fake_calculate
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+import main  # noqa: E402
+
+
+def test_moments_and_histogram_match_numpy_across_merges():
+    values = np.random.default_rng(0).lognormal(7, 0.5, 30_000)
+    left, right = StreamingStatistics(), StreamingStatistics()
+    for chunk in np.array_split(values[:20_000], 7):
+        left.update(chunk)
+    right.update(values[20_000:])
+    left.merge(right)
+
+    assert left.count == values.size
+    assert left.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert left.variance == pytest.approx(values.var(), rel=1e-9)
+    assert (left.min, left.max) == (values.min(), values.max())
+
+    summary = left.summary()
+    counts, _ = np.histogram(values, bins=summary["histogram"]["edges"])
+    assert summary["histogram"]["counts"] == counts.tolist()
+
+
+def test_quantiles_are_accurate_in_the_tails():
+    values = np.random.default_rng(1).normal(100, 10, 100_000)
+    stats = StreamingStatistics()
+    for chunk in np.array_split(values, 10):
+        stats.update(chunk)
+    q = [0.01, 0.05, 0.5, 0.95, 0.99]
+    np.testing.assert_allclose(stats.quantile(q), np.quantile(values, q), rtol=2e-3)
+
+
+def test_nan_values_are_counted_separately():
+    stats = StreamingStatistics()
+    stats.update(np.array([1.0, np.nan, 3.0]))
+    assert stats.nan_count == 1
+    assert stats.summary()["mean"] == 2.0
+
+
+def test_tdigest_memory_is_bounded():
+    digest = TDigest(compression=100)
+    for chunk in np.array_split(np.random.default_rng(2).random(200_000), 20):
+        digest.update(chunk)
+    assert digest.count == 200_000
+    assert len(digest.means) < 200
+
+
+def test_summary_matches_the_runs_of_all_chunks(mock_calculate):
+    raw_file = io.StringIO()
+    output = main.calculate_summary(
+        "farms.csv", "farm1", "Soybean", 2500, chunk_size=1000, raw_file=raw_file
+    )
+
+    assert [call.kwargs["num_runs"] for call in mock_calculate.call_args_list] == [
+        1000,
+        1000,
+        500,
+    ]
+    runs = np.concatenate(
+        [
+            fake_calculate("", "", "", n, chunk)["Total Direct Nitrogen Emission"]["P"][
+                "co2_crop_direct"
+            ][1:]
+            for chunk, n in enumerate([1000, 1000, 500])
+        ]
+    )
+    co2 = output["Total Direct Nitrogen Emission"]["P"]["co2_crop_direct"]
+    assert co2["farm_value"] == 100.0
+    assert co2["count"] == 2500
+    assert co2["mean"] == pytest.approx(runs.mean())
+    assert co2["quantiles"]["q50"] == pytest.approx(np.median(runs), rel=1e-3)
+    assert output["Input Parameters"]["farm_data"]["farm_id"].tolist() == ["farm1"]
+
+    lines = [json.loads(line) for line in raw_file.getvalue().splitlines()]
+    assert [line["chunk"] for line in lines] == [0, 1, 2]
+
+
+def test_output_summary_merges_workers():
+    first, second = OutputSummary(), OutputSummary()
+    first.update(fake_calculate("", "farm1", "Soybean", 500, chunk=0), 500)
+    second.update(fake_calculate("", "farm1", "Soybean", 700, chunk=1), 700)
+    first.merge(second)
+    path = ("Total Direct Nitrogen Emission", "P", "co2_crop_direct")
+    assert first.statistics(*path).count == 1200
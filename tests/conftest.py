@@ -0,0 +1,77 @@
+import os
+import sys
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_loader.get_external_climate_params import ExternalClimateDataFetcher
+from src.data_loader.get_external_soil_params import ExternalSoilTextureDataFetcher
+from src.data_loader.location_cache import clear_location_cache
+from src.data_loader.location_index import LocationIndex
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+import main  # noqa: E402
+
+
+@pytest.fixture
+def location_index():
+    """The location of farm1 of the hypothetical farm data, in British Columbia."""
+    records = pd.DataFrame(
+        {
+            "longitude": [-123.2373389],
+            "latitude": [49.99704167],
+            "province": ["British Columbia"],
+            "eco_id": [950],
+        }
+    )
+    return LocationIndex(records)
+
+
+@pytest.fixture
+def power_outage():
+    """
+    Makes every POWER request fail, as during an outage of the API, with a fixed soil
+    texture. Yields the mock of the climate fetch, whose `side_effect` can be reset
+    to end the outage.
+    """
+
+    def failed_fetch(fetcher, by_year=False):
+        return {
+            point: {"error": "Failed to fetch data: 503", "success": False}
+            for point in fetcher.points
+        }
+
+    clear_location_cache()
+    with patch.object(
+        ExternalClimateDataFetcher,
+        "process_points_over_years",
+        autospec=True,
+        side_effect=failed_fetch,
+    ) as mock, patch.object(
+        ExternalSoilTextureDataFetcher,
+        "get_soil_texture_values",
+        autospec=True,
+        side_effect=lambda fetcher, midpoints_only=False: {
+            point: 0.8 for point in fetcher.points
+        },
+    ):
+        yield mock
+    clear_location_cache()
+
+
+def fake_calculate(input_file, farm_id, crop, num_runs=10, chunk=0, **kwargs):
+    # Scientific mode output of a farm point at 100 and normally distributed samples,
+    # independent for each chunk
+    rng = np.random.default_rng([num_runs, chunk])
+    co2 = np.insert(rng.normal(100, 10, num_runs), 0, 100.0)
+    return {
+        "Input Parameters": {"farm_data": {"farm_id": np.array([farm_id])}},
+        "Total Direct Nitrogen Emission": {"P": {"co2_crop_direct": co2}},
+    }
+
+
+@pytest.fixture
+def mock_calculate():
+    """Replaces `main.calculate` with `fake_calculate`."""
+    with patch.object(main, "calculate", side_effect=fake_calculate) as mock:
+        yield mock
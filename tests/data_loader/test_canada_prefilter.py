@@ -0,0 +1,76 @@
+from unittest.mock import patch
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from src.data_loader import canada_prefilter
+from src.data_loader.canada_prefilter import outside_canada
+from src.data_loader.reference_data import clear_reference_cache
+
+
+def test_canadian_points_near_the_boundary_are_kept():
+    points = {
+        "farm1": (-123.2373389, 49.99704167),
+        "Victoria": (-123.37, 48.42),
+        "Pelee Island": (-82.65, 41.76),
+        "Windsor": (-83.03, 42.31),
+        "Grand Manan": (-66.82, 44.66),
+        "Yarmouth": (-66.12, 43.84),
+        "Haida Gwaii": (-132.0, 53.25),
+    }
+    longitudes, latitudes = zip(*points.values())
+    assert not outside_canada(longitudes, latitudes).any()
+
+
+def test_points_outside_canada_are_rejected():
+    points = {
+        "Seattle": (-122.33, 47.61),
+        "Chicago": (-87.63, 41.88),
+        "Boston": (-71.06, 42.36),
+        "Anchorage": (-149.9, 61.2),
+        "Swapped coordinates": (49.99704167, -123.2373389),
+        "Missing": (np.nan, 50.0),
+    }
+    longitudes, latitudes = zip(*points.values())
+    assert outside_canada(longitudes, latitudes).all()
+
+
+@pytest.fixture
+def border(tmp_path):
+    # A boundary at 49 degrees with a dip to 48 degrees between -110 and -100
+    line = shapely.LineString(
+        [(-120, 49), (-110, 49), (-105, 48), (-100, 49), (-90, 49)]
+    )
+    path = tmp_path / "border"
+    path.mkdir()
+    gpd.GeoDataFrame(geometry=[line], crs="EPSG:4326").to_file(path / "border.shp")
+    clear_reference_cache()
+    with patch.object(canada_prefilter, "BORDER", str(path)):
+        yield str(path)
+    clear_reference_cache()
+
+
+def test_envelope_is_the_lowest_boundary_latitude(border):
+    longitudes = [-115, -115, -105, -105, -101, -101]
+    latitudes = [48.99, 49.01, 47.99, 48.01, 48.5, 48.9]
+    assert outside_canada(longitudes, latitudes).tolist() == [
+        True,
+        False,
+        True,
+        False,
+        # The band of -101 is as low as the lowest point of the segment crossing it
+        False,
+        False,
+    ]
+
+
+def test_ends_of_the_boundary_are_not_tested(border):
+    longitudes = [-125, -119.95, -119.5, -90.05, -85]
+    latitudes = [45, 45, 45, 45, 45]
+    assert outside_canada(longitudes, latitudes).tolist() == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
@@ -0,0 +1,62 @@
+import os
+import sys
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from src.data_loader.columnar_input import is_columnar_input, read_columnar_input
+from src.data_loader.get_farm_data import FarmDataManager
+
+INPUT_FILE = "data/test/hypothetical_farm_data.csv"
+INPUT_PATH = os.path.join(os.path.dirname(__file__), "../..", INPUT_FILE)
+
+
+def test_columnar_extensions():
+    assert is_columnar_input("farms.parquet")
+    assert is_columnar_input("farms.FEATHER")
+    assert not is_columnar_input("farms.csv")
+
+
+def test_missing_pyarrow_is_reported():
+    with patch.dict(sys.modules, {"pyarrow": None, "pyarrow.dataset": None}):
+        with pytest.raises(ImportError, match="pyarrow"):
+            read_columnar_input("farms.parquet")
+
+
+@pytest.fixture(params=["parquet", "feather"])
+def columnar_file(request, tmp_path):
+    pytest.importorskip("pyarrow")
+    df = pd.read_csv(INPUT_PATH, encoding="utf-8-sig")
+    path = tmp_path / f"farms.{request.param}"
+    if request.param == "parquet":
+        # Small row groups, so that the filter can skip some of them
+        df.to_parquet(path, row_group_size=1)
+    else:
+        df.to_feather(path)
+    return str(path)
+
+
+def test_farms_match_the_csv_input(columnar_file):
+    farms = [("farm1", "Potato"), ("farm1", "Soybean")]
+    expected = FarmDataManager.get_farm_data_batch(INPUT_FILE, farms)
+    columnar = FarmDataManager.get_farm_data_batch(columnar_file, farms)
+    pd.testing.assert_frame_equal(columnar, expected, check_dtype=False)
+    assert FarmDataManager.get_farm_crops(columnar_file, "farm1") == (
+        FarmDataManager.get_farm_crops(INPUT_FILE, "farm1")
+    )
+
+
+def test_selection_and_types(columnar_file):
+    df = read_columnar_input(columnar_file, farms=[("farm1", "Soybean")])
+    assert df["common_crop_name"].tolist() == ["Soybean"]
+    assert df["start_year"].dtype == "int64"
+    assert df["area_in_m2"].dtype == "float64"
+
+
+def test_string_keys_are_required(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = pd.read_csv(INPUT_PATH, encoding="utf-8-sig")
+    df["farm_id"] = range(len(df))
+    path = tmp_path / "farms.parquet"
+    df.to_parquet(path)
+    with pytest.raises(ValueError, match="farm_id"):
+        read_columnar_input(str(path))
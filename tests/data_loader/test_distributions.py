@@ -0,0 +1,28 @@
+from statistics import NormalDist
+import numpy as np
+import pytest
+from src.data_loader.distributions import norm_ppf, ppf, default_distribution
+
+
+def test_norm_ppf_accuracy():
+    u = np.linspace(1e-6, 1 - 1e-6, 2001)
+    expected = [NormalDist().inv_cdf(p) for p in u]
+    assert np.allclose(norm_ppf(u), expected, rtol=1e-8, atol=1e-9)
+
+
+def test_norm_ppf_bounds():
+    assert np.all(np.isfinite(norm_ppf([0.0, 1.0])))
+
+
+def test_ppf_distributions():
+    u = np.array([0.0, 0.5, 1.0])
+    assert np.allclose(ppf("uniform", 10, 14, u), [10, 12, 14])
+    assert ppf("normal", 27.9, 2, [0.5])[0] == pytest.approx(27.9)
+    assert ppf("lognormal", -0.597, 0.1, [0.5])[0] == pytest.approx(np.exp(-0.597))
+
+    with pytest.raises(ValueError, match="Unsupported distribution"):
+        ppf("triangular", 0, 1, u)
+
+
+def test_default_distribution():
+    assert default_distribution(512.0) == ("uniform", 384.0, 640.0)
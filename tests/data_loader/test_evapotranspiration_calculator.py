@@ -3,7 +3,10 @@ Module to test the EvapotranspirationCalculator functionality under various cond
 """
 
 import pytest
-from src.data_loader.evapotranspiration_calculator import EvapotranspirationCalculator
+from src.data_loader.evapotranspiration_calculator import (
+    EvapotranspirationCalculator,
+    turc_evapotranspiration,
+)
 
 
 def test_calculate_positive_conditions():
@@ -41,3 +44,16 @@ def test_calculate_low_humidity():
     calculator = EvapotranspirationCalculator(25.0, 5.0, 10)
     result = calculator.calculate()
     assert result > 0, "Should calculate positive ET even for low humidity"
+
+
+def test_turc_evapotranspiration_matches_the_calculator():
+    """Verify that the array version gives the results of the calculator day by day."""
+    temperature = [25.0, 25.0, -1, -15, 0, 10.5]
+    solar_radiation = [5.0, 5.0, 5.0, 5.0, 5.0, -3.0]
+    relative_humidity = [45, 80, 45, 45, 45, 60]
+    expected = [
+        EvapotranspirationCalculator(*day).calculate()
+        for day in zip(temperature, solar_radiation, relative_humidity)
+    ]
+    result = turc_evapotranspiration(temperature, solar_radiation, relative_humidity)
+    assert result.tolist() == expected
@@ -84,3 +84,46 @@ def test_user_defined_sampling_success(crop_parameters_manager):
         assert (
             len(sampled_params["moisture"]) == 11
         ), "Should return 11 samples for moisture"
+
+
+def test_vectorized_selection_matches_conditions():
+    """
+    Test that selecting Wheat rows for several (P, PE) pairs at once picks the
+    condition row matching each moisture deficit.
+    """
+    manager = CropParametersManager(
+        {"crop": "Wheat"}, {"P": np.array([100.0]), "PE": np.array([200.0])}
+    )
+    P = np.array([400.0, 100.0, 100.0, 100.0])
+    PE = np.array([300.0, 300.0, 450.0, 500.0])
+    selected = manager.select_crop_parameters(P, PE)
+    # Deficits of -100 (<200), 200 (200-350), 350 (200-350) and 400 (>350)
+    np.testing.assert_array_equal(
+        selected["R_p"], np.array([0.219, 0.244, 0.244, 0.431])
+    )
+
+
+def test_unknown_crop_raises():
+    with pytest.raises(ValueError, match="No crop parameters found"):
+        CropParametersManager(
+            {"crop": "Not_a_crop"}, {"P": np.array([100]), "PE": np.array([120])}
+        )
+
+
+def test_sample_centers_follow_sampled_climate():
+    """
+    Test that default sampling centers each draw on the crop row matching the
+    climate of the corresponding sampled point.
+    """
+    climate_data = {
+        "P": np.array([400.0, 100.0, np.nan]),
+        "PE": np.array([300.0, 500.0, 300.0]),
+    }
+    manager = CropParametersManager({"crop": "Wheat"}, climate_data)
+    centers = manager.get_sample_centers(num_samples=2)
+    # The second point has no climate data and falls back to the farm row
+    np.testing.assert_array_equal(centers["R_p"], np.array([0.431, 0.219]))
+
+    sampled = manager.sample_crop_parameters(num_samples=2)
+    assert sampled["R_p"][0] == 0.219
+    assert 0.431 * 0.75 <= sampled["R_p"][1] <= 0.431 * 1.25
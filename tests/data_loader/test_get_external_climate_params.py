@@ -2,7 +2,9 @@ import json
 from unittest.mock import Mock
 import pytest
 from requests.exceptions import Timeout
+from src.data_loader.evapotranspiration_calculator import EvapotranspirationCalculator
 from src.data_loader.get_external_climate_params import ExternalClimateDataFetcher
+from src.data_loader.power_response import parse_power_response
 
 # Mock data for successful fetch
 MOCK_SUCCESS_RESPONSE = {
@@ -39,7 +41,8 @@ def test_fetch_data_success(mocker, fetcher):
     result = fetcher.fetch_data((-93.6250, 42.0329), 2021)
     assert result["success"] is True
     assert "data" in result
-    assert result["data"]["properties"]["parameter"]["PRECTOTCORR"]["20210501"] == 5
+    assert result["data"]["parameters"][0] == "PRECTOTCORR"
+    assert result["data"]["values"][0, 0] == 5
 
 
 def test_fetch_data_failure(mocker, fetcher):
@@ -51,14 +54,52 @@ def test_fetch_data_failure(mocker, fetcher):
 
 
 def test_calculate_totals_with_incomplete_data(fetcher):
-    # Simulate incomplete data
+    # Simulate incomplete data, two days of the growing season
     incomplete_data = {
         "success": True,
-        "data": MOCK_SUCCESS_RESPONSE,
+        "data": parse_power_response(json.dumps(MOCK_SUCCESS_RESPONSE)),
         "point": (-93.6250, 42.0329),
         "year": 2021,
     }
-    incomplete_data["data"]["properties"]["parameter"]["PRECTOTCORR"].pop("20210502")
     result = fetcher.calculate_totals(incomplete_data)
     assert result["success"] is False
     assert "error" in result
+
+
+def season_days():
+    month_days = {5: 31, 6: 30, 7: 31, 8: 31, 9: 30}
+    return [
+        (month, day)
+        for month, days in month_days.items()
+        for day in range(1, days + 1)
+    ]
+
+
+def test_calculate_totals_of_a_growing_season(fetcher):
+    days = [f"2021{month:02d}{day:02d}" for month, day in season_days()]
+    response = {
+        "header": {"start": "20210501", "end": "20210930"},
+        "properties": {
+            "parameter": {
+                "PRECTOTCORR": {date: 2.5 for date in days},
+                "T2M": {date: 15.0 for date in days},
+                "RH2M": {date: 40.0 for date in days},
+                "ALLSKY_SFC_SW_DWN": {date: 20.0 for date in days},
+            }
+        },
+    }
+    result = fetcher.calculate_totals(
+        {
+            "success": True,
+            "data": parse_power_response(json.dumps(response)),
+            "point": (-93.6250, 42.0329),
+            "year": 2021,
+        }
+    )
+    daily_evapotranspiration = EvapotranspirationCalculator(15.0, 20.0, 40.0)
+    assert result["success"] is True
+    assert result["data"]["P"] == pytest.approx(2.5 * 153)
+    assert result["data"]["PE"] == pytest.approx(
+        daily_evapotranspiration.calculate() * 153
+    )
+
@@ -1,5 +1,7 @@
+from unittest.mock import patch
 import pytest
 import numpy as np
+import pandas as pd
 from src.data_loader.get_full_params import FarmDataHub
 
 
@@ -80,3 +82,57 @@ def test_default_mode_data_integrity(farm_data_hub_default):
     assert np.array_equal(
         default_params["farm_data"]["farm_id"], expected_farm_data
     ), "Farm ID does not match expected default data"
+
+
+def test_gather_many_matches_gather_all_data(location_index):
+    test_input_file = "data/test/hypothetical_farm_data.csv"
+    many_params = FarmDataHub.gather_many(
+        test_input_file, location_index=location_index
+    )
+    assert list(many_params["farm_data"]["crop"]) == ["Soybean", "Potato", "Wheat"]
+
+    for i, crop in enumerate(many_params["farm_data"]["crop"]):
+        single_params = FarmDataHub(
+            input_file=test_input_file,
+            farm_id="farm1",
+            crop=crop,
+            location_index=location_index,
+        ).gather_all_data()
+        for param_group, group_dict in single_params.items():
+            assert list(group_dict) == list(many_params[param_group])
+            for param, value in group_dict.items():
+                assert np.array_equal(
+                    value[0], many_params[param_group][param][i]
+                ), f"{param} of {crop} does not match the single farm data"
+
+
+def test_gather_many_selected_farms(location_index):
+    many_params = FarmDataHub.gather_many(
+        "data/test/hypothetical_farm_data.csv",
+        farms=[("farm1", "Wheat"), ("farm1", "Soybean")],
+        location_index=location_index,
+    )
+    assert list(many_params["farm_data"]["crop"]) == ["Wheat", "Soybean"]
+    assert many_params["climate_data"]["locations"].shape == (2, 2)
+
+    with pytest.raises(ValueError, match="No farm data found"):
+        FarmDataHub.gather_many(
+            "data/test/hypothetical_farm_data.csv",
+            farms=[("farm1", "Kale")],
+            location_index=location_index,
+        )
+
+
+def test_gather_many_rejects_farms_outside_canada(location_index, tmp_path):
+    df = pd.read_csv("data/test/hypothetical_farm_data.csv", encoding="utf-8-sig")
+    # Seattle, south of the US-Canada boundary
+    df.loc[1, ["longitude", "latitude"]] = [-122.33, 47.61]
+    input_file = tmp_path / "farms.csv"
+    df.to_csv(input_file, index=False)
+
+    with patch(
+        "src.data_loader.get_full_params.resolve_locations",
+        side_effect=AssertionError("no spatial join expected"),
+    ):
+        with pytest.raises(ValueError, match=r"in Canada \(farms: \['farm1'\]\)"):
+            FarmDataHub.gather_many(str(input_file), location_index=location_index)
@@ -54,3 +54,20 @@ def test_user_defined_sampling_error(mod_manager):
     with patch.object(ModifiersManager, 'load_user_distributions', return_value=None):
         with pytest.raises(ValueError, match="No user-defined RF distributions found"):
             mod_manager.sample_modifiers(sampling_mode="user_define")
+
+
+def test_modifiers_batch_lookup():
+    """
+    Test that modifiers for a batch of farms resolve per farm region and tillage.
+    """
+    modifiers = ModifiersManager.get_modifiers_batch(
+        ["Alberta", "Quebec", "Ontario"],
+        tillage=["no_tillage", "no_tillage", "unknown"],
+    )
+    np.testing.assert_array_equal(modifiers["RF_Till"], np.array([0.73, 1.05, 1.0]))
+    np.testing.assert_array_equal(modifiers["RF_NS"], np.array([0.84, 0.84, 0.84]))
+
+
+def test_unknown_practice_raises(farm_data):
+    with pytest.raises(ValueError, match="Unknown tillage"):
+        ModifiersManager(farm_data, tillage="deep_ripping")
@@ -0,0 +1,97 @@
+import os
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from src.data_loader import input_index
+from src.data_loader.get_farm_data import FarmDataManager
+from src.data_loader.input_index import (
+    InputIndex,
+    get_input_index,
+    iter_input_chunks,
+)
+
+HEADER = (
+    "\ufefffarm_id,common_crop_name,yield_kg_per_m2,area_in_m2,latitude,longitude,"
+    "start_year,end_year,notes\n"
+)
+ROWS = [
+    'farm1,Soybean,0.27,100000,49.99704167,-123.2373389,2021,2021,"a, b"\n',
+    'farm1,Potato,3.1,100000,49.99704167,-123.2373389,2021,2021,"line\nbreak"\n',
+    "farm2,Soybean,0.3,50000,50.1,-120.5,2020,2021,\n",
+    "farm1,Soybean,9.9,100000,49.99704167,-123.2373389,2021,2021,duplicate\n",
+]
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    path = tmp_path / "farms.csv"
+    path.write_text(HEADER + "".join(ROWS), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path):
+    with patch.object(input_index, "INDEX_DIR", str(tmp_path / "index")):
+        input_index._get_index.cache_clear()
+        yield tmp_path / "index"
+    input_index._get_index.cache_clear()
+
+
+def test_rows_are_read_by_offset(input_file):
+    index = InputIndex.build(input_file)
+    assert index.crops("farm1") == ["Soybean", "Potato"]
+
+    rows = index.read_rows(
+        [("farm2", "Soybean"), ("farm9", "Wheat"), ("farm1", "Potato")]
+    )
+    assert rows["farm_id"].tolist() == ["farm2", "farm1"]
+    assert rows["notes"][1] == "line\nbreak"
+    # The first row of a duplicated pair is used, like a full read
+    first = index.read_rows([("farm1", "Soybean")])
+    assert first["yield_kg_per_m2"][0] == 0.27
+    assert first["notes"][0] == "a, b"
+
+
+def test_index_is_saved_and_rebuilt_when_the_file_changes(input_file, index_dir):
+    get_input_index(input_file)
+    saved = os.listdir(index_dir)
+    assert len(saved) == 1
+    loaded = InputIndex.load(input_file, os.path.join(index_dir, saved[0]))
+    assert loaded.offsets == InputIndex.build(input_file).offsets
+
+    with open(input_file, "a") as file:
+        file.write("farm3,Wheat,0.5,1000,50.0,-110.0,2021,2021,\n")
+    assert InputIndex.load(input_file, os.path.join(index_dir, saved[0])) is None
+    assert get_input_index(input_file).crops("farm3") == ["Wheat"]
+
+
+def test_large_inputs_are_read_through_the_index(input_file):
+    full = FarmDataManager.get_farm_data_batch(input_file)
+    farms = [("farm2", "Soybean"), ("farm1", "Potato")]
+    with patch.object(input_index, "INDEXED_INPUT_SIZE", 0):
+        indexed = FarmDataManager.get_farm_data_batch(input_file, farms)
+        assert FarmDataManager.get_farm_crops(input_file, "farm1") == [
+            "Soybean",
+            "Potato",
+        ]
+    expected = full.iloc[[2, 1]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(indexed.reset_index(drop=True), expected)
+
+
+def test_numeric_farm_ids_are_read_as_text_at_any_size(tmp_path):
+    path = tmp_path / "numeric.csv"
+    path.write_text(HEADER + "".join(row.replace("farm", "") for row in ROWS))
+    farms = [("2", "Soybean"), ("1", "Potato")]
+    small = FarmDataManager.get_farm_data_batch(str(path), farms)
+    with patch.object(input_index, "INDEXED_INPUT_SIZE", 0):
+        indexed = FarmDataManager.get_farm_data_batch(str(path), farms)
+    assert small["farm_id"].tolist() == ["2", "1"]
+    pd.testing.assert_frame_equal(
+        small.reset_index(drop=True), indexed.reset_index(drop=True)
+    )
+
+
+def test_chunks_stream_the_file_from_a_start_row(input_file):
+    chunks = list(iter_input_chunks(input_file, chunksize=2, start=1))
+    assert [chunk.index.tolist() for chunk in chunks] == [[1, 2], [3]]
+    assert chunks[0]["farm_id"].tolist() == ["farm1", "farm2"]
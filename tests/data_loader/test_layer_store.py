@@ -0,0 +1,95 @@
+import os
+from unittest.mock import patch
+import geopandas as gpd
+import pytest
+import shapely
+from src.data_loader import layer_store
+from src.data_loader.layer_store import read_stored_layer, source_checksum, write_layer
+from src.data_loader.reference_data import clear_reference_cache, load_reference_layer
+
+
+@pytest.fixture
+def shapefile(tmp_path):
+    folder = tmp_path / "province_test"
+    folder.mkdir()
+    layer = gpd.GeoDataFrame(
+        {
+            "PRENAME": ["British Columbia", "Alberta"],
+            "PRUID": [59, 48],
+            "AREA": [1.0, 2.0],
+        },
+        geometry=[
+            shapely.box(3_800_000, 1_900_000, 4_000_000, 2_100_000),
+            shapely.MultiPolygon(
+                [
+                    shapely.box(4_100_000, 1_900_000, 4_200_000, 2_000_000),
+                    shapely.box(4_300_000, 1_900_000, 4_400_000, 2_000_000),
+                ]
+            ),
+        ],
+        crs="EPSG:3347",
+    )
+    layer.to_file(folder / "province_test.shp")
+    return str(folder)
+
+
+@pytest.fixture
+def store_dir(tmp_path):
+    with patch.object(layer_store, "STORE_DIR", str(tmp_path / "layers")):
+        clear_reference_cache()
+        yield str(tmp_path / "layers")
+    clear_reference_cache()
+
+
+def test_stored_layer_matches_the_reprojected_shapefile(shapefile, store_dir):
+    write_layer(shapefile, ["PRENAME"])
+    stored = read_stored_layer(shapefile)
+    expected = gpd.read_file(shapefile).to_crs("EPSG:4326")
+
+    assert list(stored.columns) == ["PRENAME", "geometry"]
+    assert stored.crs == expected.crs
+    assert stored["PRENAME"].tolist() == expected["PRENAME"].tolist()
+    assert shapely.equals_exact(stored.geometry.values, expected.geometry.values).all()
+
+
+def test_stale_or_foreign_layers_are_ignored(shapefile, store_dir):
+    write_layer(shapefile, ["PRENAME"])
+    assert read_stored_layer(shapefile, crs="EPSG:3347") is None
+
+    checksum = source_checksum(shapefile)
+    layer = gpd.read_file(shapefile)
+    layer.loc[0, "PRENAME"] = "Yukon"
+    layer.to_file(f"{shapefile}/province_test.shp")
+    assert source_checksum(shapefile) != checksum
+    assert read_stored_layer(shapefile) is None
+
+
+def test_loader_prefers_the_stored_layer(shapefile, store_dir):
+    assert "PRUID" in load_reference_layer(shapefile).columns
+    write_layer(shapefile, ["PRENAME"])
+    assert list(load_reference_layer(shapefile).columns) == ["PRENAME", "geometry"]
+
+
+def test_stored_layer_is_used_without_the_shapefile(shapefile, store_dir, tmp_path):
+    write_layer(shapefile, ["PRENAME"])
+    missing = str(tmp_path / "missing" / "province_test")
+    with pytest.raises(FileNotFoundError):
+        write_layer(missing, ["PRENAME"])
+    assert read_stored_layer(missing)["PRENAME"].tolist() == [
+        "British Columbia",
+        "Alberta",
+    ]
+
+
+def test_loader_reloads_a_shapefile_overwritten_in_place(shapefile, store_dir):
+    assert load_reference_layer(shapefile)["PRENAME"][0] == "British Columbia"
+    folder_stat = os.stat(shapefile)
+    layer = gpd.read_file(shapefile)
+    layer.loc[0, "PRENAME"] = "Yukon"
+    layer.to_file(f"{shapefile}/province_test.shp")
+    # Overwriting files in place keeps the modification time of their folder, and the
+    # rewritten file is dated a second later than the first load
+    times = (folder_stat.st_atime_ns, folder_stat.st_mtime_ns)
+    os.utime(shapefile, ns=times)
+    os.utime(f"{shapefile}/province_test.dbf", ns=(times[0], times[1] + 10**9))
+    assert load_reference_layer(shapefile)["PRENAME"][0] == "Yukon"
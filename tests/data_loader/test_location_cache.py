@@ -0,0 +1,112 @@
+import os
+import sys
+import numpy as np
+import pytest
+from src.data_loader.location_cache import (
+    LocationCache,
+    clear_location_cache,
+    get_location_cache,
+    location_key,
+)
+from src.instrumentation import collect
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../src"))
+from main import calculate  # noqa: E402
+
+FARM = {
+    "longitude": -123.2373389,
+    "latitude": 49.99704167,
+    "start_year": 2021,
+    "end_year": 2021,
+}
+
+
+def test_location_key_rounds_coordinates_and_accepts_arrays():
+    key = location_key(FARM, "default")
+    assert key == ((-123.2373389, 49.9970417), 2021, 2021, "default")
+    arrays = {name: np.array([value]) for name, value in FARM.items()}
+    assert location_key(arrays, "default") == key
+    assert location_key(FARM, "external") != key
+
+
+def test_cache_is_bounded_and_copies_values():
+    cache = LocationCache(maxsize=2)
+    climate_data = {"P": np.array([512.0])}
+    cache.put("a", "climate_data", climate_data)
+    climate_data["P"][0] = 0.0
+    cached = cache.get("a", "climate_data")
+    assert cached["P"][0] == 512.0
+    cached["P"][0] = 1.0
+    assert cache.get("a", "climate_data")["P"][0] == 512.0
+    assert cache.get("a", "eco_id") is None
+
+    cache.put("b", "eco_id", 1)
+    cache.get("a", "climate_data")
+    cache.put("c", "eco_id", 2)
+    assert cache.get("b", "eco_id") is None
+    assert cache.get("a", "climate_data") is not None
+
+
+def test_invalidate_one_location_or_all():
+    cache = LocationCache()
+    cache.put(location_key(FARM, "default"), "eco_id", 950)
+    cache.put(location_key(FARM, "external"), "eco_id", 950)
+    other = {**FARM, "longitude": -100.0}
+    cache.put(location_key(other, "default"), "eco_id", 1)
+
+    cache.invalidate(FARM["longitude"], FARM["latitude"])
+    assert cache.get(location_key(FARM, "default"), "eco_id") is None
+    assert cache.get(location_key(FARM, "external"), "eco_id") is None
+    assert cache.get(location_key(other, "default"), "eco_id") == 1
+
+    cache.invalidate()
+    assert cache.get(location_key(other, "default"), "eco_id") is None
+
+
+def test_second_crop_reuses_location_results(location_index):
+    input_file = "data/test/hypothetical_farm_data.csv"
+    clear_location_cache()
+    first = calculate(input_file, "farm1", "Potato", location_index=location_index)
+    with collect() as metrics:
+        second = calculate(input_file, "farm1", "Soybean", location_index=location_index)
+
+    stages = metrics.as_dict()["stages"]
+    assert "calculate/gather_all_data/climate_soil_data" not in stages
+    assert "calculate/emission_factors" not in stages
+    assert metrics.as_dict()["caches"]["location"]["hits"] == 2
+    assert second["Emission Factors"] == first["Emission Factors"]
+    assert second["Total Direct Nitrogen Emission"]["co2_crop_direct"][
+        0
+    ] == pytest.approx(1903.4719011248944)
+
+    clear_location_cache()
+    uncached = calculate(input_file, "farm1", "Soybean", location_index=location_index)
+    assert uncached["Input Parameters"]["climate_data"].keys() == (
+        second["Input Parameters"]["climate_data"].keys()
+    )
+    for key, value in uncached["Input Parameters"]["climate_data"].items():
+        np.testing.assert_array_equal(
+            value, second["Input Parameters"]["climate_data"][key]
+        )
+
+
+def test_failed_climate_fetch_is_not_cached(location_index, power_outage):
+    input_file = "data/test/hypothetical_farm_data.csv"
+    failed = calculate(
+        input_file, "farm1", "Soybean", source="external", location_index=location_index
+    )
+    assert np.isnan(failed["Input Parameters"]["climate_data"]["P"]).all()
+    key = location_key(FARM, "external")
+    assert get_location_cache().get(key, "climate_soil") is None
+    assert get_location_cache().get(key, "emission_factors") is None
+
+    # The next calculation fetches again once the API recovered
+    power_outage.side_effect = lambda fetcher, by_year=False: {
+        point: {"P": 433.46, "PE": 407.51, "success": True} for point in fetcher.points
+    }
+    recovered = calculate(
+        input_file, "farm1", "Soybean", source="external", location_index=location_index
+    )
+    assert recovered["Input Parameters"]["climate_data"]["P"].tolist() == [433.46]
+    assert get_location_cache().get(key, "climate_soil") is not None
+    assert get_location_cache().get(key, "emission_factors") is not None
@@ -0,0 +1,71 @@
+import subprocess
+import sys
+from pathlib import Path
+import numpy as np
+from src.data_loader.location_index import LocationIndex
+from src.data_loader.get_full_params import FarmDataHub
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+
+def test_lookup(location_index):
+    assert location_index.lookup(-123.2373389, 49.99704167) == {
+        "province": "British Columbia",
+        "eco_id": 950,
+    }
+    assert location_index.lookup(-100.0, 50.0) is None
+
+
+def test_save_and_load(location_index, tmp_path):
+    index_path = tmp_path / "location_index.csv"
+    location_index.save(index_path)
+    loaded = LocationIndex.load(index_path)
+    assert loaded.locations == location_index.locations
+    assert LocationIndex.load(tmp_path / "missing.csv").locations == {}
+
+
+def test_default_farmer_run_uses_index(location_index):
+    """
+    Test that an indexed farm gets the same default climate data as the shapefile
+    lookup, i.e. ecodistrict 950 in British Columbia.
+    """
+    farm_params = FarmDataHub(
+        input_file="data/test/hypothetical_farm_data.csv",
+        farm_id="farm1",
+        crop="Soybean",
+        location_index=location_index,
+    ).gather_all_data()
+    assert farm_params["farm_data"]["eco_id"][0] == 950
+    assert farm_params["farm_data"]["province"][0] == "British Columbia"
+    np.testing.assert_array_equal(farm_params["climate_data"]["P"], [512.0])
+    np.testing.assert_array_equal(farm_params["climate_data"]["PE"], [483.0])
+
+
+def test_indexed_run_skips_geospatial_imports(location_index, tmp_path):
+    index_path = tmp_path / "location_index.csv"
+    location_index.save(index_path)
+    code = (
+        "import sys\n"
+        "from src.data_loader.location_index import LocationIndex\n"
+        "from src.data_loader.get_full_params import FarmDataHub\n"
+        f"index = LocationIndex.load({str(index_path)!r})\n"
+        "FarmDataHub('data/test/hypothetical_farm_data.csv', 'farm1', 'Soybean',"
+        " location_index=index).gather_all_data()\n"
+        "print(','.join(m for m in ('geopandas', 'shapely', 'rasterio', 'requests')"
+        " if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "", f"Imported: {result.stdout.strip()}"
+
+
+def test_lookup_many(location_index):
+    found = location_index.lookup_many([-123.2373389, 10.0], [49.99704167, 10.0])
+    assert found["province"].tolist() == ["British Columbia", None]
+    assert found["eco_id"].iloc[0] == 950
+    assert np.isnan(found["eco_id"].iloc[1])
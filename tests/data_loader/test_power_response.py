@@ -0,0 +1,54 @@
+import json
+from unittest.mock import patch
+import numpy as np
+import pytest
+from src.data_loader import power_response
+from src.data_loader.power_response import parse_power_response
+
+RESPONSE = {
+    "header": {"start": "20210501", "end": "20210503"},
+    "properties": {
+        "parameter": {
+            "PRECTOTCORR": {"20210501": 5.0, "20210502": 0.0, "20210503": 1.25},
+            "T2M": {"20210501": 20.0, "20210502": 21.5, "20210503": -1.0},
+            "RH2M": {"20210501": 50.0, "20210502": 55.0, "20210503": 80},
+            "ALLSKY_SFC_SW_DWN": {"20210501": 20, "20210502": 21, "20210503": 3.5},
+        }
+    },
+}
+
+
+def test_parameters_are_aligned_by_day():
+    parsed = parse_power_response(json.dumps(RESPONSE).encode())
+    assert (parsed["start"], parsed["end"]) == ("20210501", "20210503")
+    assert parsed["parameters"] == ["PRECTOTCORR", "T2M", "RH2M", "ALLSKY_SFC_SW_DWN"]
+    np.testing.assert_array_equal(
+        parsed["values"],
+        [[5.0, 20.0, 50.0, 20.0], [0.0, 21.5, 55.0, 21.0], [1.25, -1.0, 80.0, 3.5]],
+    )
+
+
+def test_standard_json_decoder_gives_the_same_arrays():
+    expected = parse_power_response(json.dumps(RESPONSE))
+    with patch.object(power_response, "orjson", None):
+        parsed = parse_power_response(json.dumps(RESPONSE))
+    np.testing.assert_array_equal(parsed["values"], expected["values"])
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"<html>Service unavailable</html>",
+        json.dumps({"header": RESPONSE["header"], "messages": []}),
+    ],
+)
+def test_unexpected_responses_are_rejected(content):
+    with pytest.raises(ValueError):
+        parse_power_response(content)
+
+
+def test_misaligned_parameters_are_rejected():
+    response = json.loads(json.dumps(RESPONSE))
+    response["properties"]["parameter"]["RH2M"].pop("20210502")
+    with pytest.raises(ValueError, match="RH2M"):
+        parse_power_response(json.dumps(response))
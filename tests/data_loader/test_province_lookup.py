@@ -0,0 +1,105 @@
+import glob
+import os
+from unittest.mock import patch
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from src.data_loader import province_lookup
+from src.data_loader.province_lookup import (
+    BOUNDARY_TOLERANCE,
+    boundary_deviations,
+    lookup_provinces,
+)
+from src.data_loader.reference_data import clear_reference_cache
+from src.instrumentation import collect
+
+
+@pytest.fixture
+def province_layers(tmp_path):
+    # The detailed boundary zigzags around the straight simplified one at x = -100
+    y = np.linspace(50, 60, 201)
+    x = np.where(np.arange(y.size) % 2, -99.995, -100.005)
+    boundary = list(zip(x, y))
+    west = shapely.Polygon([(-105, 60), (-105, 50)] + boundary)
+    east = shapely.Polygon([(-95, 60), (-95, 50)] + boundary)
+    paths = {}
+    for name, polygons in [
+        ("fine", [west, east]),
+        ("coarse", [shapely.box(-105, 50, -100, 60), shapely.box(-100, 50, -95, 60)]),
+    ]:
+        path = tmp_path / name
+        path.mkdir()
+        gpd.GeoDataFrame(
+            {"PRENAME": ["West", "East"]}, geometry=polygons, crs="EPSG:4326"
+        ).to_file(path / f"{name}.shp")
+        paths[name] = str(path)
+
+    clear_reference_cache()
+    with patch.object(province_lookup, "COARSE_PROVINCES", paths["coarse"]):
+        with patch.object(province_lookup, "FINE_PROVINCES", paths["fine"]):
+            yield paths
+    clear_reference_cache()
+
+
+def test_results_match_the_detailed_layer(province_layers):
+    rng = np.random.default_rng(0)
+    # Points anywhere, and points near the boundary
+    longitudes = np.concatenate(
+        [rng.uniform(-106, -94, 500), rng.uniform(-100.01, -99.99, 50)]
+    )
+    latitudes = rng.uniform(49.5, 60.5, longitudes.size)
+
+    with collect() as metrics:
+        provinces = lookup_provinces(longitudes, latitudes)
+
+    fine = gpd.read_file(province_layers["fine"])
+    points = gpd.GeoDataFrame(
+        geometry=gpd.points_from_xy(longitudes, latitudes), crs="EPSG:4326"
+    )
+    expected = gpd.sjoin(points, fine, how="left", predicate="within")["PRENAME"]
+    assert provinces.tolist() == [None if pd.isna(p) else p for p in expected]
+    counters = metrics.as_dict()["counters"]
+    assert counters["province_lookups.coarse"] + counters[
+        "province_lookups.fine"
+    ] == len(longitudes)
+    assert counters["province_lookups.coarse"] > counters["province_lookups.fine"]
+
+
+def test_points_outside_every_province(province_layers):
+    assert lookup_provinces([-90.0, -101.0], [55.0, 55.0]).tolist() == [None, "West"]
+
+
+def test_points_outside_canada_are_not_joined(province_layers):
+    with collect() as metrics:
+        provinces = lookup_provinces([-101.0, -101.0, 10.0], [55.0, 45.0, 55.0])
+    assert provinces.tolist() == ["West", None, None]
+    counters = metrics.as_dict()["counters"]
+    assert counters["canada_prefilter.rejected"] == 2
+    assert counters["province_lookups.coarse"] == 1
+    assert "province_lookups.fine" not in counters
+
+
+def test_boundary_deviations(province_layers):
+    assert boundary_deviations() == {
+        "East": pytest.approx(0.005),
+        "West": pytest.approx(0.005),
+    }
+
+
+@pytest.mark.skipif(
+    not all(
+        glob.glob(os.path.join(path, "*.shp"))
+        for path in [province_lookup.COARSE_PROVINCES, province_lookup.FINE_PROVINCES]
+    ),
+    reason="The province shapefiles are not available",
+)
+def test_simplified_provinces_are_within_the_boundary_tolerance():
+    deviations = boundary_deviations()
+    assert len(deviations) == 13
+    assert {
+        name: distance
+        for name, distance in deviations.items()
+        if distance >= BOUNDARY_TOLERANCE
+    } == {}
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from shapely.geometry import Polygon
+from src.data_loader.generate_random_points import generate_random_points
+from src.data_loader.get_modifiers import ModifiersManager
+from src.data_loader.random_streams import farm_generators, stable_key
+from src.data_loader.samplers import Sampler
+
+FARMS = [("farm1", "Soybean"), ("farm1", "Wheat"), ("farm2", "Soybean")]
+
+
+def sample_farm(farm, seed=7, chunk=0):
+    """Draws the modifier samples of a farm from its own streams."""
+    rngs = farm_generators(seed, *farm, chunk)
+    sampler = Sampler("lhs", seed=rngs["design"])
+    sampled = ModifiersManager({"province": "Alberta"}).sample_modifiers(
+        num_samples=32, sampler=sampler
+    )
+    return np.concatenate(list(sampled.values()))
+
+
+def test_stable_key():
+    """Keys of strings do not depend on the process's hash salt."""
+    assert stable_key("farm1") == stable_key("farm1")
+    assert stable_key("farm1") != stable_key("farm2")
+    # IDs read as numbers or as text get the same stream
+    assert stable_key(1) == stable_key("1")
+    numeric = farm_generators(7, 1, "Soybean")["design"].random(4)
+    text = farm_generators(7, "1", "Soybean")["design"].random(4)
+    assert np.array_equal(numeric, text)
+
+
+def test_streams_are_reproducible_and_independent():
+    """Every farm, crop, chunk and stream gets a distinct reproducible stream."""
+    first = farm_generators(7, "farm1", "Soybean")
+    second = farm_generators(7, "farm1", "Soybean")
+    values = {name: rng.random(4) for name, rng in first.items()}
+    for name, rng in second.items():
+        assert np.array_equal(rng.random(4), values[name])
+    assert not np.array_equal(values["design"], values["points"])
+
+    assert not np.array_equal(sample_farm(FARMS[0]), sample_farm(FARMS[1]))
+    assert not np.array_equal(sample_farm(FARMS[0]), sample_farm(FARMS[0], chunk=1))
+    assert not np.array_equal(sample_farm(FARMS[0]), sample_farm(FARMS[0], seed=8))
+
+
+def test_parallel_matches_serial():
+    """Splitting farms across processes gives bit-identical samples."""
+    serial = [sample_farm(farm) for farm in FARMS]
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        parallel = list(executor.map(sample_farm, reversed(FARMS)))[::-1]
+    for expected, result in zip(serial, parallel):
+        assert np.array_equal(expected, result)
+
+
+def test_random_points_use_the_stream():
+    """Random points are reproducible from the farm's 'points' stream."""
+    polygon = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+    points = [
+        generate_random_points(polygon, 5, rng=farm_generators(1, "f", "c")["points"])
+        for _ in range(2)
+    ]
+    assert [p.coords[0] for p in points[0]] == [p.coords[0] for p in points[1]]
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from src.data_loader.get_modifiers import ModifiersManager
+from src.data_loader.samplers import SOBOL_MAX_DIMS, Sampler, sobol_sequence
+
+
+@pytest.mark.parametrize("method", ["mc", "lhs", "sobol"])
+def test_draw_shape_and_range(method):
+    """Every method returns uniform values in (0, 1) and advances the columns."""
+    sampler = Sampler(method, seed=0)
+    points = sampler.draw(64, 3)
+    assert points.shape == (64, 3)
+    assert np.all((points > 0) & (points < 1))
+    sampler.draw(64)
+    assert sampler.num_dims == 4
+
+
+@pytest.mark.parametrize("method", ["lhs", "sobol"])
+def test_one_point_per_stratum(method):
+    """Latin hypercube and Sobol designs of 2^k points put one value in each stratum."""
+    points = Sampler(method, seed=1).draw(256, 4)
+    for j in range(4):
+        strata = np.floor(points[:, j] * 256)
+        assert np.array_equal(np.sort(strata), np.arange(256))
+
+
+def test_sobol_dimensions_are_balanced():
+    """Each pair of Sobol dimensions fills the quadrants of the unit square evenly."""
+    points = sobol_sequence(1024, 0, 10, np.random.default_rng(2))
+    for i in range(10):
+        for j in range(i + 1, 10):
+            quadrants = (points[:, i] > 0.5) * 2 + (points[:, j] > 0.5)
+            assert np.array_equal(np.bincount(quadrants), [256] * 4)
+
+    with pytest.raises(ValueError, match="at most"):
+        sobol_sequence(8, SOBOL_MAX_DIMS - 1, 2, np.random.default_rng(2))
+
+
+def test_sample_distribution():
+    """Columns are mapped through the distribution, with one center per sample."""
+    centers = np.array([1.0, 2.0, 3.0, 4.0])
+    sampler = Sampler("lhs", seed=3)
+    samples = sampler.sample(4, "uniform", centers * 0.75, centers * 1.25)
+    assert np.all((samples >= centers * 0.75) & (samples <= centers * 1.25))
+
+    normal = Sampler("sobol", seed=3).sample(4096, "normal", 10, 2)
+    assert normal.mean() == pytest.approx(10, abs=0.01)
+    assert normal.std() == pytest.approx(2, abs=0.01)
+
+    with pytest.raises(ValueError, match="Invalid sampling method"):
+        Sampler("grid")
+
+
+def test_shared_sampler_in_managers():
+    """Managers sharing one sampler take distinct columns of the design."""
+    sampler = Sampler("sobol", seed=4)
+    sampled = ModifiersManager({"province": "Alberta"}).sample_modifiers(
+        num_samples=16, sampler=sampler
+    )
+    assert sampler.num_dims == 4
+    assert sampled["RF_NS"][0] == 0.84
+    assert np.all(np.abs(sampled["RF_NS"][1:] / 0.84 - 1) <= 0.25)
+    assert not np.allclose(sampled["RF_AM"][1:], sampled["RF_CS"][1:])
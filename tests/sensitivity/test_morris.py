@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from src.data_loader.get_full_params import FarmDataHub
+from src.sensitivity.morris import MorrisAnalysis, screen, screen_farms
+from src.sensitivity.problem import select_farm
+
+
+class QuadraticProblem:
+    """Model y = sum(a_i * x_i) + x_0 ** 2 with uniform inputs on [0, 1]."""
+
+    def __init__(self, coefficients):
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.names = [f"x{i}" for i in range(len(coefficients))]
+        self.groups = ["test"] * len(coefficients)
+        self.distributions = [("uniform", 0, 1)] * len(coefficients)
+        self.num_vars = len(coefficients)
+
+    def scale(self, U):
+        return U
+
+    def evaluate(self, X, output="y"):
+        return X @ self.coefficients + X[:, 0] ** 2
+
+
+def test_trajectories():
+    analysis = MorrisAnalysis(QuadraticProblem([1, 2, 3]), num_trajectories=50, seed=0)
+    U = analysis.sample()
+
+    assert U.shape == (50, 4, 3)
+    assert U.min() >= 0 and U.max() <= 1
+    step = np.abs(np.diff(U, axis=1))
+    # Every step moves exactly one input by the jump, and every input moves once
+    assert np.all(np.count_nonzero(step > 1e-12, axis=2) == 1)
+    assert np.allclose(step.sum(axis=1), analysis.delta)
+
+
+def test_elementary_effects():
+    result = MorrisAnalysis(QuadraticProblem([1, -3, 0]), seed=0).run()
+    indices = result["indices"]
+
+    assert result["num_evaluations"] == 100 * 4
+    # Linear inputs have constant elementary effects
+    assert indices["x1"]["mu"] == pytest.approx(-3)
+    assert indices["x1"]["mu_star"] == pytest.approx(3)
+    assert indices["x1"]["sigma"] == pytest.approx(0, abs=1e-9)
+    assert indices["x2"]["mu_star"] == pytest.approx(0, abs=1e-9)
+    # The squared input has varying effects
+    assert indices["x0"]["sigma"] > 0
+    assert screen(result) == ["x1", "x0"]
+
+
+def test_screen_farms(location_index):
+    data = FarmDataHub.gather_many(
+        "data/test/hypothetical_farm_data.csv", location_index=location_index
+    )
+    results = screen_farms(data, num_trajectories=20, seed=1)
+
+    assert [(r["farm_id"], r["crop"]) for r in results] == [
+        ("farm1", "Soybean"),
+        ("farm1", "Potato"),
+        ("farm1", "Wheat"),
+    ]
+    for result in results:
+        assert result["num_evaluations"] == 20 * 22
+        # FR_Topo is 0 for this farm, which also removes the influence of PE
+        assert result["indices"]["PE"]["mu_star"] == 0
+        assert result["indices"]["FR_Topo"]["mu_star"] == 0
+        assert "P" in result["influential"]
+        assert "PE" not in result["influential"]
+
+    # Each farm draws from its own stream, so it can be screened on its own
+    alone = screen_farms(select_farm(data, 1), num_trajectories=20, seed=1)
+    assert alone[0]["indices"] == results[1]["indices"]
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from src.data_loader.get_full_params import FarmDataHub
+from src.sensitivity.problem import SensitivityProblem
+from src.sensitivity.sobol import SobolAnalysis
+
+
+class LinearProblem:
+    """Additive model y = sum(a_i * x_i) with uniform inputs on [0, 1]."""
+
+    def __init__(self, coefficients):
+        self.coefficients = np.asarray(coefficients, dtype=float)
+        self.names = [f"x{i}" for i in range(len(coefficients))]
+        self.groups = ["test"] * len(coefficients)
+        self.num_vars = len(coefficients)
+
+    def scale(self, U):
+        return U
+
+    def evaluate(self, X, output="y"):
+        return X @ self.coefficients
+
+
+@pytest.fixture
+def farm_params(location_index):
+    return FarmDataHub(
+        input_file="data/test/hypothetical_farm_data.csv",
+        farm_id="farm1",
+        crop="Soybean",
+        location_index=location_index,
+    ).gather_all_data()
+
+
+def test_linear_model_indices():
+    coefficients = [1.0, 2.0, 3.0]
+    result = SobolAnalysis(LinearProblem(coefficients), num_samples=50000, seed=0).run()
+    expected = np.square(coefficients) / np.sum(np.square(coefficients))
+
+    for name, value in zip(["x0", "x1", "x2"], expected):
+        indices = result["indices"][name]
+        # Additive model: first-order and total-order indices coincide
+        assert indices["S1"] == pytest.approx(value, abs=0.02)
+        assert indices["ST"] == pytest.approx(value, abs=0.02)
+        assert indices["ST_conf"][0] <= indices["ST"] <= indices["ST_conf"][1]
+    assert result["num_evaluations"] == 50000 * 5
+
+
+def test_problem_midpoint_matches_farmer_mode(farm_params):
+    problem = SensitivityProblem.from_farm_data(farm_params)
+    assert problem.num_vars == 21
+    X = problem.scale(np.full((2, problem.num_vars), 0.5))
+    # The default distributions are centered on the farm's values
+    assert np.allclose(problem.evaluate(X), 1903.4719011248944, rtol=1e-12)
+
+
+def test_user_defined_distributions(farm_params):
+    problem = SensitivityProblem.from_farm_data(
+        farm_params, sampl_modifier="user_define"
+    )
+    assert problem.distributions[problem.names.index("RF_NS")] == ("normal", 0.84, 0.02)
+
+    with pytest.raises(ValueError, match="Invalid sampling mode"):
+        SensitivityProblem.from_farm_data(farm_params, sampl_crop="latin")
+
+
+def test_farm_analysis(farm_params):
+    problem = SensitivityProblem.from_farm_data(farm_params)
+    result = SobolAnalysis(problem, num_samples=2000, num_resamples=20, seed=1).run()
+
+    assert list(result["indices"]) == problem.names
+    assert result["num_evaluations"] == 2000 * 23
+    # FR_Topo is 0 for this farm, which also removes the influence of PE
+    assert result["indices"]["PE"]["ST"] == 0
+    assert result["indices"]["FR_Topo"]["ST"] == 0
+    most_influential = max(result["indices"], key=lambda k: result["indices"][k]["ST"])
+    assert most_influential == "P"
@@ -0,0 +1,162 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pytest
+from src.data_loader.get_external_climate_params import (
+    ExternalClimateDataFetcher,
+    clear_power_cache,
+)
+from src.data_loader.get_external_soil_params import ExternalSoilTextureDataFetcher
+from src.data_loader.get_farm_data import FarmDataManager
+from src.data_loader.location_cache import clear_location_cache
+from src.instrumentation import collect
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+import main  # noqa: E402
+
+INPUT_FILE = "data/test/hypothetical_farm_data.csv"
+
+
+def test_farm_crops_follow_the_input_file():
+    crops = FarmDataManager.get_farm_crops(INPUT_FILE, "farm1")
+    assert crops[:2] == ["Soybean", "Potato"]
+    with pytest.raises(ValueError):
+        FarmDataManager.get_farm_crops(INPUT_FILE, "farm_missing")
+
+
+def test_farm_run_matches_single_crop_runs(location_index):
+    crops = FarmDataManager.get_farm_crops(INPUT_FILE, "farm1")
+    with collect() as metrics:
+        output = main.calculate_farm(INPUT_FILE, "farm1", location_index=location_index)
+
+    assert output["farm_id"] == "farm1"
+    assert list(output["Crops"]) == crops
+    # The location and the calculations are shared by all crops
+    assert "calculate" not in metrics.as_dict()["stages"]
+
+    clear_location_cache()
+    for crop in crops:
+        single = main.calculate(
+            INPUT_FILE, "farm1", crop, location_index=location_index
+        )
+        farm_crop = output["Crops"][crop]
+        for section in [
+            "Crop Nitrogen Residue",
+            "Emission Factors",
+            "Total Direct Nitrogen Emission",
+        ]:
+            for key, value in single[section].items():
+                np.testing.assert_allclose(farm_crop[section][key], value)
+        assert farm_crop["Input Parameters"]["farm_data"]["crop"].tolist() == [crop]
+
+    soybean = output["Crops"]["Soybean"]["Total Direct Nitrogen Emission"]
+    assert soybean["co2_crop_direct"][0] == pytest.approx(1903.4719011248944)
+
+
+def test_main_writes_all_crops_without_a_crop(location_index, tmp_path):
+    output_file = str(tmp_path / "farm1.json")
+    farm_run = main.calculate_farm
+
+    def calculate_farm(input_file, farm_id, **kwargs):
+        return farm_run(input_file, farm_id, location_index=location_index, **kwargs)
+
+    with patch.object(main, "calculate_farm", side_effect=calculate_farm):
+        main.main(INPUT_FILE, "farm1", None, output_file=output_file)
+    with open(output_file) as f:
+        output = json.load(f)
+    assert "Potato" in output["Crops"]
+
+    with pytest.raises(ValueError):
+        main.main(INPUT_FILE, "farm1", None, operation_mode="scientific")
+
+
+@pytest.fixture
+def external_data():
+    # Growing-season totals of each year as if fetched before, and a fixed soil
+    # texture, so that the external source needs no network or raster
+    point = (-123.2373389, 49.99704167)
+    totals = {2018: (300.0, 450.0), 2019: (520.0, 400.0), 2020: (410.0, 410.0)}
+    totals[2021] = (433.46, 407.51)
+    results = [
+        {"success": True, "data": {"P": P, "PE": PE}, "point": point, "year": year}
+        for year, (P, PE) in totals.items()
+    ]
+    ExternalClimateDataFetcher([point], 2018, 2021).cache_totals(results)
+    with patch.object(
+        ExternalSoilTextureDataFetcher,
+        "get_soil_texture_values",
+        autospec=True,
+        side_effect=lambda fetcher, midpoints_only=False: {
+            point: 0.8 for point in fetcher.points
+        },
+    ):
+        yield totals
+    clear_power_cache()
+    clear_location_cache()
+
+
+def write_input(path, years):
+    df = pd.read_csv(INPUT_FILE, encoding="utf-8-sig")
+    for crop, (start_year, end_year) in years.items():
+        df.loc[df["common_crop_name"] == crop, ["start_year", "end_year"]] = [
+            start_year,
+            end_year,
+        ]
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_time_series_matches_single_year_runs(location_index, external_data, tmp_path):
+    input_file = write_input(
+        tmp_path / "farms.csv",
+        {"Soybean": (2018, 2021), "Potato": (2020, 2021), "Wheat": (2021, 2021)},
+    )
+    output = main.calculate_farm(
+        input_file,
+        "farm1",
+        source="external",
+        location_index=location_index,
+        by_year=True,
+    )
+    assert output["Crops"]["Soybean"]["Time Series"]["years"].tolist() == [
+        2018,
+        2019,
+        2020,
+        2021,
+    ]
+    assert output["Crops"]["Potato"]["Time Series"]["years"].tolist() == [2020, 2021]
+
+    # The averaged summary is unchanged by the time series
+    averaged = main.calculate_farm(
+        input_file, "farm1", source="external", location_index=location_index
+    )
+    np.testing.assert_allclose(
+        output["Crops"]["Soybean"]["Emission Factors"]["EF"],
+        averaged["Crops"]["Soybean"]["Emission Factors"]["EF"],
+    )
+
+    for year in external_data:
+        single_year = main.calculate_farm(
+            write_input(tmp_path / f"{year}.csv", {"Soybean": (year, year)}),
+            "farm1",
+            crops=["Soybean"],
+            source="external",
+            location_index=location_index,
+        )["Crops"]["Soybean"]
+        time_series = output["Crops"]["Soybean"]["Time Series"]
+        column = year - 2018
+        for section in ["Emission Factors", "Total Direct Nitrogen Emission"]:
+            for key, value in single_year[section].items():
+                assert time_series[section][key][column] == pytest.approx(value[0])
+
+
+def test_time_series_requires_the_external_source(location_index):
+    with pytest.raises(ValueError, match="external"):
+        main.calculate_farm(
+            INPUT_FILE, "farm1", location_index=location_index, by_year=True
+        )
+    with pytest.raises(ValueError, match="external"):
+        main.main(INPUT_FILE, "farm1", "Soybean", by_year=True)
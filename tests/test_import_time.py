@@ -0,0 +1,70 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# Generous enough for slow CI machines; a regression to eager geospatial imports
+# shows up as heavy modules being loaded rather than as a timing failure.
+IMPORT_TIME_BUDGET = 1.0
+
+HEAVY_MODULES = ("geopandas", "shapely", "rasterio", "requests", "multiprocessing")
+
+
+def run_timed(statements):
+    """
+    Runs `statements` in a fresh interpreter after importing main, and returns the
+    seconds they took together with the heavy modules they loaded.
+    """
+    code = (
+        "import sys, time\n"
+        "sys.path.insert(0, 'src')\n"
+        "start = time.perf_counter()\n"
+        "import main\n"
+        f"{statements}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = result.stdout.splitlines()[-2:] + [""]
+    return float(lines[0]), lines[1]
+
+
+def test_main_import_time_budget():
+    """
+    Test that importing the command line entry point stays within the import time
+    budget and defers the geospatial and networking dependencies.
+    """
+    elapsed, loaded = run_timed("")
+    assert loaded == "", f"main imported heavy modules: {loaded}"
+    assert (
+        elapsed < IMPORT_TIME_BUDGET
+    ), f"Importing main took {elapsed:.2f}s (budget {IMPORT_TIME_BUDGET}s)"
+
+
+def test_indexed_farmer_calculation_time_budget(tmp_path, location_index):
+    """
+    Test that a farmer's mode calculation with the default data of an indexed location
+    stays within the budget without loading the geospatial dependencies.
+    """
+    index_path = tmp_path / "location_index.csv"
+    location_index.save(str(index_path))
+    elapsed, loaded = run_timed(
+        "from src.data_loader.location_index import get_location_index\n"
+        "main.calculate(\n"
+        "    'data/test/hypothetical_farm_data.csv',\n"
+        "    'farm1',\n"
+        "    'Soybean',\n"
+        f"    location_index=get_location_index({str(index_path)!r}),\n"
+        ")"
+    )
+    assert loaded == "", f"The calculation imported heavy modules: {loaded}"
+    assert (
+        elapsed < IMPORT_TIME_BUDGET
+    ), f"The calculation took {elapsed:.2f}s (budget {IMPORT_TIME_BUDGET}s)"
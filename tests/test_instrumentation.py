@@ -0,0 +1,122 @@
+import os
+import sys
+import numpy as np
+from src.data_loader.location_cache import clear_location_cache
+from src.instrumentation import (
+    Metrics,
+    aggregate_memory_reports,
+    collect,
+    count,
+    stage,
+    timed,
+)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+from main import calculate  # noqa: E402
+
+
+@timed("square")
+def square(x):
+    return x * x
+
+
+def test_disabled_instrumentation_records_nothing():
+    with stage("load"):
+        count("bytes_read", 100)
+    assert square(3) == 9
+
+    with collect() as metrics:
+        pass
+    assert metrics.as_dict()["stages"] == {}
+    assert metrics.as_dict()["counters"] == {}
+
+
+def test_stages_nest_and_count_calls():
+    with collect() as metrics:
+        with stage("outer"):
+            for x in range(3):
+                square(x)
+        square(4)
+        count("bytes_read", 10)
+        count("bytes_read", 5)
+
+    stages = metrics.as_dict()["stages"]
+    assert stages["outer"]["calls"] == 1
+    assert stages["outer/square"]["calls"] == 3
+    assert stages["square"]["calls"] == 1
+    assert stages["outer"]["seconds"] >= stages["outer/square"]["seconds"]
+    assert metrics.as_dict()["counters"] == {"bytes_read": 15}
+
+
+def test_cache_hits_are_derived_from_lookups_and_misses():
+    metrics = Metrics()
+    metrics.count("cache_lookups.power", 10)
+    metrics.count("cache_misses.power", 4)
+    assert metrics.as_dict()["caches"] == {
+        "power": {"lookups": 10, "hits": 6, "misses": 4}
+    }
+
+
+def test_memory_peaks_are_attributed_to_stages():
+    with collect(memory=True) as metrics:
+        with stage("outer"):
+            with stage("allocate"):
+                # A temporary 8 MB array, released before the stage ends
+                np.ones(1_000_000).sum()
+            with stage("keep"):
+                kept = np.ones(100_000)
+
+    stages = metrics.memory_report()["stages"]
+    assert stages["outer/allocate"]["peak_bytes"] >= 8_000_000
+    assert stages["outer/allocate"]["allocated_bytes"] < 100_000
+    assert stages["outer/keep"]["peak_bytes"] < 1_000_000
+    assert stages["outer/keep"]["allocated_bytes"] >= kept.nbytes
+    assert stages["outer"]["peak_bytes"] >= 8_000_000
+    assert "seconds" not in stages["outer"]
+    assert metrics.top_allocations
+
+
+def test_memory_reports_are_aggregated_across_tasks():
+    reports = {
+        "farm1_Soybean": {
+            "peak_rss": 200,
+            "stages": {"calculate": {"calls": 1, "peak_bytes": 10}},
+        },
+        "farm2_Potato": {
+            "peak_rss": 300,
+            "stages": {"calculate": {"calls": 1, "peak_bytes": 30}},
+        },
+    }
+    summary = aggregate_memory_reports(reports)
+    assert summary["peak_rss"] == 300
+    assert summary["peak_rss_task"] == "farm2_Potato"
+    assert summary["stages"]["calculate"] == {
+        "tasks": 2,
+        "max_peak_bytes": 30,
+        "mean_peak_bytes": 20,
+        "max_peak_task": "farm2_Potato",
+    }
+
+
+def test_farmer_calculation_metrics(location_index):
+    clear_location_cache()
+    with collect() as metrics:
+        calculate(
+            "data/test/hypothetical_farm_data.csv",
+            "farm1",
+            "Soybean",
+            location_index=location_index,
+        )
+
+    result = metrics.as_dict()
+    assert set(result["stages"]) >= {
+        "calculate",
+        "calculate/gather_all_data",
+        "calculate/gather_all_data/farm_data",
+        "calculate/gather_all_data/climate_soil_data",
+        "calculate/gather_all_data/climate_soil_data/default_climate_soil",
+        "calculate/crop_residue",
+        "calculate/emission_factors",
+        "calculate/emissions",
+    }
+    assert result["caches"]["reference_table"]["lookups"] > 0
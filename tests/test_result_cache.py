@@ -0,0 +1,198 @@
+import json
+import os
+import sys
+from unittest.mock import patch
+import numpy as np
+import pytest
+from src import result_cache
+from src.instrumentation import collect
+from src.result_cache import (
+    ResultStore,
+    is_cacheable,
+    is_complete,
+    reference_data_version,
+    task_key,
+)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../src"))
+import main  # noqa: E402
+
+INPUT_FILE = "data/test/hypothetical_farm_data.csv"
+OPTIONS = {"operation_mode": "farmer", "source": "default", "seed": None}
+
+
+def write_input(path, yield_kg_per_m2):
+    path.write_text(
+        "farm_id,common_crop_name,yield_kg_per_m2,area_in_m2,latitude,longitude,"
+        "start_year,end_year\n"
+        f"farm1,Soybean,{yield_kg_per_m2},100000,49.99704167,-123.2373389,2021,2021\n"
+    )
+    return str(path)
+
+
+def test_task_key_depends_on_the_normalized_row_and_options(tmp_path):
+    key = task_key(INPUT_FILE, "farm1", "Soybean", OPTIONS)
+    # The same row in another file, with another number format, has the same key
+    same_row = write_input(tmp_path / "farms.csv", "0.270")
+    assert task_key(same_row, "farm1", "Soybean", OPTIONS) == key
+
+    changed_row = write_input(tmp_path / "changed.csv", "0.28")
+    assert task_key(changed_row, "farm1", "Soybean", OPTIONS) != key
+    assert task_key(INPUT_FILE, "farm1", "Potato", OPTIONS) != key
+    assert task_key(INPUT_FILE, "farm1", "Soybean", {**OPTIONS, "seed": 1}) != key
+
+
+def test_reference_data_version_follows_file_contents(tmp_path):
+    (tmp_path / "preprocessed").mkdir()
+    table = tmp_path / "preprocessed" / "crop_parameters.csv"
+    table.write_text("crop,value\nSoybean,1\n")
+    version = reference_data_version(data_dir=str(tmp_path))
+    assert reference_data_version(data_dir=str(tmp_path)) == version
+
+    table.write_text("crop,value\nSoybean,2\n")
+    assert reference_data_version(data_dir=str(tmp_path)) != version
+
+
+def test_reference_data_version_ignores_derived_files(tmp_path):
+    (tmp_path / "preprocessed" / "layers").mkdir(parents=True)
+    (tmp_path / "preprocessed" / "crop_parameters.csv").write_text("crop\nSoybean\n")
+    version = reference_data_version(data_dir=str(tmp_path))
+
+    # Rebuilding the location index or the layer store keeps the version
+    index = tmp_path / "preprocessed" / "location_index.csv"
+    index.write_text("longitude,latitude,province,eco_id\n")
+    (tmp_path / "preprocessed" / "layers" / "province_10m.npz").write_bytes(b"1")
+    assert reference_data_version(data_dir=str(tmp_path)) == version
+
+
+def test_only_deterministic_tasks_are_cacheable():
+    assert is_cacheable(OPTIONS)
+    assert not is_cacheable({**OPTIONS, "operation_mode": "scientific"})
+    assert is_cacheable({**OPTIONS, "operation_mode": "scientific", "seed": 0})
+    assert not is_cacheable({**OPTIONS, "max_time": 60.0})
+
+
+def test_outputs_with_missing_climate_data_are_incomplete():
+    output = {
+        "Input Parameters": {
+            "farm_data": {"farm_id": np.array(["farm1"]), "area": np.array([np.nan])},
+            "climate_data": {"P": np.array([433.46]), "PE": np.array([407.51])},
+        },
+        "Total Direct Nitrogen Emission": {"co2_crop_direct": np.array([1.5])},
+    }
+    assert is_complete(output)
+    output["Input Parameters"]["climate_data"]["P"] = np.array([np.nan])
+    assert not is_complete(output)
+    farm_output = {"Crops": {"Soybean": {"Emission Factors": {"EF": [np.nan]}}}}
+    assert not is_complete(farm_output)
+
+
+def test_store_round_trip_and_clear(tmp_path):
+    store = ResultStore(str(tmp_path))
+    assert store.get("ab12") is None
+    store.put("ab12", '{"a": 1}')
+    assert store.path("ab12") == str(tmp_path / "ab" / "ab12.json")
+    assert store.get("ab12") == '{"a": 1}'
+    store.clear()
+    assert store.get("ab12") is None
+
+
+def test_rerun_returns_the_stored_output(mock_calculate, tmp_path):
+    output_file = str(tmp_path / "output.json")
+    with patch.object(result_cache, "RESULT_CACHE_DIR", str(tmp_path / "cache")):
+        main.main(
+            INPUT_FILE, "farm1", "Soybean", output_file=output_file, result_cache=True
+        )
+        with open(output_file) as f:
+            first = f.read()
+        os.remove(output_file)
+
+        with collect() as metrics:
+            main.main(
+                INPUT_FILE,
+                "farm1",
+                "Soybean",
+                output_file=output_file,
+                result_cache=True,
+            )
+        with open(output_file) as f:
+            assert f.read() == first
+        assert mock_calculate.call_count == 1
+        assert metrics.as_dict()["caches"]["result"] == {
+            "lookups": 1,
+            "hits": 1,
+            "misses": 0,
+        }
+
+        main.main(
+            INPUT_FILE, "farm1", "Potato", output_file=output_file, result_cache=True
+        )
+        assert mock_calculate.call_count == 2
+
+    emissions = json.loads(first)["Total Direct Nitrogen Emission"]["P"]
+    assert emissions["co2_crop_direct"][0] == 100.0
+
+
+def test_scientific_runs_without_seed_are_not_cached(mock_calculate, tmp_path):
+    output_file = str(tmp_path / "output.json")
+    with patch.object(result_cache, "RESULT_CACHE_DIR", str(tmp_path / "cache")):
+        for _ in range(2):
+            main.main(
+                INPUT_FILE,
+                "farm1",
+                "Soybean",
+                operation_mode="scientific",
+                output_file=output_file,
+                result_cache=True,
+            )
+    assert mock_calculate.call_count == 2
+    assert not os.path.exists(tmp_path / "cache")
+
+
+def test_missing_farm_raises():
+    with pytest.raises(ValueError):
+        task_key(INPUT_FILE, "farm_missing", "Soybean", OPTIONS)
+
+
+def test_output_of_a_failed_climate_fetch_is_not_stored(
+    location_index, power_outage, tmp_path
+):
+    output_file = str(tmp_path / "output.json")
+    farm_calculate = main.calculate
+
+    def calculate(input_file, farm_id, crop, **kwargs):
+        return farm_calculate(
+            input_file, farm_id, crop, location_index=location_index, **kwargs
+        )
+
+    with patch.object(main, "calculate", side_effect=calculate), patch.object(
+        result_cache, "RESULT_CACHE_DIR", str(tmp_path / "cache")
+    ):
+        main.main(
+            INPUT_FILE,
+            "farm1",
+            "Soybean",
+            source="external",
+            output_file=output_file,
+            result_cache=True,
+        )
+        with open(output_file) as f:
+            failed = json.load(f)
+        assert np.isnan(failed["Total Direct Nitrogen Emission"]["co2_crop_direct"][0])
+        assert not os.path.exists(tmp_path / "cache")
+
+        # Once the API recovered, the run is calculated again and stored
+        power_outage.side_effect = lambda fetcher, by_year=False: {
+            point: {"P": 433.46, "PE": 407.51, "success": True}
+            for point in fetcher.points
+        }
+        main.main(
+            INPUT_FILE,
+            "farm1",
+            "Soybean",
+            source="external",
+            output_file=output_file,
+            result_cache=True,
+        )
+        assert power_outage.call_count == 2
+        assert len(os.listdir(tmp_path / "cache")) == 1
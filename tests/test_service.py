@@ -0,0 +1,83 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from src.data_loader.location_cache import clear_location_cache
+from src.service import create_server, parse_request
+
+FARM_REQUEST = {
+    "input_file": "data/test/hypothetical_farm_data.csv",
+    "farm_id": "farm1",
+    "crop": "Soybean",
+}
+
+
+@pytest.fixture
+def server_url(location_index):
+    server = create_server(port=0, location_index=location_index, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=json.dumps(body).encode("utf-8"))
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_parse_request_defaults():
+    kwargs = parse_request(dict(FARM_REQUEST), "scientific")
+    assert kwargs["source"] == "external"
+    assert kwargs["num_runs"] == 10
+    assert kwargs["operation_mode"] == "scientific"
+
+
+def test_parse_request_rejects_invalid_bodies():
+    with pytest.raises(ValueError, match="Missing required fields"):
+        parse_request({"farm_id": "farm1"}, "farmer")
+    with pytest.raises(ValueError, match="Unknown fields"):
+        parse_request({**FARM_REQUEST, "num_runs": 5}, "farmer")
+
+
+def test_health(server_url):
+    with urllib.request.urlopen(f"{server_url}/health") as response:
+        assert json.loads(response.read()) == {"status": "ok"}
+
+
+def test_farmer_request(server_url):
+    status, output = post(f"{server_url}/farmer", FARM_REQUEST)
+    assert status == 200
+    assert set(output) == {
+        "Input Parameters",
+        "Crop Nitrogen Residue",
+        "Emission Factors",
+        "Total Direct Nitrogen Emission",
+    }
+    assert output["Input Parameters"]["climate_data"]["P"] == [512]
+    assert output["Total Direct Nitrogen Emission"]["co2_crop_direct"][0] > 0
+
+
+def test_invalid_request(server_url):
+    status, output = post(f"{server_url}/farmer", {"farm_id": "farm1"})
+    assert status == 400
+    assert "Missing required fields" in output["error"]
+
+    status, output = post(f"{server_url}/farmer", {**FARM_REQUEST, "crop": "Kale"})
+    assert status == 400
+
+
+def test_farmer_request_with_metrics(server_url):
+    clear_location_cache()
+    status, output = post(f"{server_url}/farmer", {**FARM_REQUEST, "metrics": True})
+    assert status == 200
+    stages = output["Metrics"]["stages"]
+    assert stages["calculate"]["calls"] == 1
+    assert "calculate/gather_all_data/climate_soil_data" in stages
+    assert "calculate/emissions" in stages
@@ -0,0 +1,222 @@
+import multiprocessing
+import sqlite3
+from unittest.mock import patch
+import pytest
+from src import work_queue
+from src.instrumentation import collect
+from src.work_queue import WorkQueue, run_worker
+
+OPTIONS = {"operation_mode": "scientific", "source": "external", "seed": 1}
+
+
+def make_tasks(n):
+    return [
+        {
+            "input_file": "farms.csv",
+            "farm_id": f"farm{i}",
+            "crop": "Soybean",
+            "options": OPTIONS,
+            "output_file": f"farm{i}_Soybean.json",
+        }
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, max_attempts=2)
+
+
+def test_enqueue_skips_tasks_already_queued(queue):
+    assert queue.enqueue(make_tasks(3)) == 3
+    assert queue.enqueue(make_tasks(4)) == 1
+    # The order of the options does not make a task new
+    reordered = dict(make_tasks(1)[0], options=dict(reversed(OPTIONS.items())))
+    assert queue.enqueue([reordered]) == 0
+    assert queue.status() == {"pending": 4, "leased": 0, "done": 0, "failed": 0}
+
+
+def test_claim_leases_tasks_in_order(queue):
+    queue.enqueue(make_tasks(2))
+    first = queue.claim("a")
+    second = queue.claim("b")
+    assert [first["farm_id"], second["farm_id"]] == ["farm0", "farm1"]
+    assert first["options"] == OPTIONS
+    assert first["attempts"] == 1
+    assert queue.claim("c") is None
+    assert queue.status()["leased"] == 2
+
+
+def test_complete_records_the_result_pointer(queue):
+    queue.enqueue(make_tasks(1))
+    task = queue.claim("a")
+    assert not queue.complete(task["id"], "b", "other.json")
+    assert queue.complete(task["id"], "a", "farm0_Soybean.json")
+    [done] = queue.tasks("done")
+    assert done["result"] == "farm0_Soybean.json"
+    assert done["worker"] == "a"
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue(make_tasks(1))
+    now = work_queue.time.time()
+    task = queue.claim("a")
+    with patch.object(work_queue.time, "time", return_value=now + 30):
+        assert queue.heartbeat(task["id"], "a")
+    # The heartbeat extended the lease past its first expiry
+    with patch.object(work_queue.time, "time", return_value=now + 80):
+        assert queue.claim("b") is None
+    with patch.object(work_queue.time, "time", return_value=now + 100):
+        retried = queue.claim("b")
+    assert retried["id"] == task["id"]
+    assert retried["attempts"] == 2
+    # The first worker lost its lease and cannot complete the task
+    assert not queue.heartbeat(task["id"], "a")
+    assert not queue.complete(task["id"], "a", "stale.json")
+    assert queue.complete(task["id"], "b", "farm0_Soybean.json")
+
+
+def test_expired_lease_on_the_last_attempt_fails(queue):
+    queue.enqueue(make_tasks(1))
+    now = work_queue.time.time()
+    queue.claim("a")
+    with patch.object(work_queue.time, "time", return_value=now + 100):
+        queue.claim("b")
+    with patch.object(work_queue.time, "time", return_value=now + 200):
+        assert queue.claim("c") is None
+    [failed] = queue.tasks("failed")
+    assert failed["error"] == "Lease expired on the last attempt"
+
+
+def test_failed_tasks_are_retried_up_to_max_attempts(queue):
+    queue.enqueue(make_tasks(1))
+    task = queue.claim("a")
+    assert queue.fail(task["id"], "a", "ValueError: first")
+    assert queue.status()["pending"] == 1
+    task = queue.claim("a")
+    assert queue.fail(task["id"], "a", "ValueError: second")
+    [failed] = queue.tasks("failed")
+    assert failed["attempts"] == 2
+    assert failed["error"] == "ValueError: second"
+    assert queue.claim("a") is None
+
+    assert queue.retry_failed() == 1
+    assert queue.claim("a")["attempts"] == 1
+
+
+def test_run_worker_drains_the_queue(queue):
+    queue.enqueue(make_tasks(3))
+
+    def run_task(task):
+        if task["farm_id"] == "farm1":
+            raise ValueError("Selected location is not in Canada")
+        return task["output_file"]
+
+    with collect() as metrics:
+        outcomes = run_worker(queue.path, "a", run_task=run_task, max_attempts=2)
+    assert outcomes == {"completed": 2, "failed": 2, "lost": 0}
+    assert queue.status() == {"pending": 0, "leased": 0, "done": 2, "failed": 1}
+    [failed] = queue.tasks("failed")
+    assert failed["error"] == "ValueError: Selected location is not in Canada"
+    assert metrics.as_dict()["counters"]["work_queue.claimed"] == 4
+
+
+def test_run_worker_stops_after_max_tasks(queue):
+    queue.enqueue(make_tasks(3))
+    outcomes = run_worker(queue.path, "a", max_tasks=2, run_task=lambda task: None)
+    assert outcomes == {"completed": 2, "failed": 0, "lost": 0}
+    assert queue.status()["pending"] == 1
+
+
+def test_heartbeat_errors_are_retried(queue):
+    queue.enqueue(make_tasks(1))
+    renew = WorkQueue.heartbeat
+    calls = []
+
+    def heartbeat(self, task_id, worker, timeout=work_queue.LOCK_TIMEOUT):
+        calls.append(task_id)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return renew(self, task_id, worker, timeout)
+
+    with patch.object(WorkQueue, "heartbeat", heartbeat), collect() as metrics:
+        outcomes = run_worker(
+            queue.path,
+            "a",
+            run_task=lambda task: work_queue.time.sleep(0.5),
+            lease_seconds=0.4,
+        )
+    # The heartbeats continued after the error and kept the lease
+    assert len(calls) > 2
+    assert outcomes == {"completed": 1, "failed": 0, "lost": 0}
+    assert metrics.as_dict()["counters"]["work_queue.heartbeat_errors"] == 1
+
+
+def test_heartbeats_waiting_for_the_lock_do_not_hold_up_the_task(queue):
+    queue.enqueue(make_tasks(1))
+    task = queue.claim("a")
+    queue.lease_seconds = 0.4
+    # Another worker holds the lock, so the first heartbeat waits for it
+    blocker = sqlite3.connect(queue.path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        with patch.object(work_queue, "HEARTBEAT_LOCK_TIMEOUT", 0.5):
+            with collect() as metrics:
+                with work_queue._heartbeats(queue, task["id"], "a"):
+                    work_queue.time.sleep(0.3)
+                    start = work_queue.time.perf_counter()
+        # The block ended within the heartbeat's timeout, not `LOCK_TIMEOUT`
+        assert work_queue.time.perf_counter() - start < 1.0
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert metrics.as_dict()["counters"]["work_queue.heartbeat_errors"] == 1
+
+
+def test_tasks_of_a_lost_lease_are_not_completed(queue):
+    queue.enqueue(make_tasks(1))
+
+    def run_task(task):
+        # Another worker claims the task, as after an expired lease
+        with sqlite3.connect(queue.path) as connection:
+            connection.execute("UPDATE tasks SET worker = 'b'")
+        return task["output_file"]
+
+    outcomes = run_worker(queue.path, "a", run_task=run_task)
+    assert outcomes == {"completed": 0, "failed": 0, "lost": 1}
+    [task] = queue.tasks("leased")
+    assert task["worker"] == "b"
+
+
+def record_claims(queue_path, worker):
+    def run_task(task):
+        with sqlite3.connect(queue_path, timeout=60) as connection:
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?)", (task["farm_id"], worker)
+            )
+        return task["output_file"]
+
+    run_worker(queue_path, worker, run_task=run_task)
+
+
+def test_concurrent_workers_run_every_task_once(queue):
+    queue.enqueue(make_tasks(40))
+    with sqlite3.connect(queue.path) as connection:
+        connection.execute("CREATE TABLE runs (farm_id TEXT, worker TEXT)")
+
+    processes = [
+        multiprocessing.Process(target=record_claims, args=(queue.path, f"w{i}"))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    with sqlite3.connect(queue.path) as connection:
+        runs = connection.execute("SELECT farm_id FROM runs").fetchall()
+    assert sorted(farm_id for (farm_id,) in runs) == sorted(
+        f"farm{i}" for i in range(40)
+    )
+    assert queue.status()["done"] == 40